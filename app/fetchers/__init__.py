@@ -0,0 +1,8 @@
+
+from . import base_fetcher
+from . import browser_fetcher
+from . import http_fetcher
+from . import page_cache
+from . import resource_policy
+
+__all__ = ["base_fetcher", "browser_fetcher", "http_fetcher", "page_cache", "resource_policy"]
@@ -0,0 +1,37 @@
+import logging
+
+
+# Fetcher names, as used in the *_LIST_FETCHER / *_DETAIL_FETCHER settings
+BROWSER = 'browser'
+HTTP = 'http'
+
+# Page types
+LIST_PAGE = 'list'
+DETAIL_PAGE = 'detail'
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class BaseFetcher(object):
+    """ Abstract class for retrieving the raw HTML of a web page. """
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+
+    @property
+    def size(self):
+        """ Number of pages this fetcher can load in parallel. """
+        return 1
+
+    def fetch(self, url, ready_selector=None):
+        """
+         Retrieves a web page.
+         :param ready_selector: CSS selector of the content showing that the page is rendered,
+          for the fetchers running its JavaScript
+         :return the page source as a string, None if it could not be loaded.
+        """
+        raise NotImplementedError("Class {} doesn't implement fetch()".format(self.__class__.__name__))
+
+    def close(self):
+        """ Releases the resources held by the fetcher. """
+        pass
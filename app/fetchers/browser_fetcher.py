@@ -0,0 +1,103 @@
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+import settings
+from app.fetchers.base_fetcher import BaseFetcher
+from app.fetchers.browser_pool import BrowserPool
+
+
+# Size and duration of the last navigation, and of the resources it downloaded
+PAGE_STATS_SCRIPT = """
+const navigation = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+    bytes: (navigation ? navigation.transferSize : 0) + resources.reduce((total, r) => total + r.transferSize, 0),
+    requests: resources.length + 1,
+    load_ms: navigation ? Math.round(navigation.duration || navigation.domContentLoadedEventEnd) : null,
+};
+"""
+
+
+class BrowserFetcher(BaseFetcher):
+    """ Loads pages through headless Chrome, for pages that need JavaScript to render. """
+
+    def __init__(self, pool=None, policy=None, ready_timeout=None):
+        """
+         :param policy: ResourcePolicy of the resources not to download, None to load everything
+         :param ready_timeout: seconds to wait for the ready selector, BROWSER_READY_TIMEOUT by default
+        """
+        super().__init__()
+        if pool is None:
+            pool = BrowserPool(settings.core.BROWSER_POOL_SIZE)
+        self.pool = pool
+        if ready_timeout is None:
+            ready_timeout = settings.core.BROWSER_READY_TIMEOUT
+        self.policy = policy
+        self._ready_timeout = ready_timeout
+
+    @property
+    def size(self):
+        return self.pool.size
+
+    def fetch(self, url, ready_selector=None):
+        # Requests are spaced out by the rate limiter of the datasource's host
+        with self.pool.browser() as browser:
+            self._apply_policy(browser)
+            try:
+                browser.get(url)  # This does not throw an exception if it got a 404
+            except TimeoutException:
+                self.logger.warning("Timed out loading {}".format(url))
+                return None
+            if ready_selector is not None and not self._wait_until_ready(browser, url, ready_selector):
+                return None
+            self._log_page_stats(browser, url)
+            return browser.page_source
+
+    def _wait_until_ready(self, browser, url, ready_selector):
+        """
+         Waits for the content of a page to be rendered, returning as soon as it is.
+         A page fully loaded without that content is genuinely empty, and is returned as such.
+         :return False if the page was still loading when the wait timed out
+        """
+        start = time.monotonic()
+        try:
+            WebDriverWait(browser, self._ready_timeout, poll_frequency=0.1).until(
+                lambda b: len(b.find_elements(By.CSS_SELECTOR, ready_selector)) > 0)
+            self.logger.debug("{} ready after {:.2f}s".format(url, time.monotonic() - start))
+            return True
+        except TimeoutException:
+            pass
+        try:
+            state = browser.execute_script('return document.readyState')
+        except WebDriverException:
+            state = None
+        if state == 'complete':
+            self.logger.info("{} loaded without any {}, treating it as empty".format(url, ready_selector))
+            return True
+        self.logger.warning("Timed out after {}s waiting for {} to render".format(self._ready_timeout, url))
+        return False
+
+    def _apply_policy(self, browser):
+        """ Sets the fetcher's blocked resources on a session, which may have been used with another policy. """
+        if getattr(browser, 'resource_policy', None) == self.policy:
+            return
+        if self.policy is None:
+            browser.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
+        else:
+            self.policy.apply(browser)
+        browser.resource_policy = self.policy
+
+    def _log_page_stats(self, browser, url):
+        try:
+            stats = browser.execute_script(PAGE_STATS_SCRIPT)
+        except Exception as e:
+            self.logger.debug("No performance entries for {}: {}".format(url, str(e)))
+            return
+        self.logger.info("Loaded {} in {}ms: {:.0f} kB over {} requests".format(
+            url, stats.get('load_ms'), (stats.get('bytes') or 0) / 1024, stats.get('requests')))
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium_stealth import stealth
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+import settings
+
+
+# Driver path resolved by this process
+_driver_path = None
+_driver_lock = threading.Lock()
+
+
+def _read_driver_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_driver_cache(path, driver_path):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'path': driver_path, 'resolved_at': time.time()}, f)
+    os.replace(tmp_path, path)
+
+
+def resolve_driver_path(install=None, cache_file=None, ttl=None):
+    """
+     Finds the chromedriver executable: CHROMEDRIVER_PATH if set, else the path resolved by a previous run
+     when younger than DRIVER_CACHE_TTL, else a lookup through webdriver-manager, which may download it.
+     A lookup failure, e.g. when offline, falls back to the cached path, however old.
+     :return string path of the executable
+    """
+    global _driver_path
+    if settings.core.CHROMEDRIVER_PATH:
+        return settings.core.CHROMEDRIVER_PATH
+    if install is None:
+        install = lambda: ChromeDriverManager().install()
+    if cache_file is None:
+        cache_file = settings.core.DRIVER_CACHE_FILE
+    if ttl is None:
+        ttl = settings.core.DRIVER_CACHE_TTL
+    with _driver_lock:
+        if _driver_path is not None and os.path.exists(_driver_path):
+            return _driver_path
+        cached = _read_driver_cache(cache_file)
+        if cached is not None and not os.path.exists(cached.get('path') or ''):
+            cached = None
+        if cached is not None and time.time() - cached['resolved_at'] < ttl:
+            _driver_path = cached['path']
+            return _driver_path
+        start = time.monotonic()
+        try:
+            driver_path = install()
+        except Exception as e:
+            if cached is None:
+                raise
+            logging.getLogger().warning("Driver lookup failed ({}), using {}".format(str(e), cached['path']))
+            _driver_path = cached['path']
+            return _driver_path
+        logging.getLogger().info("Resolved chromedriver in {:.2f}s".format(time.monotonic() - start))
+        _write_driver_cache(cache_file, driver_path)
+        _driver_path = driver_path
+        return _driver_path
+
+
+def create_browser():
+    """
+     Starts a headless Chrome session with the anti-detection setup used by the scrapers.
+     :return webdriver.Chrome instance.
+    """
+    # Set up Chrome options for headless browsing with anti-detection
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-plugins')
+    # --disable-images is not a Chrome switch, images are turned off through Blink settings
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    # Return once the DOM is parsed, without waiting for every subresource, the content being waited for explicitly
+    chrome_options.page_load_strategy = 'eager'
+
+    # Initialize Chrome WebDriver with automatic driver management
+    service = Service(resolve_driver_path())
+    browser = webdriver.Chrome(service=service, options=chrome_options)
+
+    stealth(browser,
+            languages=["en-US", "en"],
+            vendor="Google Inc.",
+            platform="Win32",
+            webgl_vendor="Intel Inc.",
+            renderer="Intel Iris OpenGL Engine",
+            fix_hairline=True,
+            )
+    # Hide webdriver properties
+    browser.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
+    # Pages are waited for through each datasource's ready selectors, not implicit waits
+    browser.set_page_load_timeout(60)
+    return browser
+
+
+class BrowserPool(object):
+    """ Bounded pool of WebDriver sessions, started lazily and shared between worker threads. """
+
+    def __init__(self, size, factory=create_browser):
+        self.logger = logging.getLogger()
+        self._size = max(1, int(size))
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._browsers = []
+        self._started = 0
+        self._lock = threading.Lock()
+        # Seconds taken to start each session, in starting order
+        self.startup_times = []
+
+    @property
+    def size(self):
+        return self._size
+
+    @contextmanager
+    def browser(self):
+        """
+         Checks out a browser for the duration of the block, blocking while all sessions are busy.
+         :return webdriver.Chrome instance.
+        """
+        browser = self._acquire()
+        try:
+            yield browser
+        finally:
+            self._idle.put(browser)
+
+    def _acquire(self):
+        try:
+            browser = self._idle.get_nowait()
+            if self._is_alive(browser):
+                return browser
+            self._discard(browser)
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_start = self._started < self._size
+            if can_start:
+                self._started += 1
+        if not can_start:
+            return self._idle.get()
+        start = time.monotonic()
+        try:
+            browser = self._factory()
+        except Exception:
+            with self._lock:
+                self._started -= 1
+            raise
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self._browsers.append(browser)
+            self.startup_times.append(elapsed)
+        self.logger.info("Started browser session {}/{} in {:.2f}s".format(len(self._browsers), self._size, elapsed))
+        return browser
+
+    def _is_alive(self, browser):
+        """ Tells whether an idle session still answers, a reused session possibly having crashed meanwhile. """
+        try:
+            browser.current_url
+            return True
+        except Exception as e:
+            self.logger.warning("Dropping dead browser session: {}".format(str(e)))
+            return False
+
+    def _discard(self, browser):
+        with self._lock:
+            if browser in self._browsers:
+                self._browsers.remove(browser)
+                self._started -= 1
+        try:
+            browser.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """ Quits every session started by the pool. """
+        with self._lock:
+            browsers, self._browsers = self._browsers, []
+            self._started = 0
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for browser in browsers:
+            try:
+                browser.quit()
+            except Exception as e:
+                self.logger.warning("Failed to quit browser: {}".format(str(e)))
@@ -0,0 +1,55 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import settings
+from app.fetchers.base_fetcher import BaseFetcher, USER_AGENT
+
+
+class HttpFetcher(BaseFetcher):
+    """ Loads server-rendered pages with a plain HTTP client, keeping connections and cookies alive. """
+
+    def __init__(self, session=None, pool_size=None, timeout=None, headers=None):
+        """
+         :param headers: sent with every request, on top of the default ones of a new session
+        """
+        super().__init__()
+        if pool_size is None:
+            pool_size = settings.core.HTTP_POOL_SIZE
+        if timeout is None:
+            timeout = settings.core.HTTP_TIMEOUT
+        self._pool_size = max(1, pool_size)
+        self._timeout = timeout
+        if session is None:
+            session = requests.Session()
+            retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self._pool_size, max_retries=retries)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'User-Agent': USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
+                'Accept-Encoding': 'gzip, deflate',
+            })
+        if headers:
+            session.headers.update(headers)
+        self.session = session
+
+    @property
+    def size(self):
+        return self._pool_size
+
+    def fetch(self, url, ready_selector=None):
+        try:
+            response = self.session.get(url, timeout=self._timeout)
+        except requests.RequestException as e:
+            self.logger.error("HTTP request failed for {}: {}".format(url, str(e)))
+            return None
+        if response.status_code != 200:
+            self.logger.warning("HTTP {} for {}".format(response.status_code, url))
+            return None
+        return response.text
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+import settings
+from app.fetchers.base_fetcher import LIST_PAGE, DETAIL_PAGE
+
+
+class PageCache(object):
+    """ On-disk cache of raw web pages, compressed and stored under the hash of their url. """
+
+    # No page is read nor written
+    OFF = 'off'
+    # Pages younger than the TTL of their type are served from the cache, others are loaded and stored
+    CACHE = 'cache'
+    # Pages are always loaded and stored
+    RECORD = 'record'
+    # Pages are only served from the cache, whatever their age, and never loaded
+    REPLAY = 'replay'
+
+    MODES = (OFF, CACHE, RECORD, REPLAY)
+
+    def __init__(self, directory, mode=CACHE, ttls=None):
+        if mode not in self.MODES:
+            raise ValueError("Unknown page cache mode {}, expected one of {}".format(mode, ', '.join(self.MODES)))
+        self.logger = logging.getLogger()
+        self.directory = directory
+        self.mode = mode
+        # Time to live of the cached pages in seconds, by page type
+        self.ttls = ttls or {}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(settings.core.PAGE_CACHE_DIR, settings.core.PAGE_CACHE_MODE,
+                   {LIST_PAGE: settings.core.PAGE_CACHE_LIST_TTL, DETAIL_PAGE: settings.core.PAGE_CACHE_DETAIL_TTL})
+
+    @property
+    def replay(self):
+        return self.mode == self.REPLAY
+
+    def _get_path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key + '.html.gz')
+
+    def get(self, url, page_type):
+        """
+         Looks up a page in the cache.
+         :return the page source, None if it is not cached, expired or the mode does not read the cache.
+        """
+        if self.mode not in (self.CACHE, self.REPLAY):
+            return None
+        path = self._get_path(url)
+        try:
+            if self.mode == self.CACHE:
+                ttl = self.ttls.get(page_type, 0)
+                if time.time() - os.path.getmtime(path) > ttl:
+                    return None
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            if self.replay:
+                self.logger.warning("Page {} is not in the cache".format(url))
+            return None
+
+    def put(self, url, html):
+        """ Stores a page loaded from the web. """
+        if self.mode not in (self.CACHE, self.RECORD):
+            return
+        path = self._get_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside then renamed, so that concurrent readers never see a partial page
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(html.encode('utf-8')))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,53 @@
+import settings
+
+
+# Images, media and fonts, never needed to read the listings
+MEDIA_PATTERNS = (
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.bmp',
+    '*.mp4', '*.webm', '*.m3u8', '*.mp3', '*.ogg',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+)
+
+# Advertising and analytics domains
+TRACKER_PATTERNS = (
+    '*google-analytics.com*', '*googletagmanager.com*', '*googlesyndication.com*', '*doubleclick.net*',
+    '*adservice.google.*', '*facebook.net*', '*connect.facebook.com*', '*criteo.com*', '*criteo.net*',
+    '*hotjar.com*', '*scorecardresearch.com*', '*taboola.com*', '*outbrain.com*', '*xiti.com*',
+    '*smartadserver.com*', '*amazon-adsystem.com*', '*adnxs.com*', '*quantserve.com*',
+)
+
+
+class ResourcePolicy(object):
+    """ URL patterns the browser must not download, applied through the Chrome DevTools protocol. """
+
+    def __init__(self, blocked=(), allowed=(), defaults=True):
+        """
+         :param blocked: patterns blocked in addition to the default ones, '*' matching any characters
+         :param allowed: default patterns a site needs to render its listings, which are not blocked
+         :param defaults: False to only block the given patterns
+        """
+        patterns = list(MEDIA_PATTERNS + TRACKER_PATTERNS) if defaults else []
+        patterns.extend(p for p in blocked if p and p not in patterns)
+        allowed = set(allowed)
+        self.patterns = tuple(p for p in patterns if p not in allowed)
+
+    @classmethod
+    def from_settings(cls, blocked=(), allowed=()):
+        """
+         Builds a datasource's policy, unless resource blocking is disabled.
+         :return ResourcePolicy instance, None when BLOCK_RESOURCES is off
+        """
+        if not settings.core.BLOCK_RESOURCES:
+            return None
+        return cls(blocked, allowed)
+
+    def apply(self, browser):
+        """ Sets the patterns blocked by a browser session, replacing those of the previous policy. """
+        browser.execute_cdp_cmd('Network.enable', {})
+        browser.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(self.patterns)})
+
+    def __eq__(self, other):
+        return isinstance(other, ResourcePolicy) and self.patterns == other.patterns
+
+    def __hash__(self):
+        return hash(self.patterns)
@@ -4,6 +4,8 @@ from app.models.base_offer import BaseOffer
 class ApartmentOffer(BaseOffer):
     """ DAO representing an offer. """
 
+    __slots__ = ('__room_count', '__building_year')
+
     def __init__(self):
         super().__init__()
         self.__room_count = None
@@ -4,6 +4,10 @@ from datetime import datetime
 
 class BaseOffer(object):
 
+    # No per-instance __dict__, offers are loaded by the hundred thousands for dedup and backtesting
+    __slots__ = ('__id', '__details_url', '__description', '__title', '__price', '__surface', '__created_at',
+                 '__postal_code')
+
     def __init__(self):
         self.__id = None
         self.__details_url = None
@@ -93,6 +97,11 @@ class BaseOffer(object):
     def price_per_surface_unit(self):
         return int(self.price / self.surface)
 
+    def fill_card(self, datasource, offer):
+        """ Fills the fields the datasource can read on the result list, before its details page is loaded. """
+        for field in datasource._card_fields:
+            setattr(self, field, getattr(datasource, 'get_' + field)(self, offer, None))
+
     def fill_object(self, datasource, offer, payload):
         self.details_url = datasource.get_details_url(self, offer, payload)
         self.description = datasource.get_description(self, offer, payload)
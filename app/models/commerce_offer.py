@@ -7,6 +7,8 @@ from app.models.base_offer import BaseOffer
 class CommerceOffer(BaseOffer):
     """ DAO representing an offer. """
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -0,0 +1,89 @@
+from array import array
+from collections import namedtuple
+
+
+# Fields of an offer, in column order
+FIELDS = ('id', 'details_url', 'title', 'description', 'price', 'surface', 'postal_code', 'created_at',
+          'room_count', 'building_year')
+
+# Integer fields, stored in typed arrays with MISSING standing for unknown values
+INT_FIELDS = ('price', 'surface', 'postal_code', 'room_count', 'building_year')
+
+MISSING = -(2 ** 63)
+
+# Read-only view of an offer of a batch, with the same attributes as the offer models
+OfferRow = namedtuple('OfferRow', FIELDS)
+
+
+class OfferBatch(object):
+    """ Columnar container for a page or a history of offers, handed to filters and storage at once. """
+
+    __slots__ = ('datasource', 'columns')
+
+    def __init__(self, datasource=None):
+        self.datasource = datasource
+        self.columns = {field: array('q') if field in INT_FIELDS else [] for field in FIELDS}
+
+    @classmethod
+    def from_offers(cls, offers, datasource=None):
+        """
+         Builds a batch from offer model objects, already validated by their setters.
+         :return OfferBatch instance
+        """
+        batch = cls(datasource)
+        batch.extend(offers)
+        return batch
+
+    def append(self, o):
+        """ Adds an offer, or any object with the offer attributes, at the end of the batch. """
+        for field, column in self.columns.items():
+            value = getattr(o, field, None)
+            if field in INT_FIELDS:
+                column.append(MISSING if value is None else value)
+            else:
+                column.append(value)
+
+    def extend(self, offers):
+        for o in offers:
+            self.append(o)
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def column(self, field):
+        """
+         Reads a whole field, the integer ones being returned as their raw array.
+         :return array('q') with MISSING for unknown values, or list
+        """
+        return self.columns[field]
+
+    def values(self, field):
+        """ :return list of a field's values, with None for unknown values """
+        if field in INT_FIELDS:
+            return [None if v == MISSING else v for v in self.columns[field]]
+        return list(self.columns[field])
+
+    def __getitem__(self, index):
+        return OfferRow(*(self._get_value(field, index) for field in FIELDS))
+
+    def __iter__(self):
+        columns = [self.values(field) for field in FIELDS]
+        return (OfferRow(*values) for values in zip(*columns))
+
+    def _get_value(self, field, index):
+        value = self.columns[field][index]
+        if field in INT_FIELDS and value == MISSING:
+            return None
+        return value
+
+    def select(self, indexes):
+        """
+         Builds the batch of the offers at the given positions.
+         :return OfferBatch instance
+        """
+        batch = OfferBatch(self.datasource)
+        for field, column in self.columns.items():
+            target = batch.columns[field]
+            for index in indexes:
+                target.append(column[index])
+        return batch
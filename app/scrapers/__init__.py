@@ -2,5 +2,7 @@
 from . import pap
 from . import seloger
 from . import bienici
+from . import bienici_api
+from . import pap_api
 
-__all__ = ["pap", "seloger", "bienici"]
\ No newline at end of file
+__all__ = ["pap", "seloger", "bienici", "bienici_api", "pap_api"]
\ No newline at end of file
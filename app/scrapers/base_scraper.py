@@ -1,16 +1,21 @@
 import logging
-from selenium_stealth import stealth
-
+import threading
 import time
-import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
 from weakref import WeakValueDictionary
 
 
-import bs4
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import settings
+from app.services.filter import CompiledFilter
+from app.fetchers.base_fetcher import BROWSER, HTTP, LIST_PAGE, DETAIL_PAGE
+from app.fetchers.browser_fetcher import BrowserFetcher
+from app.fetchers.http_fetcher import HttpFetcher
+from app.fetchers.page_cache import PageCache
+from app.fetchers.resource_policy import ResourcePolicy
+from app.scrapers.extraction import parse_html
+from app.utils.rate_limit import AdaptiveRate, get_bucket
 
 
 
@@ -19,44 +24,59 @@ class BaseScraper(object):
 
     _instances = WeakValueDictionary()
 
-    def __init__(self):
+    # Offer fields whose getters only need the result list, read before loading the details page
+    _card_fields = ()
+
+    # Classes of the containers used on each page type, the rest of the page is not parsed
+    _page_regions = {}
+
+    # Whether filling an offer loads its details page, rather than only reading its result list entry
+    _loads_detail_pages = True
+
+    # Whether the search url lists the newest offers first, which incremental crawls rely on to stop at known offers
+    _sorted_by_date = False
+
+    # Whether pages the selected fetcher fails to load are tried again with the browser
+    _browser_fallback = True
+
+    # CSS selector of the content showing that each page type is rendered, waited for by the browser
+    _ready_selectors = {}
+
+    # Markers of the anti-bot pages served instead of the requested one
+    _block_markers = ('captcha-delivery.com', 'g-recaptcha', 'cf-challenge', 'px-captcha')
+
+    def __init__(self, fetchers=None, offer_store=None, page_cache=None):
         self._instances[id(self)] = self
         self.logger = logging.getLogger()
-        
-        # Set up Chrome options for headless browsing with anti-detection
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-plugins')
-        chrome_options.add_argument('--disable-images')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # Initialize Chrome WebDriver with automatic driver management
-        service = Service(ChromeDriverManager().install())
-        self.__browser = webdriver.Chrome(service=service, options=chrome_options)
-
-        stealth(self.__browser,
-                languages=["en-US", "en"],
-                vendor="Google Inc.",
-                platform="Win32",
-                webgl_vendor="Intel Inc.",
-                renderer="Intel Iris OpenGL Engine",
-                fix_hairline=True,
-                )
-        # Hide webdriver properties
-        self.__browser.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
-        self.__browser.implicitly_wait(10)
-        self.__browser.set_page_load_timeout(60)
+        # Maximum number of detail pages loaded in parallel for this datasource
+        self._max_concurrency = 1
+        # Maximum number of requests per second sent to the datasource's host, 0 for no limit
+        self._requests_per_second = 0
+        # Fetcher used for each page type, the browser being the fallback
+        self._page_fetchers = {LIST_PAGE: BROWSER, DETAIL_PAGE: BROWSER}
+        if fetchers is None:
+            fetchers = {BROWSER: BrowserFetcher(policy=self._get_resource_policy()), HTTP: HttpFetcher(headers=self._get_http_headers())}
+        self.__fetchers = fetchers
+        if page_cache is None:
+            page_cache = PageCache.from_settings()
+        self.__page_cache = page_cache
+        # Store of the already seen offers, whose detail pages are not loaded again
+        self.__offer_store = offer_store
+        # Offers of the current results page filtered out on the result list, stored along with the filled ones
+        self.__page_rejected = []
+        self.__filter = CompiledFilter.from_settings()
+        # Adaptive delay between requests, created with the rate limiter on first use
+        self.__politeness = None
+        self.__politeness_lock = threading.Lock()
+        self._begin_crawl(full_crawl=True)
 
     def __del__(self):
-        self.__browser.quit()
+        self.close()
+
+    def close(self):
+        """ Closes the fetchers of the datasource. """
+        for fetcher in getattr(self, '_BaseScraper__fetchers', {}).values():
+            fetcher.close()
 
 # region scraping methods
     def _get_search_url(self):
@@ -66,6 +86,20 @@ class BaseScraper(object):
         """
         NotImplementedError("Class {} doesn't implement aMethod()".format(self.__class__.__name__))
 
+    def _get_resource_policy(self):
+        """
+         The resources the browser must not download for this datasource.
+         :return ResourcePolicy instance, None to load everything
+        """
+        return ResourcePolicy.from_settings()
+
+    def _get_http_headers(self):
+        """
+         The headers the plain HTTP client sends to this datasource, on top of its default ones.
+         :return dict, None to only send the default headers
+        """
+        return None
+
     def _get_offers(self, root):
         """
          Builds a list of offers
@@ -73,25 +107,223 @@ class BaseScraper(object):
         """
         NotImplementedError("Class {} doesn't implement aMethod()".format(self.__class__.__name__))
 
-    def __get_offers(self, root):
+    def __iter_offers(self, root):
         """
-         Builds a list of offers
-         :return list(BaseOffer)
+         Yields the offers of a results page, one at a time, as soon as each is filled.
+         :return generator of BaseOffer
         """
         offers = []
+        for o in self.__fill_offers(self._select_candidates(root)):
+            if o is None:
+                continue
+            offers.append(o)
+            yield o
+        self._end_page(offers)
+
+    def _select_candidates(self, root):
+        """
+         Builds the offers of a results page, without the known ones and those the result list rules out.
+         The rejected offers are stored by _end_page() with the filled ones.
+         :return list of the (offer, r_offer) candidates whose details page must be loaded
+        """
+        candidates = []
         r_offers = self._get_offers(root)
         for r_offer in r_offers:
             o = self._get_offer_object(r_offer)
             if o is None:
                 continue
             if self._is_valid_offer(o, r_offer):
-                payload = self._prepare_offer_filling(o, r_offer)
-                o.fill_object(self, r_offer, payload)
-                self._clean_offer_filling(o, r_offer, payload)
-                offers.append(o)
+                candidates.append((o, r_offer))
             else:
                 self.logger.warning("Invalid offer detected. Skipping...")
-        return offers
+        candidates = self.__skip_known_offers(candidates)
+        candidates, self.__page_rejected = self.__prefilter_offers(candidates)
+        return candidates
+
+    def _end_page(self, offers):
+        """ Stores the filled offers of a results page and its rejected ones, in a single transaction. """
+        # Rejected offers are stored too, so that they are not read again by the next crawls
+        offers = self.__page_rejected + list(offers)
+        self.__page_rejected = []
+        if self.__offer_store is not None and len(offers) > 0:
+            self.__offer_store.add_many(self.get_datasource_name(), offers)
+        self.__save_politeness()
+
+    def __prefilter_offers(self, candidates):
+        """
+         Fills the fields available on the result list and applies the filters that only need them,
+         so that details pages are only loaded for the remaining offers.
+         :return the (offer, r_offer) candidates kept and the list of rejected offers
+        """
+        kept = []
+        rejected = []
+        for o, r_offer in candidates:
+            o.fill_card(self, r_offer)
+            rule = self.__filter.apply_card(o)
+            if rule is not None:
+                self.logger.debug("Offer {} filtered out by its {}".format(o.id, rule))
+                rejected.append(o)
+            else:
+                kept.append((o, r_offer))
+        if len(rejected) > 0:
+            self.logger.info("Filtered out {} offers from the result list".format(len(rejected)))
+        return kept, rejected
+
+    def __skip_known_offers(self, candidates):
+        """
+         Drops the offers already in the offer store, using the id available on the result list,
+         but for those whose price change now lets them through the result list filters.
+         :return list of the (offer, r_offer) candidates not seen yet
+        """
+        if self.__offer_store is None:
+            return candidates
+        datasource = self.get_datasource_name()
+        ids = [self.get_id(o, r_offer, None) for o, r_offer in candidates]
+        known = self.__offer_store.known_ids(datasource, ids)
+        self.__offer_store.touch(datasource, known)
+        fresh = []
+        seen = set()
+        prices = []
+        known_candidates = dict()
+        self.__page_all_known = len(ids) > 0
+        for candidate, offer_id in zip(candidates, ids):
+            if offer_id is not None:
+                offer_id = str(offer_id)
+                self.__track_crawl_progress(offer_id, offer_id in known)
+                if offer_id in known and offer_id not in known_candidates:
+                    o, r_offer = candidate
+                    known_candidates[offer_id] = candidate
+                    prices.append((offer_id, self.get_price(o, r_offer, None)))
+                if offer_id in known or offer_id in seen:
+                    continue
+                seen.add(offer_id)
+            fresh.append(candidate)
+        if len(known) > 0:
+            self.logger.info("Skipping {} already known offers".format(len(known)))
+            changes = self.__record_prices(prices)
+            fresh.extend(self.__refilter_price_changes(known_candidates, changes))
+        return fresh
+
+    def __record_prices(self, prices):
+        """
+         Records the result list price of the known offers when it changed.
+         :return list of the (offer id, previous price, price) which changed
+        """
+        observations = []
+        for offer_id, price in prices:
+            # Same conversion as the offer models, for prices to compare equal to the stored ones
+            try:
+                observations.append((offer_id, int(float(price))))
+            except (TypeError, ValueError):
+                continue
+        datasource = self.get_datasource_name()
+        changes = self.__offer_store.record_prices(datasource, observations)
+        for offer_id, previous, price in changes:
+            self.logger.info("Price of {} offer {} changed from {} to {}".format(datasource, offer_id, previous, price))
+        return changes
+
+    def __refilter_price_changes(self, known_candidates, changes):
+        """
+         Runs the known offers whose price changed back through the result list filters, the offers filtered out
+         at their previous price being stored as known and never read again otherwise.
+         :param known_candidates: dict of the (offer, r_offer) candidates of the known offers, by id
+         :return list of the (offer, r_offer) candidates filtered out at their previous price and kept at the new one
+        """
+        candidates = []
+        for offer_id, previous, price in changes:
+            o, r_offer = known_candidates[offer_id]
+            o.fill_card(self, r_offer)
+            o.price = previous
+            was_rejected = self.__filter.apply_card(o) is not None
+            o.price = price
+            if was_rejected and self.__filter.apply_card(o) is None:
+                self.logger.info("Offer {} now passes the filters at {}, reading it again".format(offer_id, price))
+                candidates.append((o, r_offer))
+        return candidates
+
+    def _begin_crawl(self, full_crawl):
+        """
+         Resets the crawl progress and loads the watermark of the last crawl.
+         :return True if pagination may stop at already known offers, False for a full crawl
+        """
+        self.__newest_offer_id = None
+        self.__watermark_offer_id = None
+        self.__watermark_reached = False
+        self.__known_streak = 0
+        self.__page_all_known = False
+        if full_crawl or self.__offer_store is None or settings.core.INCREMENTAL_KNOWN_OFFERS <= 0:
+            return False
+        if not self._sorted_by_date:
+            self.logger.info("Results of {} are not sorted by date, crawling every page".format(self.get_datasource_name()))
+            return False
+        state = self.__offer_store.get_crawl_state(self.get_datasource_name())
+        if state is None or state['last_full_crawl_at'] is None:
+            self.logger.info("No full crawl recorded, crawling every page")
+            return False
+        if datetime.now() - state['last_full_crawl_at'] > timedelta(seconds=settings.core.FULL_CRAWL_INTERVAL):
+            self.logger.info("Last full crawl is older than {}s, crawling every page".format(settings.core.FULL_CRAWL_INTERVAL))
+            return False
+        self.__watermark_offer_id = state['watermark_offer_id']
+        return True
+
+    def __track_crawl_progress(self, offer_id, is_known):
+        if self.__newest_offer_id is None:
+            self.__newest_offer_id = offer_id
+        if is_known:
+            self.__known_streak += 1
+            if offer_id == self.__watermark_offer_id:
+                self.__watermark_reached = True
+        else:
+            self.__known_streak = 0
+            self.__page_all_known = False
+
+    def _reached_known_offers(self):
+        """ Tells whether the remaining pages only hold offers seen by a previous crawl. """
+        return self.__watermark_reached \
+            or self.__page_all_known \
+            or self.__known_streak >= settings.core.INCREMENTAL_KNOWN_OFFERS
+
+    def _end_crawl(self, incremental, completed=True):
+        """ Records the progress of a crawl, its watermark only if it went through all the pages it needed. """
+        if completed and self.__offer_store is not None:
+            self.__offer_store.save_crawl_state(self.get_datasource_name(), self.__newest_offer_id, not incremental)
+        metrics = self.__save_politeness()
+        if metrics is not None:
+            self.logger.info("{} politeness: {:.2f}s between requests, {} successes, {} empty pages, {} blocks, "
+                             "{} timeouts".format(self.get_datasource_name(), metrics['delay'], metrics['successes'],
+                                                  metrics['empty_pages'], metrics['blocks'], metrics['timeouts']))
+
+    def __fill_offers(self, candidates):
+        """
+         Fills the offers, dispatching detail page loads on the browser pool.
+         :return generator of BaseOffer, in the same order as candidates, None for those which failed to load
+        """
+        workers = min(self._get_detail_concurrency(), len(candidates))
+        if workers <= 1 or not any(self._needs_details_page(r_offer) for o, r_offer in candidates):
+            for o, r_offer in candidates:
+                yield self._fill_candidate(o, r_offer)
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=self.get_datasource_name()) as executor:
+            yield from executor.map(lambda candidate: self._fill_candidate(*candidate), candidates)
+
+    def _needs_details_page(self, r_offer):
+        """ Tells whether filling the offer of a result list entry loads its details page. """
+        return self._loads_detail_pages
+
+    def _fill_candidate(self, offer, r_offer):
+        """
+         Fills an offer from its details page.
+         An offer whose details page failed to load is neither returned nor stored, for the next crawl to retry it.
+         :return the offer, None if its details page could not be loaded
+        """
+        payload = self._prepare_offer_filling(offer, r_offer)
+        if payload is None and self._needs_details_page(r_offer):
+            self.logger.warning("Details page of offer {} not loaded, leaving it to the next crawl"
+                                .format(self.get_id(offer, r_offer, None)))
+            return None
+        offer.fill_object(self, r_offer, payload)
+        self._clean_offer_filling(offer, r_offer, payload)
+        return offer
 
     def _get_offer_object(self, r_offer):
         """
@@ -130,41 +362,173 @@ class BaseScraper(object):
         """
         NotImplementedError("Class {} doesn't implement aMethod()".format(self.__class__.__name__))
 
-    def _load_web_page(self, url):
+    def _get_detail_concurrency(self):
+        """ :return the number of detail pages which may be loaded at once """
+        return max(1, min(self.__get_fetcher(DETAIL_PAGE).size, self._max_concurrency))
+
+    def _get_host(self):
+        """ :return the host the datasource's requests are sent to """
+        return urlparse(getattr(self, '_base_site_url', '')).netloc or self.get_datasource_name()
+
+    def _get_rate_limiter(self):
+        """
+         Returns the token bucket shared by every request sent to the datasource's host.
+         :return TokenBucket instance, None if requests are not rate limited
+        """
+        return get_bucket(self._get_host(), self._requests_per_second, settings.core.RATE_LIMIT_BURST)
+
+    def _get_politeness(self):
+        """
+         Returns the controller adapting the request rate to the datasource's responses,
+         starting from the state saved by the previous runs.
+         :return AdaptiveRate instance, None if requests are not rate limited
+        """
+        with self.__politeness_lock:
+            if self.__politeness is None:
+                bucket = self._get_rate_limiter()
+                if bucket is None:
+                    return None
+                state = None
+                if self.__offer_store is not None:
+                    state = self.__offer_store.get_politeness_state(self.get_datasource_name())
+                self.__politeness = AdaptiveRate(bucket, settings.core.POLITENESS_MIN_DELAY,
+                                                 settings.core.POLITENESS_MAX_DELAY,
+                                                 speedup=settings.core.POLITENESS_SPEEDUP,
+                                                 backoff=settings.core.POLITENESS_BACKOFF, state=state)
+            return self.__politeness
+
+    def get_politeness_metrics(self):
+        """
+         The current request delay of the datasource and the number of responses of each kind it was adapted on.
+         :return dict, None if requests are not rate limited
+        """
+        politeness = self._get_politeness()
+        return None if politeness is None else politeness.metrics()
+
+    def __save_politeness(self):
+        metrics = self.get_politeness_metrics()
+        if metrics is not None and self.__offer_store is not None:
+            self.__offer_store.save_politeness_state(self.get_datasource_name(), metrics)
+        return metrics
+
+    def _report(self, signal):
+        """ Reports a response to the politeness controller, as one of the AdaptiveRate signals. """
+        politeness = self._get_politeness()
+        if politeness is not None:
+            politeness.report(signal)
+
+    def _is_blocked_page(self, html):
+        """ Tells whether an anti-bot page was served instead of the requested one. """
+        return any(marker in html for marker in self._block_markers)
+
+    def _is_well_formed_page(self, root, page_type):
+        """ Tells whether a page holds what it was loaded for: offer cards on a result list, its region otherwise. """
+        if page_type == LIST_PAGE:
+            return len(self._get_offers(root) or []) > 0
+        return root.find() is not None
+
+    def __throttle(self):
+        bucket = self._get_rate_limiter()
+        if bucket is not None:
+            bucket.acquire()
+
+    def __get_fetcher(self, page_type):
+        name = self._page_fetchers.get(page_type, BROWSER)
+        return self.__fetchers.get(name, self.__fetchers[BROWSER])
+
+    def __fetch_html(self, url, page_type):
+        """
+         Loads a page from the cache, or from its fetcher with the browser as fallback.
+         :return (html, True if the page was actually requested)
+        """
+        html = self.__page_cache.get(url, page_type)
+        if html is not None or self.__page_cache.replay:
+            return html, False
+        fetcher = self.__get_fetcher(page_type)
+        ready_selector = self._ready_selectors.get(page_type)
+        html = self.__fetch_from(fetcher, url, ready_selector)
+        browser = self.__fetchers[BROWSER]
+        if html is None and self._browser_fallback and fetcher is not browser:
+            self.logger.warning("Falling back to the browser for {}".format(url))
+            html = self.__fetch_from(browser, url, ready_selector)
+        if html is not None:
+            self.__page_cache.put(url, html)
+        return html, True
+
+    def __fetch_from(self, fetcher, url, ready_selector):
+        """ Requests a page, reporting failed loads and anti-bot pages, which are discarded. """
+        self.__throttle()
+        html = fetcher.fetch(url, ready_selector)
+        if html is None:
+            self._report(AdaptiveRate.TIMEOUT)
+        elif self._is_blocked_page(html):
+            self.logger.warning("Anti-bot page served for {}".format(url))
+            self._report(AdaptiveRate.BLOCKED)
+            html = None
+        return html
+
+    def _load_web_page(self, url, page_type=LIST_PAGE):
         """
          Retrieves results and returns a ready to use return object
          :return BeautifulSoup instance.
         """
-        # Add random delay to avoid being detected as bot
-        delay = random.uniform(2, 5)
-        time.sleep(delay)
-        
-        self.__browser.get(url)  # This does not throw an exception if it got a 404
-        
-        # Wait a bit more for JavaScript to load
-        time.sleep(random.uniform(1, 3))
-        
-        html = self.__browser.page_source
+        html, fetched = self.__fetch_html(url, page_type)
         self.logger.info("GET request: {}".format(url))
+        if html is None:
+            return None
         result = None
         try:
-            result = bs4.BeautifulSoup(html, 'html.parser')
+            result = self._parse_page(html, page_type)
+            if fetched and self._get_politeness() is not None:
+                well_formed = self._is_well_formed_page(result, page_type)
+                self._report(AdaptiveRate.SUCCESS if well_formed else AdaptiveRate.EMPTY)
         except Exception as e:
             self.logger.error("Failed to load webpage {}: {}".format(url, str(e)))
         finally:
             return result
 
-    def _next_page(self):
+    def _parse_page(self, html, page_type):
+        """
+         Parses the source of a page, only keeping the regions the datasource uses.
+         :return BeautifulSoup instance.
+        """
+        return parse_html(html, regions=self._page_regions.get(page_type))
+
+    def _next_page(self, full_crawl=False):
         """ Retrieve the next page of results. This method must yield each page.
+          With an offer store, pagination stops once the pages only hold known offers,
+          unless a full crawl is requested or the last one is older than FULL_CRAWL_INTERVAL.
           :return list[Offer]: A list of Offer objects.
         """
+        for page in self.__crawl(full_crawl):
+            yield list(page)
+
+    def _next_offer(self, full_crawl=False):
+        """ Retrieve the offers one at a time, as soon as each is filled, across all the pages.
+          :return generator of Offer objects.
+        """
+        for page in self.__crawl(full_crawl):
+            yield from page
+
+    def __crawl(self, full_crawl):
+        """ Walks the results pages. Each page must be consumed before asking for the next one.
+          :return generator of the generators of each page's offers
+        """
+        incremental = self._begin_crawl(full_crawl)
         has_next = True
+        completed = True
         url = self._get_search_url()
         while has_next:
             root = self._load_web_page(url)
-            if root is not None:
-                has_next, url = self._has_next_page(root)
-                yield self.__get_offers(root)
+            if root is None:
+                completed = False
+                break
+            has_next, url = self._has_next_page(root)
+            yield self.__iter_offers(root)
+            if incremental and self._reached_known_offers():
+                self.logger.info("Reached already known offers, stopping pagination")
+                break
+        self._end_crawl(incremental, completed)
 
     @classmethod
     def get_or_none(cls, obj, key):
@@ -3,19 +3,52 @@ import unicodedata
 from urllib.parse import urlparse, urlencode
 
 from app.models.apartment_offer import ApartmentOffer
-from app.scrapers.base_scraper import BaseScraper
+from app.scrapers.base_scraper import BaseScraper, LIST_PAGE, DETAIL_PAGE
+from app.scrapers.extraction import SelectorMap
+from app.fetchers.resource_policy import ResourcePolicy
 
 
 class BienIci(BaseScraper):
     """ BienIci datasource. """
 
-    def __init__(self):
-        super().__init__()
+    _card_fields = ('id', 'details_url', 'title', 'price', 'surface')
+
+    # The search url asks for the newest offers first
+    _sorted_by_date = True
+
+    _selectors = SelectorMap({
+        'next_page': '.goForward',
+        'offers': '.resultsListContainer',
+        'link': '.detailedSheetLink',
+        'title': '.descriptionTitle',
+        'price': '.thePrice',
+        'details': '.detailedSheetContainer',
+        'description': '.descriptionContent',
+    })
+
+    _page_regions = {
+        LIST_PAGE: ('resultsListContainer', 'goForward'),
+        DETAIL_PAGE: ('detailedSheetContainer',),
+    }
+
+    _ready_selectors = {
+        LIST_PAGE: '.resultsListContainer',
+        DETAIL_PAGE: '.detailedSheetContainer',
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._max_concurrency = settings.bienici.BIENICI_MAX_CONCURRENCY
+        self._requests_per_second = settings.bienici.BIENICI_REQUESTS_PER_SECOND
+        self._page_fetchers = {LIST_PAGE: settings.bienici.BIENICI_LIST_FETCHER, DETAIL_PAGE: settings.bienici.BIENICI_DETAIL_FETCHER}
         self._base_site_url = 'https://www.bienici.com'
         self._base_search_url = 'recherche/achat'
         # self._base_search_url = 'realEstateAds.json'
         self._page = 1
 
+    def _get_resource_policy(self):
+        return ResourcePolicy.from_settings(settings.bienici.BIENICI_BLOCKED_RESOURCES, settings.bienici.BIENICI_ALLOWED_RESOURCES)
+
     def _get_search_url(self):
         location = ','.join(settings.bienici.BIENICI_SEARCH_LOCATION)
         type = ','.join(settings.bienici.BIENICI_SEARCH_TYPE)
@@ -26,6 +59,8 @@ class BienIci(BaseScraper):
             params['prix-max'] = settings.filtering.MAX_PRICE
         if settings.filtering.MIN_SIZE > 0:
             params['surface-min'] = settings.filtering.MIN_SIZE
+        # Newest first
+        params['tri'] = 'publication-desc'
         params['page'] = self._page
         # filters = {
         #     "size": 100,
@@ -48,8 +83,7 @@ class BienIci(BaseScraper):
         return url
 
     def _has_next_page(self, root):
-        tags = root.find_all(lambda tag: tag.has_attr('class') and 'goForward' in tag['class'])
-        if len(tags) == 0:
+        if self._selectors.select_one(root, 'next_page') is None:
             return False, None
         else:
             self._page += 1
@@ -58,7 +92,7 @@ class BienIci(BaseScraper):
             return True, url
 
     def _get_offers(self, root):
-        return root.find_all(lambda tag: tag.has_attr('class') and 'resultsListContainer' in tag['class'])
+        return self._selectors.select(root, 'offers')
 
     # region fill an offer
     def _get_offer_object(self, r_offer):
@@ -72,53 +106,38 @@ class BienIci(BaseScraper):
         url = self.get_details_url(offer, r_offer, None)
         if url is not None:
             offer.details_url = url
-            web_page = self._load_web_page(url)
+            web_page = self._load_web_page(url, DETAIL_PAGE)
             if web_page is not None:
-                res = web_page.find_all(lambda tag: tag.has_attr('class') and 'detailedSheetContainer' in tag['class'])
-                if res is not None:
-                    result = res[0]
+                result = self._selectors.select_one(web_page, 'details')
         return result
 
     def _clean_offer_filling(self, offer, r_offer, payload):
         pass
 
     def get_details_url(self, offer, r_offer, payload):
-        result = None
-        res = r_offer.find_all(lambda tag: tag.has_attr('class') and 'detailedSheetLink' in tag['class'])
-        if res is not None:
-            result = res[0]['href']
-        return result
+        return self._selectors.attr(r_offer, 'link', 'href')
 
     def get_title(self, offer, r_offer, payload):
-        title = None
-        res = r_offer.find_all(lambda tag: tag.has_attr('class') and 'descriptionTitle' in tag['class'])
-        if res is not None:
-            title = res[0].text.strip()
-        return title
+        return self._selectors.text(r_offer, 'title')
 
     def get_description(self, offer, r_offer, payload):
-        desc = None
-        res = payload.find_all(lambda tag: tag.has_attr('class') and 'descriptionContent' in tag['class'])
-        if res is None:
-            if payload is not None:
-                res = payload.find_all(lambda tag: tag.has_attr('class') and 'descriptionContent' in tag['class'])
-        if res is not None:
-            desc = res[0].text
-            desc = desc.strip()
+        desc = self._selectors.text(r_offer, 'description')
+        if desc is None:
+            desc = self._selectors.text(payload, 'description')
         return desc
 
     def get_id(self, offer, r_offer, payload):
         return r_offer['data-id']
 
     def get_price(self, offer, r_offer, payload):
-        price = None
-        res = r_offer.find_all(lambda tag: tag.has_attr('class') and 'thePrice' in tag['class'])
-        if res is not None:
-            price = res[0].text
+        price = self._selectors.text(r_offer, 'price')
+        if price is not None:
             price = unicodedata.normalize("NFKD", price).replace(' ','').replace('€','').strip()
         return price
 
     def __get_surface_from_field(self, field):
+        if field is None:
+            return None
         content = field.strip().replace('\t', ' ').replace('\n', ' ')
         surface = None
         high_index = content.find('m²')
@@ -0,0 +1,144 @@
+import html
+import json
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import settings
+from app.fetchers.base_fetcher import HTTP
+from app.scrapers.base_scraper import LIST_PAGE, DETAIL_PAGE
+from app.scrapers.bienici import BienIci
+
+
+# BienIci property types of the BIENICI_SEARCH_TYPE values
+PROPERTY_TYPES = {
+    'appartement': 'flat',
+    'maison': 'house',
+    'loft': 'loft',
+    'terrain': 'terrain',
+    'parking': 'parking',
+}
+
+
+class BienIciApi(BienIci):
+    """
+     BienIci datasource reading the realEstateAds.json API with the plain HTTP client.
+     Each ad of a results page holds all the offer fields, so no details page is loaded.
+    """
+
+    _card_fields = ('id', 'details_url', 'title', 'price', 'surface', 'postal_code')
+
+    _loads_detail_pages = False
+
+    # A browser would return the JSON wrapped in an HTML page
+    _browser_fallback = False
+
+    _page_regions = {}
+
+    _ready_selectors = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._page_fetchers = {LIST_PAGE: HTTP, DETAIL_PAGE: HTTP}
+        self._base_search_url = 'realEstateAds.json'
+        self._page_size = settings.bienici.BIENICI_API_PAGE_SIZE
+
+    def get_datasource_name(self):
+        # Same offers as the html mode, stored under the same name
+        return 'BienIci'
+
+    def _get_filters(self):
+        filters = {
+            'size': self._page_size,
+            'from': (self._page - 1) * self._page_size,
+            'filterType': 'buy',
+            'propertyType': [PROPERTY_TYPES.get(t, t) for t in settings.bienici.BIENICI_SEARCH_TYPE],
+            'sortBy': 'publicationDate',
+            'sortOrder': 'desc',
+            'onTheMarket': [True],
+            'showAllModels': False,
+        }
+        if settings.filtering.MIN_PRICE > 0:
+            filters['minPrice'] = settings.filtering.MIN_PRICE
+        if settings.filtering.MAX_PRICE > 0:
+            filters['maxPrice'] = settings.filtering.MAX_PRICE
+        if settings.filtering.MIN_SIZE > 0:
+            filters['minArea'] = settings.filtering.MIN_SIZE
+        if len(settings.bienici.BIENICI_ZONE_IDS) > 0:
+            filters['zoneIds'] = settings.bienici.BIENICI_ZONE_IDS
+        return filters
+
+    def _get_search_url(self):
+        filters = json.dumps(self._get_filters(), separators=(',', ':'))
+        return '/'.join([self._base_site_url, self._base_search_url]) + '?' + urlencode({'filters': filters})
+
+    def _parse_page(self, html, page_type):
+        return json.loads(html)
+
+    def _has_next_page(self, root):
+        if root.get('from', 0) + len(self._get_offers(root)) >= root.get('total', 0):
+            return False, None
+        self._page += 1
+        self.logger.info("Next page {}".format(self._page))
+        return True, self._get_search_url()
+
+    def _get_offers(self, root):
+        return root.get('realEstateAds') or []
+
+    # region fill an offer
+    def _is_valid_offer(self, offer, r_offer):
+        return r_offer.get('id') is not None
+
+    def _prepare_offer_filling(self, offer, r_offer):
+        return None
+
+    def get_details_url(self, offer, r_offer, payload):
+        return '/'.join([self._base_site_url, 'annonce', r_offer['id']])
+
+    def get_title(self, offer, r_offer, payload):
+        title = r_offer.get('title')
+        return None if title is None else html.unescape(title)
+
+    def get_description(self, offer, r_offer, payload):
+        description = r_offer.get('description')
+        return None if description is None else html.unescape(description)
+
+    def get_id(self, offer, r_offer, payload):
+        return r_offer['id']
+
+    def get_price(self, offer, r_offer, payload):
+        price = r_offer.get('price')
+        # New programs give the price range of their lots
+        if isinstance(price, list):
+            price = price[0] if len(price) > 0 else None
+        return price
+
+    def get_surface(self, offer, r_offer, payload):
+        surface = r_offer.get('surfaceArea')
+        if isinstance(surface, list):
+            surface = surface[0] if len(surface) > 0 else None
+        return surface
+
+    def get_created_at(self, offer, r_offer, payload):
+        published = r_offer.get('publicationDate')
+        if published is None:
+            return None
+        # Dates come with or without milliseconds, an unreadable one must not fail the whole crawl
+        try:
+            published = datetime.fromisoformat(published)
+        except (TypeError, ValueError):
+            self.logger.warning("Unreadable publication date {} of offer {}".format(published, r_offer.get('id')))
+            return None
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        return int(published.timestamp())
+
+    def get_postal_code(self, offer, r_offer, payload):
+        return r_offer.get('postalCode')
+
+    def get_room_count(self, offer, r_offer, payload):
+        return r_offer.get('roomsQuantity')
+
+    def get_building_year(self, offer, r_offer, payload):
+        return r_offer.get('yearOfConstruction')
+
+# endregion
@@ -0,0 +1,93 @@
+import logging
+import re
+from functools import lru_cache
+
+import bs4
+import soupsieve
+
+import settings
+
+
+# Parser backends BeautifulSoup can use, from the fastest to the most lenient
+PARSERS = ('lxml', 'html.parser', 'html5lib')
+
+
+def get_parser(name=None):
+    """
+     Resolves the parser backend to use, falling back to 'html.parser' when the requested one is not installed.
+     :return parser name usable by BeautifulSoup
+    """
+    if name is None:
+        name = settings.core.HTML_PARSER
+    return _resolve_parser(name)
+
+
+@lru_cache(maxsize=None)
+def _resolve_parser(name):
+    if name not in PARSERS:
+        raise ValueError("Unknown HTML parser {}, expected one of {}".format(name, ', '.join(PARSERS)))
+    try:
+        bs4.BeautifulSoup('', name)
+    except bs4.FeatureNotFound:
+        logging.getLogger().warning("HTML parser {} is not installed, using html.parser".format(name))
+        name = 'html.parser'
+    return name
+
+
+@lru_cache(maxsize=None)
+def get_region_strainer(classes):
+    """
+     Builds a strainer keeping only the elements having one of the given classes, with their content.
+     Class attributes are matched as raw strings while parsing, hence the regex.
+     :return SoupStrainer instance
+    """
+    pattern = re.compile(r'(?:^|\s)(?:{})(?:\s|$)'.format('|'.join(re.escape(c) for c in classes)))
+    return bs4.SoupStrainer(attrs={'class': pattern})
+
+
+def parse_html(html, parser=None, regions=None):
+    """
+     Builds the tree of a web page with the configured parser backend.
+     :param regions: classes of the containers to keep, the whole page is parsed if None.
+     :return BeautifulSoup instance.
+    """
+    parser = get_parser(parser)
+    parse_only = None
+    # html5lib always builds the whole tree
+    if regions and parser != 'html5lib':
+        parse_only = get_region_strainer(tuple(regions))
+    return bs4.BeautifulSoup(html, parser, parse_only=parse_only)
+
+
+class SelectorMap(object):
+    """ CSS selectors of a datasource, compiled once and looked up by name. """
+
+    def __init__(self, selectors):
+        self.selectors = dict(selectors)
+        self._compiled = {name: soupsieve.compile(css) for name, css in self.selectors.items()}
+
+    def select(self, root, name):
+        """ :return list of the tags matching the selector under root """
+        if root is None:
+            return []
+        return self._compiled[name].select(root)
+
+    def select_one(self, root, name):
+        """ :return the first tag matching the selector under root, None if there is none """
+        if root is None:
+            return None
+        return self._compiled[name].select_one(root)
+
+    def text(self, root, name):
+        """ :return the stripped text of the first matching tag, None if there is none """
+        tag = self.select_one(root, name)
+        if tag is None:
+            return None
+        return tag.text.strip()
+
+    def attr(self, root, name, attribute):
+        """ :return an attribute of the first matching tag, None if there is none """
+        tag = self.select_one(root, name)
+        if tag is None or not tag.has_attr(attribute):
+            return None
+        return tag[attribute]
@@ -1,5 +1,7 @@
 import settings
-from app.scrapers.base_scraper import BaseScraper
+from app.scrapers.base_scraper import BaseScraper, LIST_PAGE, DETAIL_PAGE
+from app.scrapers.extraction import SelectorMap
+from app.fetchers.resource_policy import ResourcePolicy
 from app.models.apartment_offer import ApartmentOffer
 from app.models.commerce_offer import CommerceOffer
 
@@ -7,12 +9,40 @@ from app.models.commerce_offer import CommerceOffer
 class Pap(BaseScraper):
     """ Pap datasource. """
 
-    def __init__(self):
-        super().__init__()
+    _card_fields = ('id', 'details_url', 'price')
+
+    _selectors = SelectorMap({
+        'next_page': '[class="next"]',
+        'offers': '.search-list-item-alt',
+        'item_title': '.item-title',
+        'price': '.item-title .item-price',
+        'details': '[class="details-item"]',
+        'title': '[class="h1"]',
+        'description': '.item-description p',
+    })
+
+    _page_regions = {
+        LIST_PAGE: ('search-list-item-alt', 'next'),
+        DETAIL_PAGE: ('details-item',),
+    }
+
+    _ready_selectors = {
+        LIST_PAGE: '.search-list-item-alt',
+        DETAIL_PAGE: '.details-item',
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._max_concurrency = settings.pap.PAP_MAX_CONCURRENCY
+        self._requests_per_second = settings.pap.PAP_REQUESTS_PER_SECOND
+        self._page_fetchers = {LIST_PAGE: settings.pap.PAP_LIST_FETCHER, DETAIL_PAGE: settings.pap.PAP_DETAIL_FETCHER}
         self._base_site_url = 'https://www.pap.fr'
         self._base_search_url = 'annonce/location'
         self._page = 1
 
+    def _get_resource_policy(self):
+        return ResourcePolicy.from_settings(settings.pap.PAP_BLOCKED_RESOURCES, settings.pap.PAP_ALLOWED_RESOURCES)
+
     def _get_search_url(self):
         print("Building search URL...")
         if settings.filtering.MIN_PRICE > 0 and settings.filtering.MAX_PRICE == 0:
@@ -37,8 +67,7 @@ class Pap(BaseScraper):
         return url
 
     def _has_next_page(self, root):
-        tags = root.find_all(lambda tag: tag.has_attr('class') and tag['class'] == ['next'])
-        if len(tags) == 0:
+        if self._selectors.select_one(root, 'next_page') is None:
             return False, None
         else:
             self._page += 1
@@ -47,46 +76,37 @@ class Pap(BaseScraper):
             return True, url
 
     def _get_offers(self, root):
-        return root.find_all(lambda tag: tag.has_attr('class') and 'search-list-item-alt' in tag['class'])
+        return self._selectors.select(root, 'offers')
 
 # region fill an offer
     def _get_offer_object(self, r_offer):
-        item_title = r_offer.find(lambda tag: tag.has_attr('class') and 'item-title' in tag['class'])
-        if item_title and item_title.has_attr('href'):
-            url = '/'.join([self._base_site_url, item_title['href']])
-            if 'local-commercial' in url or 'local-d-activite' in url:
+        href = self._selectors.attr(r_offer, 'item_title', 'href')
+        if href is not None:
+            if 'local-commercial' in href or 'local-d-activite' in href:
                 return CommerceOffer()
             else:
                 return ApartmentOffer()
         return ApartmentOffer()
 
     def _is_valid_offer(self, offer, r_offer):
-        item_title = r_offer.find(lambda tag: tag.has_attr('class') and 'item-title' in tag['class'])
-        return item_title and item_title.has_attr('name')
+        return self._selectors.attr(r_offer, 'item_title', 'name') is not None
 
     def _prepare_offer_filling(self, offer, r_offer):
         result = None
-        item_title = r_offer.find(lambda tag: tag.has_attr('class') and 'item-title' in tag['class'])
-        if item_title and item_title.has_attr('href'):
-            href = item_title['href']
-            if href.startswith('/'):
-                href = href[1:]  # Remove leading slash to avoid double slash
-            url = '/'.join([self._base_site_url, href])
+        url = self.get_details_url(offer, r_offer, None)
+        if url is not None:
             offer.details_url = url
-            web_page = self._load_web_page(url)
+            web_page = self._load_web_page(url, DETAIL_PAGE)
             if web_page is not None:
-                res = web_page.find_all(lambda tag: tag.has_attr('class') and tag['class'] == ['details-item'])
-                if res is not None and len(res) > 0:
-                    result = res[0]
+                result = self._selectors.select_one(web_page, 'details')
         return result
 
     def _clean_offer_filling(self, offer, r_offer, payload):
         pass
 
     def get_details_url(self, offer, r_offer, payload):
-        item_title = r_offer.find(lambda tag: tag.has_attr('class') and 'item-title' in tag['class'])
-        if item_title and item_title.has_attr('href'):
-            href = item_title['href']
+        href = self._selectors.attr(r_offer, 'item_title', 'href')
+        if href is not None:
             if href.startswith('/'):
                 href = href[1:]  # Remove leading slash to avoid double slash
             url = '/'.join([self._base_site_url, href])
@@ -94,36 +114,18 @@ class Pap(BaseScraper):
         return None
 
     def get_title(self, offer, r_offer, payload):
-        title = None
-        if payload is not None:
-            res = payload.find_all(lambda tag: tag.has_attr('class') and tag['class'] == ['h1'])
-            if res is not None and len(res) > 0:
-                title = res[0].text.strip()
-        return title
+        return self._selectors.text(payload, 'title')
 
     def get_description(self, offer, r_offer, payload):
-        desc = None
-        if payload is not None:
-            res = payload.find_all(lambda tag: tag.has_attr('class') and 'item-description' in  tag['class'])[0].find_all('p')
-            if res is not None and len(res) > 0:
-                desc = res[0].text
-                desc = desc.strip()
-        return desc
+        return self._selectors.text(payload, 'description')
 
     def get_id(self, offer, r_offer, payload):
-        item_title = r_offer.find(lambda tag: tag.has_attr('class') and 'item-title' in tag['class'])
-        if item_title and item_title.has_attr('name'):
-            return item_title['name']
-        return None
+        return self._selectors.attr(r_offer, 'item_title', 'name')
 
     def get_price(self, offer, r_offer, payload):
-        price = None
-        item_title = r_offer.find(lambda tag: tag.has_attr('class') and 'item-title' in tag['class'])
-        if item_title:
-            res = item_title.find_all(lambda tag: tag.has_attr('class') and 'item-price' in tag['class'])
-            if res is not None and len(res) > 0:
-                price = ''.join(c for c in res[0].text.replace('.','') if c in ['0','1','2','3','4','5','6','7','8','9','0'])
-                price = price.strip()
+        price = self._selectors.text(r_offer, 'price')
+        if price is not None:
+            price = ''.join(c for c in price if c.isdigit()) or None
         return price
 
     def __get_surface_from_field(self, field):
@@ -0,0 +1,157 @@
+import json
+import re
+from urllib.parse import urlencode, urlparse
+
+import settings
+from app.fetchers.base_fetcher import HTTP
+from app.scrapers.base_scraper import LIST_PAGE, DETAIL_PAGE
+from app.scrapers.pap import Pap
+from app.models.apartment_offer import ApartmentOffer
+from app.models.commerce_offer import CommerceOffer
+
+
+# Place id ending the PAP_SEARCH_LOCATION slugs of the website, e.g. paris-75-g439
+PLACE_ID = re.compile(r'g(\d+)$')
+
+# Property types of the web services which are business premises
+COMMERCE_TYPES = ('local-commercial', 'local-activite', 'local-d-activite')
+
+
+class PapApi(Pap):
+    """
+     Pap datasource reading the JSON web services of the mobile app with the plain HTTP client.
+     The results pages give the price, surface and rooms of each ad; its description is read
+     from the ad's resource, unless the results page already holds it.
+    """
+
+    _card_fields = ('id', 'details_url', 'price', 'surface')
+
+    # Searches are ordered by date, unlike the website's
+    _sorted_by_date = True
+
+    # A browser would neither send the device header nor get JSON back
+    _browser_fallback = False
+
+    _page_regions = {}
+
+    _ready_selectors = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._page_fetchers = {LIST_PAGE: HTTP, DETAIL_PAGE: HTTP}
+        self._api_url = settings.pap.PAP_API_URL.rstrip('/')
+        self._page_size = settings.pap.PAP_API_PAGE_SIZE
+        if not settings.pap.PAP_DEVICE_GSF:
+            self.logger.warning("PAP_DEVICE_GSF is not set, the PAP web services are likely to refuse requests")
+
+    def get_datasource_name(self):
+        # Same offers as the html mode, stored under the same name
+        return 'Pap'
+
+    def _get_http_headers(self):
+        return {
+            'X-Device-Gsf': settings.pap.PAP_DEVICE_GSF,
+            'Accept': 'application/hal+json, application/json',
+        }
+
+    def _get_host(self):
+        return urlparse(settings.pap.PAP_API_URL).netloc
+
+    def _get_search_url(self):
+        # Same transaction as the html mode's search
+        params = [('recherche[produit]', self._base_search_url.split('/')[-1])]
+        params.extend(('recherche[typesbien][]', t) for t in settings.pap.PAP_SEARCH_TYPE if t)
+        place = PLACE_ID.search(settings.pap.PAP_SEARCH_LOCATION)
+        if place is not None:
+            params.append(('recherche[geo][ids][]', place.group(1)))
+        if settings.filtering.MIN_PRICE > 0:
+            params.append(('recherche[prix][min]', settings.filtering.MIN_PRICE))
+        if settings.filtering.MAX_PRICE > 0:
+            params.append(('recherche[prix][max]', settings.filtering.MAX_PRICE))
+        if settings.filtering.MIN_SIZE > 0:
+            params.append(('recherche[surface][min]', settings.filtering.MIN_SIZE))
+        params.extend([('order', 'date-desc'), ('size', self._page_size), ('page', self._page)])
+        return '/'.join([self._api_url, 'immobilier/annonces']) + '?' + urlencode(params)
+
+    def _get_ad_url(self, ad_id):
+        return '/'.join([self._api_url, 'immobilier/annonces', str(ad_id)])
+
+    def _parse_page(self, html, page_type):
+        return json.loads(html)
+
+    def _is_well_formed_page(self, root, page_type):
+        if page_type == DETAIL_PAGE:
+            return isinstance(root, dict) and root.get('id') is not None
+        return super()._is_well_formed_page(root, page_type)
+
+    def _has_next_page(self, root):
+        if (root.get('_links') or {}).get('next') is None:
+            return False, None
+        self._page += 1
+        self.logger.info("Next page {}".format(self._page))
+        return True, self._get_search_url()
+
+    def _get_offers(self, root):
+        return (root.get('_embedded') or {}).get('annonce') or []
+
+    def _needs_details_page(self, r_offer):
+        return r_offer.get('texte') is None
+
+    # region fill an offer
+    def _get_offer_object(self, r_offer):
+        if r_offer.get('typebien') in COMMERCE_TYPES:
+            return CommerceOffer()
+        return ApartmentOffer()
+
+    def _is_valid_offer(self, offer, r_offer):
+        return r_offer.get('id') is not None
+
+    def _prepare_offer_filling(self, offer, r_offer):
+        offer.details_url = self.get_details_url(offer, r_offer, None)
+        if not self._needs_details_page(r_offer):
+            return r_offer
+        return self._load_web_page(self._get_ad_url(r_offer['id']), DETAIL_PAGE)
+
+    @staticmethod
+    def __field(r_offer, payload, key):
+        """ :return a field of the ad's resource, or of its results page entry if the resource lacks it """
+        if payload is not None and payload.get(key) is not None:
+            return payload[key]
+        return r_offer.get(key)
+
+    def get_details_url(self, offer, r_offer, payload):
+        return ((r_offer.get('_links') or {}).get('desktop') or {}).get('href')
+
+    def get_title(self, offer, r_offer, payload):
+        title = self.__field(r_offer, payload, 'titre')
+        if title is None and r_offer.get('typebien') is not None:
+            parts = [r_offer['typebien'].replace('-', ' ')]
+            if r_offer.get('nb_pieces'):
+                parts.append("{} pièces".format(r_offer['nb_pieces']))
+            if r_offer.get('surface'):
+                parts.append("{} m²".format(r_offer['surface']))
+            title = ' '.join(parts)
+        return title
+
+    def get_description(self, offer, r_offer, payload):
+        return self.__field(r_offer, payload, 'texte')
+
+    def get_id(self, offer, r_offer, payload):
+        return r_offer['id']
+
+    def get_price(self, offer, r_offer, payload):
+        return r_offer.get('prix')
+
+    def get_surface(self, offer, r_offer, payload):
+        return r_offer.get('surface')
+
+    def get_created_at(self, offer, r_offer, payload):
+        pass
+
+    def get_postal_code(self, offer, r_offer, payload):
+        return self.__field(r_offer, payload, 'code_postal')
+
+    def get_room_count(self, offer, r_offer, payload):
+        return r_offer.get('nb_pieces')
+
+# endregion
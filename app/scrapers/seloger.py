@@ -1,19 +1,64 @@
+import json
+import re
 import settings
 import unicodedata
+from datetime import datetime
 from urllib.parse import urlparse, urlencode
-from app.scrapers.base_scraper import BaseScraper
+from app.scrapers.base_scraper import BaseScraper, LIST_PAGE, DETAIL_PAGE
+from app.scrapers.extraction import SelectorMap
+from app.fetchers.resource_policy import ResourcePolicy
 from app.models.apartment_offer import ApartmentOffer
 from app.models.commerce_offer import CommerceOffer
 
-class SeLoger(BaseScraper):
-    """ SeLoger datasource. """
 
-    def __init__(self):
-        super().__init__()
+# Assignment of the listing state embedded in the results pages, which the site's front-end hydrates
+INITIAL_DATA = re.compile(r'window\[["\']initialData["\']\]\s*=\s*')
+
+class SeLoger(BaseScraper):
+    """
+     SeLoger datasource.
+     Offers are read from the listing state embedded in the results pages, holding all their fields,
+     and from the offer cards and details pages when a page has no readable state.
+    """
+
+    _card_fields = ('id', 'details_url', 'price', 'surface')
+
+    # The search url asks for the newest offers first
+    _sorted_by_date = True
+
+    _selectors = SelectorMap({
+        'next_page': '[class="pagination-next"]',
+        'offers': '.c-pa-list',
+        'link': '.c-pa-link',
+        'price': '.c-pa-cprice',
+        'criterion': '.c-pa-criterion',
+        'details': '.p-detail',
+        'title': '.detail-title',
+        'description': '#js-descriptifBien',
+    })
+
+    _page_regions = {
+        LIST_PAGE: ('c-pa-list', 'pagination-next'),
+        DETAIL_PAGE: ('p-detail',),
+    }
+
+    _ready_selectors = {
+        LIST_PAGE: '.c-pa-list',
+        DETAIL_PAGE: '.p-detail',
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._max_concurrency = settings.seloger.SELOGER_MAX_CONCURRENCY
+        self._requests_per_second = settings.seloger.SELOGER_REQUESTS_PER_SECOND
+        self._page_fetchers = {LIST_PAGE: settings.seloger.SELOGER_LIST_FETCHER, DETAIL_PAGE: settings.seloger.SELOGER_DETAIL_FETCHER}
         self._base_site_url = 'https://www.seloger.com'
         self._base_search_url = 'list.htm'
         self._page = 1
 
+    def _get_resource_policy(self):
+        return ResourcePolicy.from_settings(settings.seloger.SELOGER_BLOCKED_RESOURCES, settings.seloger.SELOGER_ALLOWED_RESOURCES)
+
     def _get_search_url(self):
         params = dict()
         params['qsversion'] = '1.0'
@@ -29,14 +74,15 @@ class SeLoger(BaseScraper):
             params['price'] = "{}/{}".format(settings.filtering.MIN_PRICE, settings.filtering.MAX_PRICE)
         if settings.filtering.MIN_SIZE > 0:
             params['surface'] = "{}/NaN".format(settings.filtering.MIN_SIZE)
+        # Newest first
+        params['sort'] = 'd_dt_crea'
         params['LISTING-LISTpg'] = self._page
         url = '/'.join([self._base_site_url, self._base_search_url])
         url += ('&', '?')[urlparse(url).query == ''] + urlencode(params)
         return url
 
     def _has_next_page(self, root):
-        tags = root.find_all(lambda tag: tag.has_attr('class') and tag['class'] == ['pagination-next'])
-        if len(tags) == 0:
+        if self._selectors.select_one(root, 'next_page') is None:
             return False, None
         else:
             self._page += 1
@@ -44,15 +90,53 @@ class SeLoger(BaseScraper):
             self.logger.info("Next page {}".format(self._page))
             return True, url
 
+    def _parse_page(self, html, page_type):
+        root = super()._parse_page(html, page_type)
+        if page_type == LIST_PAGE:
+            # Read from the raw source, the script being outside of the parsed regions
+            root.listings = self.__extract_listings(html)
+        return root
+
+    def __extract_listings(self, html):
+        """
+         Reads the listings of the state embedded in a results page.
+         :return list of the listing dicts, None if the page has no readable state
+        """
+        match = INITIAL_DATA.search(html)
+        if match is None:
+            return None
+        decoder = json.JSONDecoder()
+        start = match.end()
+        try:
+            if html.startswith('JSON.parse(', start):
+                state, _ = decoder.raw_decode(html, start + len('JSON.parse('))
+                state = json.loads(state)
+            else:
+                state, _ = decoder.raw_decode(html, start)
+            cards = state['cards']['list']
+        except (ValueError, KeyError, TypeError) as e:
+            self.logger.warning("Unreadable page state, reading the offer cards instead: {}".format(str(e)))
+            return None
+        # Advertising and promotion cards are mixed with the offers
+        return [card for card in cards if isinstance(card, dict) and card.get('cardType') == 'classified']
+
     def _get_offers(self, root):
-        return root.find_all(lambda tag: tag.has_attr('class') and 'c-pa-list' in tag['class'])
+        listings = getattr(root, 'listings', None)
+        if listings:
+            return listings
+        return self._selectors.select(root, 'offers')
+
+    def _needs_details_page(self, r_offer):
+        return not isinstance(r_offer, dict)
 
     # region fill an offer
     def _get_offer_object(self, r_offer):
         result = None
-        res = r_offer.find_all(lambda tag: tag.has_attr('class') and 'c-pa-link' in tag['class'])
-        if res is not None and len(res) > 0:
-            type = res[0].text.strip()
+        if isinstance(r_offer, dict):
+            type = r_offer.get('estateType')
+        else:
+            type = self._selectors.text(r_offer, 'link')
+        if type is not None:
             if type == 'Local commercial':
                 result = CommerceOffer()
             else:
@@ -67,56 +151,51 @@ class SeLoger(BaseScraper):
         url = self.get_details_url(offer, r_offer, None)
         if url is not None:
             offer.details_url = url
-            web_page = self._load_web_page(url)
+            if isinstance(r_offer, dict):
+                return r_offer
+            web_page = self._load_web_page(url, DETAIL_PAGE)
             if web_page is not None:
-                res = web_page.find_all(lambda tag: tag.has_attr('class') and 'p-detail' in tag['class'])
-                if res is not None and len(res) > 0:
-                    result = res[0]
+                result = self._selectors.select_one(web_page, 'details')
         return result
 
     def _clean_offer_filling(self, offer, r_offer, payload):
         pass
 
     def get_details_url(self, offer, r_offer, payload):
-        result = None
-        res = r_offer.find_all(lambda tag: tag.has_attr('class') and 'c-pa-link' in tag['class'])
-        if res is not None and len(res) > 0:
-            result = res[0]['href']
-        return result
+        if isinstance(r_offer, dict):
+            return r_offer.get('classifiedURL')
+        return self._selectors.attr(r_offer, 'link', 'href')
 
     def get_title(self, offer, r_offer, payload):
-        title = None
-        if payload is not None:
-            res = payload.find_all(lambda tag: tag.has_attr('class') and 'detail-title' in tag['class'])
-            if res is not None and len(res) > 0:
-                title = res[0].text.strip()
-        return title
+        if isinstance(r_offer, dict):
+            return r_offer.get('title')
+        return self._selectors.text(payload, 'title')
 
     def get_description(self, offer, r_offer, payload):
-        desc = None
-        if payload is not None:
-            res = payload.find_all(lambda tag: tag.has_attr('id') and tag['id'] == 'js-descriptifBien')
-            if res is not None and len(res) > 0:
-                desc = res[0].text
-                desc = desc.strip()
-        return desc
+        if isinstance(r_offer, dict):
+            return r_offer.get('description')
+        return self._selectors.text(payload, 'description')
 
     def get_id(self, offer, r_offer, payload):
+        if isinstance(r_offer, dict):
+            return r_offer.get('id')
         return r_offer['data-publication-id']
 
     def get_price(self, offer, r_offer, payload):
-        price = None
-        res = r_offer.find_all(lambda tag: tag.has_attr('class') and 'c-pa-cprice' in tag['class'])
-        if res is not None and len(res) > 0:
-            price = res[0].text
+        if isinstance(r_offer, dict):
+            return (r_offer.get('pricing') or {}).get('rawPrice')
+        price = self._selectors.text(r_offer, 'price')
+        if price is not None:
             price = unicodedata.normalize("NFKD", price).replace(' ','').replace('€','').strip()
         return price
 
     def get_surface(self, offer, r_offer, payload):
+        if isinstance(r_offer, dict):
+            return r_offer.get('surface')
         surface = None
-        res = r_offer.find_all(lambda tag: tag.has_attr('class') and 'c-pa-criterion' in tag['class'])
-        if res is not None and len(res) > 0:
-            criterions = res[0].children
+        criterion_list = self._selectors.select_one(r_offer, 'criterion')
+        if criterion_list is not None:
+            criterions = criterion_list.children
             for criterion in criterions:
                 if hasattr(criterion, 'text'):
                     index = criterion.text.find('m²')
@@ -126,13 +205,24 @@ class SeLoger(BaseScraper):
         return surface
 
     def get_created_at(self, offer, r_offer, payload):
-        pass
+        if not isinstance(r_offer, dict) or r_offer.get('publicationDate') is None:
+            return None
+        # An unreadable date must not fail the whole crawl
+        try:
+            published = datetime.fromisoformat(r_offer['publicationDate'])
+        except (TypeError, ValueError):
+            self.logger.warning("Unreadable publication date {} of offer {}".format(
+                r_offer['publicationDate'], r_offer.get('id')))
+            return None
+        return int(published.timestamp())
 
     def get_postal_code(self, offer, r_offer, payload):
-        pass
+        if isinstance(r_offer, dict):
+            return r_offer.get('zipCode')
 
     def get_room_count(self, offer, r_offer, payload):
-        pass
+        if isinstance(r_offer, dict):
+            return r_offer.get('rooms')
 
     def get_building_year(self, offer, r_offer, payload):
         pass
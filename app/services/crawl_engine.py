@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from app.fetchers.base_fetcher import LIST_PAGE
+
+
+# Marks the end of the crawl in the queue of iter_offers
+_END = object()
+
+
+class AsyncCrawlEngine(object):
+    """
+     Crawls several datasources at once on an asyncio event loop.
+     Page loads still block, so they run in worker threads, enough of them for every datasource's loads:
+     a slow or throttled site never holds the others back. A load only waits for a token of its host's bucket
+     when the page is actually requested, pages served by the cache or replayed are never rate limited.
+    """
+
+    def __init__(self, scrapers, full_crawl=False):
+        self.logger = logging.getLogger()
+        self.scrapers = scrapers
+        self.full_crawl = full_crawl
+
+    async def crawl(self, on_offer):
+        """
+         Crawls all the datasources concurrently, handing each filled offer to on_offer(datasource, offer)
+         in the order of its results page. A failing datasource does not stop the others.
+         :return dict of the number of offers found per datasource, None for the failed ones
+        """
+        results = await asyncio.gather(*(self._crawl_scraper(scraper, on_offer) for scraper in self.scrapers),
+                                       return_exceptions=True)
+        counts = dict()
+        for scraper, result in zip(self.scrapers, results):
+            datasource = scraper.get_datasource_name()
+            if isinstance(result, Exception):
+                self.logger.error("Crawl of {} failed: {}".format(datasource, str(result)))
+                result = None
+            counts[datasource] = result
+        return counts
+
+    def run(self, on_offer):
+        """
+         Runs crawl() on its own event loop, blocking until all the datasources are crawled.
+         :return dict of the number of offers found per datasource, None for the failed ones
+        """
+        return asyncio.run(self._run(on_offer))
+
+    async def _run(self, on_offer):
+        # Enough threads for every list page and detail page that may be loading or offer being handed off at once
+        workers = sum(scraper._get_detail_concurrency() + 1 for scraper in self.scrapers)
+        executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='crawl')
+        asyncio.get_running_loop().set_default_executor(executor)
+        return await self.crawl(on_offer)
+
+    def iter_offers(self, queue_size=None):
+        """
+         Runs the crawl in a background thread, streaming its offers as pipeline items.
+         :return generator of (datasource name, offer)
+        """
+        if queue_size is None:
+            queue_size = settings.core.PIPELINE_QUEUE_SIZE
+        items = queue.Queue(maxsize=queue_size)
+
+        def target():
+            try:
+                self.run(lambda datasource, offer: items.put((datasource, offer)))
+            finally:
+                items.put(_END)
+
+        thread = threading.Thread(target=target, name='crawl-engine')
+        thread.start()
+        while True:
+            item = items.get()
+            if item is _END:
+                break
+            yield item
+        thread.join()
+
+    async def _crawl_scraper(self, scraper, on_offer):
+        """
+         Walks the results pages of a datasource, loading the details pages of each one concurrently.
+         :return the number of offers found
+        """
+        datasource = scraper.get_datasource_name()
+        incremental = await asyncio.to_thread(scraper._begin_crawl, self.full_crawl)
+        semaphore = asyncio.Semaphore(scraper._get_detail_concurrency())
+        count = 0
+        has_next = True
+        completed = True
+        url = scraper._get_search_url()
+        while has_next:
+            root = await asyncio.to_thread(scraper._load_web_page, url, LIST_PAGE)
+            if root is None:
+                completed = False
+                break
+            has_next, url = scraper._has_next_page(root)
+            candidates = await asyncio.to_thread(scraper._select_candidates, root)
+            fills = [asyncio.ensure_future(self._fill(scraper, semaphore, o, r_offer)) for o, r_offer in candidates]
+            offers = []
+            try:
+                for fill in fills:
+                    offer = await fill
+                    # Details page not loaded, left to the next crawl
+                    if offer is None:
+                        continue
+                    offers.append(offer)
+                    # A slow consumer blocks a worker thread, never the loop and the other datasources
+                    await asyncio.to_thread(on_offer, datasource, offer)
+            finally:
+                for fill in fills:
+                    fill.cancel()
+            count += len(offers)
+            await asyncio.to_thread(scraper._end_page, offers)
+            if incremental and scraper._reached_known_offers():
+                self.logger.info("Reached already known offers of {}, stopping pagination".format(datasource))
+                break
+        await asyncio.to_thread(scraper._end_crawl, incremental, completed)
+        return count
+
+    async def _fill(self, scraper, semaphore, offer, r_offer):
+        if not scraper._needs_details_page(r_offer):
+            return scraper._fill_candidate(offer, r_offer)
+        async with semaphore:
+            return await asyncio.to_thread(scraper._fill_candidate, offer, r_offer)
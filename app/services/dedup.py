@@ -0,0 +1,355 @@
+import logging
+import math
+import random
+import re
+import struct
+import threading
+import unicodedata
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import settings
+from app.services.pipeline import Stage
+
+
+# Number of words of each shingle
+SHINGLE_SIZE = 3
+
+# MinHash signatures are split into BANDS bands of PERMUTATIONS / BANDS values, two offers being
+# compared when any of their bands are equal: likely above a similarity of 0.5, unlikely below 0.2
+PERMUTATIONS = 64
+BANDS = 16
+
+# Mersenne prime the hash permutations are computed modulo
+_PRIME = (1 << 61) - 1
+
+_WORDS = re.compile(r'[a-z0-9]+')
+
+# Postal code of the blocks holding every offer, whatever its postal code, searched by the offers without one
+_ANY_POSTAL_CODE = '*'
+
+
+def normalize(text):
+    """
+     Lowercases a text, strips its accents and punctuation.
+     :return list of its words
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _WORDS.findall(text)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+     Hashes the sequences of consecutive words of a text, the whole text being a single one when it is shorter.
+     :return set(int)
+    """
+    words = normalize(text)
+    if len(words) == 0:
+        return set()
+    if len(words) <= size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))}
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+def pack_signature(signature):
+    """ :return bytes of a signature, as saved in the offer store, None for None """
+    if signature is None:
+        return None
+    return struct.pack('<{}Q'.format(len(signature)), *signature)
+
+
+def unpack_signature(packed):
+    """ :return tuple of a signature saved by pack_signature(), None for None """
+    if packed is None:
+        return None
+    return struct.unpack('<{}Q'.format(len(packed) // 8), packed)
+
+
+class MinHasher(object):
+    """ Computes MinHash signatures, whose share of equal values estimates the Jaccard similarity of two sets. """
+
+    def __init__(self, permutations=PERMUTATIONS, seed=1):
+        rng = random.Random(seed)
+        self.permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(permutations)]
+
+    def signature(self, hashes):
+        """ :return tuple of the minimum of each permutation over the hashes, None for an empty set """
+        if len(hashes) == 0:
+            return None
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self.permutations)
+
+    @staticmethod
+    def similarity(first, second):
+        """ :return the estimated Jaccard similarity of the sets of two signatures """
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class Cluster(object):
+    """ Offers of several datasources found to be the same property. """
+
+    __slots__ = ('members',)
+
+    def __init__(self, member):
+        # (datasource, offer id, details url) of each offer, in the order they were seen
+        self.members = [member]
+
+    @property
+    def datasources(self):
+        return sorted({datasource for datasource, offer_id, url in self.members})
+
+    @property
+    def urls(self):
+        return [url for datasource, offer_id, url in self.members if url is not None]
+
+    def __len__(self):
+        return len(self.members)
+
+
+class DedupIndex(object):
+    """
+     Groups the offers of different datasources listing the same property, one offer at a time.
+     Offers are only compared within their block, of the same postal code and of neighbouring price and surface
+     bands, and only to those sharing a band of their MinHash signature: the number of comparisons stays
+     close to the number of duplicates, whatever the size of the history. An offer without a postal code,
+     as read from some results pages, is compared to the offers of any postal code.
+     With a store, the signatures are computed once per offer and saved, the history being indexed from them.
+    """
+
+    def __init__(self, price_band=None, surface_band=None, threshold=None, hasher=None, bands=BANDS, store=None):
+        """
+         :param store: OfferStore the history is loaded from and the new signatures are saved to
+        """
+        if price_band is None:
+            price_band = settings.core.DEDUP_PRICE_BAND
+        if surface_band is None:
+            surface_band = settings.core.DEDUP_SURFACE_BAND
+        if threshold is None:
+            threshold = settings.core.DEDUP_THRESHOLD
+        if hasher is None:
+            hasher = MinHasher()
+        self.logger = logging.getLogger()
+        self._log_price_band = math.log(1 + price_band)
+        self.surface_band = max(1, surface_band)
+        self.threshold = threshold
+        self.hasher = hasher
+        self.store = store
+        self._rows = len(hasher.permutations) // bands
+        self._bands = bands
+        self._signatures = dict()
+        self._buckets = defaultdict(list)
+        # Union-find of the offers, and the cluster of each root
+        self._parents = dict()
+        self._clusters = dict()
+        # (datasource, offer id, packed signature) computed and not saved yet
+        self._pending = []
+        self._loader = None
+        # Number of signatures compared, for benchmarks
+        self.comparisons = 0
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def add(self, datasource, offer):
+        """
+         Indexes an offer, grouping it with the offers of the other datasources it matches.
+         :return the Cluster the offer joined, None if it matches no other offer
+        """
+        self._wait_loaded()
+        key = (datasource, str(offer.id))
+        if offer.id is None or key in self._signatures:
+            return None
+        signature = self._sign(datasource, offer)
+        return self._index(key, offer, signature, compare=True)
+
+    def load(self, history_days=None, before=None):
+        """
+         Indexes the offers of the store, without comparing them to each other nor reporting their clusters.
+         Signatures are read from the store, only those of the offers never signed being computed and saved.
+         :param history_days: only the offers listed in the last days, DEDUP_HISTORY_DAYS by default, 0 for all
+         :param before: only the offers first seen before then, None for all of them
+         :return the number of offers read
+        """
+        if history_days is None:
+            history_days = settings.core.DEDUP_HISTORY_DAYS
+        seen_since = datetime.now() - timedelta(days=history_days) if history_days > 0 else None
+        count = 0
+        signed = 0
+        for datasource, offer, has_signature, packed in self.store.iter_signatures(seen_since, before):
+            key = (datasource, str(offer.id))
+            if key in self._signatures:
+                continue
+            if has_signature:
+                signature = unpack_signature(packed)
+            else:
+                signature = self._sign(datasource, offer)
+                signed += 1
+            self._index(key, offer, signature, compare=False)
+            count += 1
+        self._save()
+        self.logger.info("Indexed {} offers for deduplication, {} of them signed for the first time"
+                         .format(count, signed))
+        return count
+
+    def load_in_background(self, history_days=None, before=None):
+        """ Runs load() in a background thread, add() and save() waiting for it to be done. """
+        self._loader = threading.Thread(target=self._load_safely, args=(history_days, before), name='dedup-load',
+                                        daemon=True)
+        self._loader.start()
+
+    def save(self):
+        """ Saves the signatures computed since the last call to the store. """
+        self._wait_loaded()
+        self._save()
+
+    def _load_safely(self, history_days, before):
+        try:
+            self.load(history_days, before)
+        except Exception as e:
+            self.logger.error("Failed to load the deduplication history: {}".format(str(e)))
+
+    def _wait_loaded(self):
+        if self._loader is not None:
+            self._loader.join()
+            self._loader = None
+
+    def _save(self):
+        if self.store is None or len(self._pending) == 0:
+            return
+        pending, self._pending = self._pending, []
+        self.store.add_signatures(pending)
+
+    def _sign(self, datasource, offer):
+        """ :return the signature of an offer's title and description, queued to be saved """
+        signature = self.hasher.signature(shingles(' '.join(t for t in (offer.title, offer.description) if t)))
+        if self.store is not None:
+            self._pending.append((datasource, offer.id, pack_signature(signature)))
+        return signature
+
+    def _index(self, key, offer, signature, compare):
+        """ Adds an offer to the buckets, first grouping it with the offers it matches when compare is set. """
+        block = self._get_block(offer)
+        if block is None or signature is None:
+            return None
+        datasource = key[0]
+        self._signatures[key] = signature
+        self._parents[key] = key
+        self._clusters[key] = Cluster((datasource, key[1], offer.details_url))
+        cluster = None
+        if compare:
+            for candidate in self._get_candidates(block, signature, datasource):
+                self.comparisons += 1
+                if self.hasher.similarity(signature, self._signatures[candidate]) >= self.threshold:
+                    cluster = self._union(candidate, key)
+        postal_code, price, surface = block
+        for band, values in self._iter_bands(signature):
+            self._buckets[(block, band, values)].append(key)
+            self._buckets[((_ANY_POSTAL_CODE, price, surface), band, values)].append(key)
+        return cluster
+
+    def get_cluster(self, datasource, offer_id):
+        """ :return the Cluster of an offer, None if it is not indexed """
+        key = (datasource, str(offer_id))
+        if key not in self._parents:
+            return None
+        return self._clusters[self._find(key)]
+
+    def clusters(self):
+        """ :return list of the clusters of more than one offer """
+        return [cluster for cluster in self._clusters.values() if len(cluster) > 1]
+
+    def _get_block(self, offer):
+        """ :return (postal code, price band, surface band) of an offer, None if its price or surface is unknown """
+        if not offer.price or not offer.surface or offer.price <= 0 or offer.surface <= 0:
+            return None
+        return (offer.postal_code, int(math.log(offer.price) / self._log_price_band),
+                int(offer.surface // self.surface_band))
+
+    def _iter_bands(self, signature):
+        for band in range(self._bands):
+            yield band, signature[band * self._rows:(band + 1) * self._rows]
+
+    def _get_candidates(self, block, signature, datasource):
+        """
+         :return set of the keys of the other datasources' offers sharing a band, in the neighbouring blocks
+          of the same postal code and of an unknown one, or of any postal code when the offer's is unknown
+        """
+        postal_code, price, surface = block
+        postal_codes = (None, postal_code) if postal_code is not None else (_ANY_POSTAL_CODE,)
+        candidates = set()
+        for band, values in self._iter_bands(signature):
+            for code in postal_codes:
+                for price_offset in (-1, 0, 1):
+                    for surface_offset in (-1, 0, 1):
+                        bucket = self._buckets.get(((code, price + price_offset, surface + surface_offset),
+                                                    band, values))
+                        if bucket is not None:
+                            candidates.update(k for k in bucket if k[0] != datasource)
+        return candidates
+
+    def _find(self, key):
+        root = key
+        while self._parents[root] != root:
+            root = self._parents[root]
+        while self._parents[key] != root:
+            self._parents[key], key = root, self._parents[key]
+        return root
+
+    def _union(self, older, newer):
+        """ Merges the clusters of two offers, those of the older one staying first. :return the merged Cluster """
+        older, newer = self._find(older), self._find(newer)
+        if older == newer:
+            return self._clusters[older]
+        members = self._clusters[older].members + self._clusters[newer].members
+        # The larger tree becomes the root, keeping the paths short
+        root, child = older, newer
+        if len(self._clusters[older]) < len(self._clusters[newer]):
+            root, child = newer, older
+        self._parents[child] = root
+        del self._clusters[child]
+        self._clusters[root].members = members
+        return self._clusters[root]
+
+
+class DedupStage(Stage):
+    """
+     Drops the offers already listed on another datasource, in this run or a previous one,
+     then reports each cluster found once, with the urls of all its offers.
+    """
+
+    def __init__(self, index, report=None):
+        self.logger = logging.getLogger()
+        self.index = index
+        self.report = report if report is not None else self._log_cluster
+        # (datasource, offer id) of the offers dropped during the run
+        self._dropped = []
+
+    def process(self, item):
+        datasource, offer = item
+        cluster = self.index.add(datasource, offer)
+        if cluster is None:
+            return [item]
+        self._dropped.append((datasource, offer.id))
+        self.logger.debug("Offer {} of {} already listed on {}".format(offer.id, datasource,
+                                                                      ', '.join(cluster.datasources)))
+        return []
+
+    def flush(self):
+        self.index.save()
+        return []
+
+    def close(self):
+        self.index.save()
+        # Looked up at the end, clusters merging as offers come
+        reported = set()
+        for datasource, offer_id in self._dropped:
+            cluster = self.index.get_cluster(datasource, offer_id)
+            if id(cluster) not in reported:
+                reported.add(id(cluster))
+                self.report(cluster)
+
+    def _log_cluster(self, cluster):
+        self.logger.info("Same offer listed on {}: {}".format(', '.join(cluster.datasources), ' '.join(cluster.urls)))
@@ -1,75 +1,173 @@
 import settings
 import re
 
-class Filter:
-    """ Class used to filter out irrelevant offers. """
+from app.models.offer_batch import MISSING
+
+
+class CompiledFilter(object):
+    """ Filter built once from its settings, to evaluate many offers without looking them up again. """
+
+    # Rule names, as reported for the offers they filter out
+    PRICE = 'price'
+    PRICE_PER_SURFACE_UNIT = 'price_per_surface_unit'
+    SURFACE = 'surface'
+    BUILDING_YEAR = 'building_year'
+    POSTAL_CODE = 'postal_code'
+    TITLE = 'title'
+    DESCRIPTION = 'description'
+
+    # Rules which only need the fields available on a result list
+    CARD_RULES = (PRICE, PRICE_PER_SURFACE_UNIT, SURFACE, POSTAL_CODE)
+
+    def __init__(self, max_price=0, min_price_per_surface_unit=0, min_size=0, max_building_year=0,
+                 districts=(), blacklisted_words=()):
+        self.max_price = max_price
+        self.min_price_per_surface_unit = min_price_per_surface_unit
+        self.min_size = min_size
+        self.max_building_year = max_building_year
+        self.districts = frozenset(str(d).strip() for d in districts if str(d).strip())
+        self.blacklist = self._compile_blacklist(blacklisted_words)
+        # Only the rules whose setting is set are evaluated, in this order
+        rules = [
+            (self.PRICE, self._filter_by_price, self.max_price > 0),
+            (self.PRICE_PER_SURFACE_UNIT, self._filter_by_price_per_surface_unit, self.min_price_per_surface_unit > 0),
+            (self.SURFACE, self._filter_by_surface, self.min_size > 0),
+            (self.BUILDING_YEAR, self._filter_by_building_year, self.max_building_year > 0),
+            (self.POSTAL_CODE, self._filter_by_postal_code, len(self.districts) > 0),
+            (self.TITLE, self._filter_by_title, self.blacklist is not None),
+            (self.DESCRIPTION, self._filter_by_description, self.blacklist is not None),
+        ]
+        self._rules = [(name, rule) for name, rule, enabled in rules if enabled]
+        self._card_rules = [(name, rule) for name, rule in self._rules if name in self.CARD_RULES]
+        # Same rules, on the columns of an OfferBatch
+        batch_rules = {
+            self.PRICE: (('price',), lambda p: p != MISSING and p > self.max_price),
+            self.PRICE_PER_SURFACE_UNIT: (('price', 'surface'), lambda p, s: p != MISSING and s != MISSING and s != 0
+                                          and p // s < self.min_price_per_surface_unit),
+            self.SURFACE: (('surface',), lambda s: s != MISSING and s < self.min_size),
+            self.BUILDING_YEAR: (('building_year',), lambda y: y != MISSING and y > self.max_building_year),
+            self.POSTAL_CODE: (('postal_code',), lambda c: c != MISSING and str(c) not in self.districts),
+            self.TITLE: (('title',), lambda t: t is not None and self.blacklist.search(t.lower()) is not None),
+            self.DESCRIPTION: (('description',), lambda d: d is not None and self.blacklist.search(d.lower()) is not None),
+        }
+        self._batch_rules = [(name,) + batch_rules[name] for name, rule in self._rules]
+
+    @classmethod
+    def from_settings(cls):
+        """ Builds the filter from the filtering settings. """
+        return cls(max_price=settings.filtering.MAX_PRICE,
+                   min_price_per_surface_unit=settings.filtering.MIN_PRICE_PER_SURFACE_UNIT,
+                   min_size=settings.filtering.MIN_SIZE,
+                   max_building_year=settings.filtering.MAX_BUILDING_YEAR,
+                   districts=settings.filtering.DISTRICTS,
+                   blacklisted_words=settings.filtering.BLACKLISTED_WORDS)
 
     @staticmethod
-    def apply(o):
+    def _compile_blacklist(words):
+        """
+         Builds a single regex matching any blacklisted word or phrase as whole words.
+         :return compiled pattern, None if there is no blacklisted word
+        """
+        words = sorted({w.strip().lower() for w in words if w and w.strip()}, key=len, reverse=True)
+        if len(words) == 0:
+            return None
+        alternation = '|'.join(r'\s+'.join(re.escape(part) for part in w.split()) for w in words)
+        return re.compile(r"(?<![\w'])(?:{})(?![\w'])".format(alternation))
+
+    def apply(self, o):
         """
          Applies filters on the offer.
-         :param o: The Offer object on which to apply filtering.
-         :return True is the offer must be filtered out, False otherwise.
+         :param o: The Offer object, or any object with the same attributes, on which to apply filtering.
+         :return the name of the rule filtering the offer out, None if the offer must be kept.
         """
-        should_be_filtered = False
-        if Filter._filter_by_price(o) \
-            or Filter._filter_by_price_per_surface_unit(o) \
-            or Filter._filter_by_surface(o) \
-            or Filter._filter_by_building_year(o) \
-            or Filter._filter_by_postal_code(o) \
-            or Filter._filter_by_title(o) \
-            or Filter._filter_by_description(o):
-            should_be_filtered = True
-        return should_be_filtered
+        for name, rule in self._rules:
+            if rule(o):
+                return name
+        return None
 
-    @staticmethod
-    def _filter_by_price(o):
-        if o.price is None:
-            return False
-        return o.price > settings.filtering.MAX_PRICE
+    def apply_card(self, o):
+        """
+         Applies the filters which only need the fields available on a result list.
+         Fields which are not known yet never filter an offer out.
+         :return the name of the rule filtering the offer out, None if the offer must be kept.
+        """
+        for name, rule in self._card_rules:
+            if rule(o):
+                return name
+        return None
 
-    @staticmethod
-    def _filter_by_price_per_surface_unit(o):
-        return o.price_per_surface_unit() < settings.filtering.MIN_PRICE_PER_SURFACE_UNIT
+    def apply_many(self, offers):
+        """
+         Applies filters on a whole page, or history, of offers.
+         :return list of the rule names filtering each offer out, None for the offers to keep.
+        """
+        rules = self._rules
+        results = []
+        for o in offers:
+            rejected_by = None
+            for name, rule in rules:
+                if rule(o):
+                    rejected_by = name
+                    break
+            results.append(rejected_by)
+        return results
 
-    @staticmethod
-    def _filter_by_surface(o):
-        if o.surface is None:
-            return False
-        return o.surface < settings.filtering.MIN_SIZE
+    def apply_batch(self, batch):
+        """
+         Applies filters column by column on an OfferBatch, without building any offer object.
+         :return list of the rule names filtering each offer out, None for the offers to keep.
+        """
+        results = [None] * len(batch)
+        for name, fields, predicate in self._batch_rules:
+            columns = [batch.column(field) for field in fields]
+            for index, values in enumerate(zip(*columns)):
+                if results[index] is None and predicate(*values):
+                    results[index] = name
+        return results
 
-    @staticmethod
-    def _filter_by_building_year(o):
-        if o.building_year is None:
-            return False
-        return o.building_year > settings.filtering.MAX_BUILDING_YEAR
+    def _filter_by_price(self, o):
+        return o.price is not None and o.price > self.max_price
 
-    @staticmethod
-    def _filter_by_postal_code(o):
-        if o.postal_code is None:
+    def _filter_by_price_per_surface_unit(self, o):
+        if o.price is None or not o.surface:
             return False
-        found = False
-        for district in settings.filtering.DISTRICTS:
-            if o.postal_code == district:
-                found = True
-        return not found
+        return o.price // o.surface < self.min_price_per_surface_unit
+
+    def _filter_by_surface(self, o):
+        return o.surface is not None and o.surface < self.min_size
+
+    def _filter_by_building_year(self, o):
+        building_year = getattr(o, 'building_year', None)
+        return building_year is not None and building_year > self.max_building_year
+
+    def _filter_by_postal_code(self, o):
+        return o.postal_code is not None and str(o.postal_code) not in self.districts
+
+    def _filter_by_title(self, o):
+        return o.title is not None and self.blacklist.search(o.title.lower()) is not None
+
+    def _filter_by_description(self, o):
+        return o.description is not None and self.blacklist.search(o.description.lower()) is not None
+
+
+class Filter:
+    """ Class used to filter out irrelevant offers, according to the current settings. """
 
     @staticmethod
-    def _filter_by_title(o):
-        if o.title is not None:
-            title = re.findall(r"[\w']+|[.,!?;]", o.title.lower())
-            for word in settings.filtering.BLACKLISTED_WORDS:
-                w = word.lower()
-                if w in title:
-                    return True
-        return False
+    def apply(o):
+        """
+         Applies filters on the offer.
+         :param o: The Offer object on which to apply filtering.
+         :return True is the offer must be filtered out, False otherwise.
+        """
+        return CompiledFilter.from_settings().apply(o) is not None
 
     @staticmethod
-    def _filter_by_description(o):
-        if o.description is not None:
-            desc = re.findall(r"[\w']+|[.,!?;]", o.description.lower())
-            for word in settings.filtering.BLACKLISTED_WORDS:
-                w = word.lower()
-                if w in desc:
-                    return True
-        return False
+    def apply_card(o):
+        """
+         Applies the filters which only need the fields available on a result list.
+         Fields which are not known yet never filter an offer out.
+         :param o: The Offer object on which to apply filtering.
+         :return True is the offer must be filtered out, False otherwise.
+        """
+        return CompiledFilter.from_settings().apply_card(o) is not None
@@ -0,0 +1,141 @@
+import logging
+import queue
+import threading
+
+import settings
+
+
+# Marks the end of the stream in the queues between stages
+_END = object()
+
+
+class Stage(object):
+    """ Abstract step of the pipeline, receiving (datasource, offer) items one at a time. """
+
+    def process(self, item):
+        """
+         Handles an item.
+         :return list of the items passed to the next stage, empty to drop the item
+        """
+        return [item]
+
+    def flush(self):
+        """
+         Called when no item is waiting, and at the end of the stream, for stages buffering items.
+         :return list of the items passed to the next stage
+        """
+        return []
+
+    def close(self):
+        """ Called once the stream is over. """
+        pass
+
+
+class FilterStage(Stage):
+    """ Drops the offers rejected by a CompiledFilter. """
+
+    def __init__(self, offer_filter):
+        self.logger = logging.getLogger()
+        self.offer_filter = offer_filter
+
+    def process(self, item):
+        datasource, offer = item
+        rule = self.offer_filter.apply(offer)
+        if rule is not None:
+            self.logger.debug("Offer {} of {} filtered out by its {}".format(offer.id, datasource, rule))
+            return []
+        return [item]
+
+
+class NotifyStage(Stage):
+    """ Hands each offer to a notify(datasource, offer) callable. """
+
+    def __init__(self, notify):
+        self.notify = notify
+
+    def process(self, item):
+        self.notify(*item)
+        return [item]
+
+
+class Pipeline(object):
+    """
+     Streams offers through stages, each running in its own thread and connected by bounded queues,
+     so that offers are filtered, deduplicated and notified while the next pages are still loading.
+    """
+
+    def __init__(self, stages, queue_size=None):
+        self.logger = logging.getLogger()
+        if queue_size is None:
+            queue_size = settings.core.PIPELINE_QUEUE_SIZE
+        self.stages = stages
+        self.queue_size = queue_size
+        self._errors = []
+
+    def run(self, source):
+        """
+         Streams the (datasource, offer) items of source through the stages, blocking until all are processed.
+         :return the number of items which went through the last stage
+        """
+        self._errors = []
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._produce, args=(source, queues[0]), name='pipeline-source')]
+        for index, stage in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._consume, args=(stage, queues[index], queues[index + 1]),
+                                            name='pipeline-{}'.format(stage.__class__.__name__)))
+        for thread in threads:
+            thread.start()
+        count = 0
+        while queues[-1].get() is not _END:
+            count += 1
+        for thread in threads:
+            thread.join()
+        if len(self._errors) > 0:
+            raise self._errors[0]
+        return count
+
+    def _produce(self, source, outbox):
+        try:
+            for item in source:
+                outbox.put(item)
+        except Exception as e:
+            self.logger.error("Pipeline source failed: {}".format(str(e)))
+            self._errors.append(e)
+        finally:
+            outbox.put(_END)
+
+    def _consume(self, stage, inbox, outbox):
+        failed = False
+        while True:
+            try:
+                if inbox.empty() and not failed:
+                    self._put_all(outbox, stage.flush())
+                item = inbox.get()
+                if item is _END:
+                    if not failed:
+                        self._put_all(outbox, stage.flush())
+                        stage.close()
+                    break
+                if not failed:
+                    self._put_all(outbox, stage.process(item))
+            except Exception as e:
+                # Keeps draining the input so that upstream stages never block
+                self.logger.error("Pipeline stage {} failed: {}".format(stage.__class__.__name__, str(e)))
+                self._errors.append(e)
+                failed = True
+        outbox.put(_END)
+
+    @staticmethod
+    def _put_all(outbox, items):
+        for item in items:
+            outbox.put(item)
+
+
+def scraper_source(scraper, full_crawl=False):
+    """
+     Streams the offers of a datasource as pipeline items.
+     :return generator of (datasource name, offer)
+    """
+    datasource = scraper.get_datasource_name()
+    for offer in scraper._next_offer(full_crawl):
+        yield datasource, offer
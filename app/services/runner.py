@@ -0,0 +1,203 @@
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+import settings
+from app.scrapers.bienici import BienIci
+from app.scrapers.bienici_api import BienIciApi
+from app.scrapers.pap import Pap
+from app.scrapers.pap_api import PapApi
+from app.scrapers.seloger import SeLoger
+from app.services.crawl_engine import AsyncCrawlEngine
+from app.storage.offer_store import OfferStore
+from app.utils import logger as log
+
+
+def _pap(**kwargs):
+    """ Pap scraper of the mode set by PAP_MODE. """
+    if settings.pap.PAP_MODE == 'api':
+        return PapApi(**kwargs)
+    return Pap(**kwargs)
+
+
+def _bienici(**kwargs):
+    """ BienIci scraper of the mode set by BIENICI_MODE. """
+    if settings.bienici.BIENICI_MODE == 'api':
+        return BienIciApi(**kwargs)
+    return BienIci(**kwargs)
+
+
+# Scraper factory of each datasource, by the name used in ENABLED_SOURCES
+SOURCES = {
+    'pap': _pap,
+    'seloger': SeLoger,
+    'bienici': _bienici,
+}
+
+# Outcome of each datasource, as recorded in MultiSourceRunner.results
+DONE = 'done'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+
+# Kinds of the messages sent by the worker processes
+_OFFER = 'offer'
+_DONE = 'done'
+_ERROR = 'error'
+
+# Marks the end of a datasource in the merged queue
+_END = object()
+
+# Seconds a stopped worker is given to close its browsers before its process group is killed
+STOP_GRACE_PERIOD = 5
+
+
+def _crawl_source(source, factory, outbox, full_crawl, database_url, init_logging):
+    """
+     Worker process: crawls a single datasource, sending its offers to the parent process.
+     It leads its own process group, holding the chromedriver and Chrome processes it starts,
+     so that the runner can stop them all.
+    """
+    os.setpgid(0, 0)
+    # Spawned workers start from a fresh interpreter, without the parent's log handlers
+    if init_logging:
+        log.init_logging()
+    # Stopped by the runner: closes the browsers on the way out
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    scraper = None
+    try:
+        scraper = factory(offer_store=OfferStore(database_url))
+        engine = AsyncCrawlEngine([scraper], full_crawl=full_crawl)
+        counts = engine.run(lambda datasource, offer: outbox.put((_OFFER, (datasource, offer))))
+        count = counts[scraper.get_datasource_name()]
+        if count is None:
+            outbox.put((_ERROR, "crawl of {} failed".format(source)))
+        else:
+            outbox.put((_DONE, count))
+    except Exception as e:
+        outbox.put((_ERROR, str(e)))
+    finally:
+        if scraper is not None:
+            scraper.close()
+
+
+def _stop(process, terminate):
+    """
+     Waits for a worker process to exit, first asking it to stop when terminate is set,
+     then kills whatever is left of its process group, such as its browsers.
+    """
+    if terminate:
+        process.terminate()
+    process.join(STOP_GRACE_PERIOD)
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    process.join(STOP_GRACE_PERIOD)
+
+
+class MultiSourceRunner(object):
+    """
+     Crawls each datasource in its own worker process, with its own browser, merging their offers
+     into a single stream. A datasource failing or running over its timeout does not affect the others,
+     so a cycle lasts as long as its slowest datasource rather than the sum of them.
+    """
+
+    def __init__(self, sources=None, timeout=None, full_crawl=False, database_url=None, queue_size=None):
+        """
+         :param sources: names of the datasources to crawl, or dict of their scraper factories by name,
+          ENABLED_SOURCES by default
+         :param timeout: seconds after which a datasource's worker is stopped, SOURCE_TIMEOUT by default
+        """
+        self.logger = logging.getLogger()
+        if sources is None:
+            sources = settings.core.ENABLED_SOURCES
+        if not isinstance(sources, dict):
+            unknown = [name for name in sources if name not in SOURCES]
+            if len(unknown) > 0:
+                raise ValueError("Unknown datasources: {}".format(', '.join(unknown)))
+            sources = {name: SOURCES[name] for name in sources}
+        if timeout is None:
+            timeout = settings.core.SOURCE_TIMEOUT
+        if queue_size is None:
+            queue_size = settings.core.PIPELINE_QUEUE_SIZE
+        self.sources = sources
+        self.timeout = timeout
+        self.full_crawl = full_crawl
+        self.database_url = database_url
+        self.queue_size = queue_size
+        # Outcome of each datasource of the last run: (DONE, offer count), (FAILED, message) or (TIMEOUT, None)
+        self.results = dict()
+
+    def iter_offers(self):
+        """
+         Starts a worker process per datasource and streams their offers as they come.
+         :return generator of (datasource name, offer)
+        """
+        self.results = dict()
+        # Spawned rather than forked: a fork would copy the parent's threads, locks and open connections,
+        # such as the pipeline's or the dedup loader's, in whatever state they are in
+        context = multiprocessing.get_context('spawn')
+        init_logging = len(logging.getLogger().handlers) > 0
+        merged = queue.Queue(maxsize=self.queue_size)
+        watchers = []
+        for source, factory in self.sources.items():
+            inbox = context.Queue(maxsize=self.queue_size)
+            process = context.Process(target=_crawl_source, name='crawl-{}'.format(source), daemon=True,
+                                      args=(source, factory, inbox, self.full_crawl, self.database_url, init_logging))
+            process.start()
+            watcher = threading.Thread(target=self._watch, args=(source, process, inbox, merged),
+                                       name='watch-{}'.format(source))
+            watcher.start()
+            watchers.append(watcher)
+        running = len(watchers)
+        while running > 0:
+            item = merged.get()
+            if item is _END:
+                running -= 1
+                continue
+            yield item
+        for watcher in watchers:
+            watcher.join()
+
+    def _watch(self, source, process, inbox, merged):
+        """ Forwards the offers of a worker process until it is done, fails or runs over its timeout. """
+        deadline = time.monotonic() + self.timeout
+        terminate = True
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.logger.error("{} did not finish within {}s, stopping it".format(source, self.timeout))
+                    self.results[source] = (TIMEOUT, None)
+                    break
+                try:
+                    kind, payload = inbox.get(timeout=min(remaining, 1))
+                except queue.Empty:
+                    if not process.is_alive():
+                        message = "worker exited with code {}".format(process.exitcode)
+                        self.logger.error("{} failed: {}".format(source, message))
+                        self.results[source] = (FAILED, message)
+                        break
+                    continue
+                if kind == _OFFER:
+                    merged.put(payload)
+                elif kind == _DONE:
+                    self.results[source] = (DONE, payload)
+                    terminate = False
+                    break
+                else:
+                    self.logger.error("{} failed: {}".format(source, payload))
+                    self.results[source] = (FAILED, payload)
+                    terminate = False
+                    break
+        except Exception as e:
+            self.logger.error("Lost track of {}: {}".format(source, str(e)))
+            self.results[source] = (FAILED, str(e))
+        finally:
+            _stop(process, terminate)
+            merged.put(_END)
@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+
+import requests
+
+import settings
+from app.utils.rate_limit import TokenBucket
+
+
+# Outcomes of posting a message
+SENT = 'sent'
+RETRY = 'retry'
+REJECTED = 'rejected'
+PAUSED = 'paused'
+
+# Slack errors which no retry fixes until the settings are
+CONFIGURATION_ERRORS = ('not_authed', 'invalid_auth', 'account_inactive', 'token_revoked', 'token_expired',
+                        'channel_not_found', 'not_in_channel', 'is_archived', 'missing_scope')
+
+# Longest wait between two attempts after failures, in seconds
+MAX_BACKOFF = 60
+
+
+def _escape(text):
+    """ Escapes the characters Slack's mrkdwn gives a meaning to. """
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def offer_entry(datasource, offer):
+    """ :return dict of the fields of an offer shown in its notification """
+    return {
+        'datasource': datasource,
+        'id': offer.id,
+        'title': offer.title,
+        'price': offer.price,
+        'surface': offer.surface,
+        'postal_code': offer.postal_code,
+        'url': offer.details_url,
+    }
+
+
+def build_blocks(entries):
+    """ :return list of the Slack blocks of a message listing several offers """
+    title = "{} nouvelle offre".format(len(entries)) if len(entries) == 1 \
+        else "{} nouvelles offres".format(len(entries))
+    blocks = [{'type': 'header', 'text': {'type': 'plain_text', 'text': title}}]
+    for entry in entries:
+        name = _escape(entry.get('title') or 'Offre {}'.format(entry.get('id')))
+        if entry.get('url'):
+            name = "<{}|{}>".format(entry['url'], name)
+        details = [entry.get('datasource')]
+        if entry.get('price') is not None:
+            details.append("{:,} €".format(entry['price']).replace(',', ' '))
+        if entry.get('surface') is not None:
+            details.append("{} m²".format(entry['surface']))
+        if entry.get('price') and entry.get('surface'):
+            details.append("{:,} €/m²".format(int(entry['price'] / entry['surface'])).replace(',', ' '))
+        if entry.get('postal_code') is not None:
+            details.append(str(entry['postal_code']))
+        text = "*{}*\n{}".format(name, ' · '.join(_escape(d) for d in details if d))
+        blocks.append({'type': 'section', 'text': {'type': 'mrkdwn', 'text': text}})
+    return blocks
+
+
+class SlackNotifier(object):
+    """
+     Posts the notified offers to a Slack channel from a background thread, several offers per message.
+     Offers first go to a persistent outbox, and are only removed from it once Slack accepted them:
+     notify() never waits on the network, and the offers a run could not deliver are sent by the next one.
+     Messages are rate limited, waiting as long as Slack asks after a 429, and retried with a growing
+     delay after network and server errors.
+    """
+
+    def __init__(self, store, token=None, channel=None, bot_name=None, bot_icon=None, api_url=None,
+                 batch_size=None, batch_delay=None, requests_per_second=None, session=None):
+        """
+         :param store: OfferStore holding the outbox
+        """
+        self.logger = logging.getLogger()
+        self.store = store
+        self.token = token if token is not None else settings.slack.SLACK_BOT_TOKEN
+        self.channel = channel if channel is not None else settings.slack.SLACK_CHANNEL
+        self.bot_name = bot_name if bot_name is not None else settings.slack.SLACK_BOT_NAME
+        self.bot_icon = bot_icon if bot_icon is not None else settings.slack.SLACK_BOT_ICON
+        api_url = api_url if api_url is not None else settings.slack.SLACK_API_URL
+        self.url = '/'.join([api_url.rstrip('/'), 'chat.postMessage'])
+        self.batch_size = max(1, batch_size if batch_size is not None else settings.slack.SLACK_BATCH_SIZE)
+        self.batch_delay = batch_delay if batch_delay is not None else settings.slack.SLACK_BATCH_DELAY
+        if requests_per_second is None:
+            requests_per_second = settings.slack.SLACK_REQUESTS_PER_SECOND
+        self._bucket = TokenBucket(requests_per_second) if requests_per_second > 0 else None
+        if session is None:
+            session = requests.Session()
+        self.session = session
+        self.session.headers.update({'Authorization': 'Bearer {}'.format(self.token)})
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._deadline = None
+        self._paused = False
+        # Number of messages Slack accepted
+        self.sent = 0
+        # Offers left by the previous runs are sent right away
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name='slack-notifier', daemon=True)
+        self._thread.start()
+
+    def notify(self, datasource, offer):
+        """ Queues an offer, to be sent with the next message. """
+        self.store.add_notifications(self.channel, [offer_entry(datasource, offer)])
+        self._wakeup.set()
+
+    def close(self, timeout=None):
+        """ Sends the queued offers for up to timeout seconds, SLACK_FLUSH_TIMEOUT by default, then stops. """
+        if timeout is None:
+            timeout = settings.slack.SLACK_FLUSH_TIMEOUT
+        self._deadline = time.monotonic() + timeout
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout + 1)
+        self.session.close()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # Gives the offers of a same page the time to join a single message
+            if not self._stop.is_set():
+                self._stop.wait(self.batch_delay)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                self.logger.error("Slack notifier failed: {}".format(str(e)))
+            if self._stop.is_set():
+                break
+
+    def _drain(self):
+        """ Sends the outbox by messages of batch_size offers, until it is empty, paused or past the deadline. """
+        attempt = 0
+        while not self._paused:
+            rows = self.store.get_notifications(self.channel, self.batch_size)
+            if len(rows) == 0:
+                return
+            if self._bucket is not None:
+                self._bucket.acquire()
+            outcome, retry_after = self._post([entry for _, entry in rows])
+            if outcome in (SENT, REJECTED):
+                self.store.remove_notifications([row_id for row_id, _ in rows])
+                attempt = 0
+                continue
+            if outcome == PAUSED:
+                self._paused = True
+                return
+            attempt += 1
+            delay = retry_after if retry_after is not None else min(2 ** (attempt - 1), MAX_BACKOFF)
+            self.logger.warning("Slack message not sent, retrying in {}s".format(delay))
+            if not self._wait(delay):
+                self.logger.warning("Slack messages not sent in time, their offers are kept for the next run")
+                return
+
+    def _wait(self, seconds):
+        """
+         Sleeps between two attempts, no later than the deadline once closing.
+         :return False when the deadline is reached
+        """
+        if self._deadline is None:
+            # Cut short by close(), to retry right away
+            self._stop.wait(seconds)
+            return True
+        remaining = self._deadline - time.monotonic()
+        if remaining <= seconds:
+            return False
+        time.sleep(seconds)
+        return True
+
+    def _get_message(self, entries):
+        blocks = build_blocks(entries)
+        message = {
+            'channel': self.channel,
+            'username': self.bot_name,
+            # Shown by the notifications of the clients not rendering blocks
+            'text': blocks[0]['text']['text'],
+            'blocks': blocks,
+            'unfurl_links': False,
+        }
+        if self.bot_icon.startswith(':'):
+            message['icon_emoji'] = self.bot_icon
+        elif self.bot_icon:
+            message['icon_url'] = self.bot_icon
+        return message
+
+    def _post(self, entries):
+        """
+         Posts a message listing the entries.
+         :return (SENT, REJECTED, PAUSED or RETRY, seconds Slack asked to wait before retrying or None)
+        """
+        try:
+            response = self.session.post(self.url, json=self._get_message(entries), timeout=30)
+        except requests.RequestException as e:
+            self.logger.error("Slack request failed: {}".format(str(e)))
+            return RETRY, None
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            return RETRY, float(retry_after) if retry_after else 1
+        if response.status_code >= 500:
+            self.logger.error("Slack answered HTTP {}".format(response.status_code))
+            return RETRY, None
+        if response.status_code in (401, 403):
+            self.logger.error("Slack refused the bot token, keeping the offers in the outbox")
+            return PAUSED, None
+        try:
+            body = response.json()
+        except ValueError:
+            body = {'ok': False, 'error': 'HTTP {}'.format(response.status_code)}
+        if body.get('ok'):
+            self.sent += 1
+            return SENT, None
+        error = body.get('error')
+        if error == 'ratelimited':
+            return RETRY, 1
+        if error in CONFIGURATION_ERRORS:
+            self.logger.error("Slack error {}, keeping the offers in the outbox until the settings are fixed"
+                              .format(error))
+            return PAUSED, None
+        self.logger.error("Slack rejected a message of {} offers: {}".format(len(entries), error))
+        return REJECTED, None
@@ -0,0 +1,5 @@
+
+from . import database
+from . import offer_store
+
+__all__ = ["database", "offer_store"]
@@ -0,0 +1,113 @@
+from sqlalchemy import MetaData, Table, Column, String, Integer, Float, Text, DateTime, LargeBinary, PrimaryKeyConstraint, Index
+from sqlalchemy import create_engine, event
+
+import settings
+
+
+metadata = MetaData()
+
+# Every offer seen on a result list, keyed by its datasource and its id on that datasource
+offers = Table(
+    'offers', metadata,
+    Column('datasource', String(32), nullable=False),
+    Column('offer_id', String(64), nullable=False),
+    Column('details_url', Text),
+    Column('title', Text),
+    Column('description', Text),
+    Column('price', Integer),
+    Column('surface', Integer),
+    Column('postal_code', Integer),
+    Column('first_seen_at', DateTime, nullable=False),
+    Column('last_seen_at', DateTime, nullable=False),
+    # Lookups by (datasource, offer_id) use the primary key, these back the filters on the stored offers
+    PrimaryKeyConstraint('datasource', 'offer_id', name='pk_offers'),
+    Index('ix_offers_postal_code', 'postal_code'),
+    Index('ix_offers_price', 'price'),
+)
+
+# Prices observed for each offer, one row when it is first seen and one per change, never updated.
+# The latest price stays in offers.price, which each observation is compared to.
+price_history = Table(
+    'price_history', metadata,
+    Column('datasource', String(32), nullable=False),
+    Column('offer_id', String(64), nullable=False),
+    Column('observed_at', DateTime, nullable=False),
+    Column('price', Integer, nullable=False),
+    # Price before the change, so that drops are found without looking up the previous row
+    Column('previous_price', Integer),
+    Index('ix_price_history_offer', 'datasource', 'offer_id', 'observed_at'),
+    Index('ix_price_history_observed_at', 'observed_at'),
+)
+
+# MinHash signature of the title and description of each offer, computed once for the cross-datasource deduplication
+offer_signatures = Table(
+    'offer_signatures', metadata,
+    Column('datasource', String(32), nullable=False),
+    Column('offer_id', String(64), nullable=False),
+    # Packed signature, NULL for an offer without any text to compare
+    Column('signature', LargeBinary),
+    PrimaryKeyConstraint('datasource', 'offer_id', name='pk_offer_signatures'),
+)
+
+# Incremental crawl state of each datasource
+crawl_state = Table(
+    'crawl_state', metadata,
+    Column('datasource', String(32), primary_key=True),
+    # Newest offer of the last completed crawl, results being sorted by date
+    Column('watermark_offer_id', String(64)),
+    Column('last_crawl_at', DateTime),
+    Column('last_full_crawl_at', DateTime),
+)
+
+# Adaptive request delay of each datasource, and the responses it was adjusted on
+politeness_state = Table(
+    'politeness_state', metadata,
+    Column('datasource', String(32), primary_key=True),
+    Column('delay', Float, nullable=False),
+    Column('successes', Integer, nullable=False, default=0),
+    Column('empty_pages', Integer, nullable=False, default=0),
+    Column('blocks', Integer, nullable=False, default=0),
+    Column('timeouts', Integer, nullable=False, default=0),
+    Column('updated_at', DateTime),
+)
+
+# Notifications waiting to be sent, kept across runs until they are delivered
+notification_outbox = Table(
+    'notification_outbox', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('channel', String(80), nullable=False, index=True),
+    # JSON of the notified offer
+    Column('payload', Text, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+)
+
+
+def get_engine(url=None):
+    """
+     Creates an engine on the given database, or on DATABASE_URL, and creates the missing tables and indexes.
+     SQLite databases are switched to write-ahead logging.
+     :return sqlalchemy Engine instance.
+    """
+    if url is None:
+        url = settings.core.DATABASE_URL
+    engine = create_engine(url)
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _configure_sqlite)
+    metadata.create_all(engine)
+    # create_all skips the indexes added to tables which already exist
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    return engine
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """
+     Write-ahead logging lets the crawl write while the pipeline reads, and commits without syncing
+     the database file each time: the few last transactions may be lost on a power cut, never corrupted.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
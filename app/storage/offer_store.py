@@ -0,0 +1,302 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete, bindparam, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.offer_batch import OfferRow
+from app.storage.database import get_engine, offers, crawl_state, politeness_state, notification_outbox,\
+    price_history, offer_signatures
+
+
+# Insert statement of the dialects supporting INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Fields of a known offer updated by a new write, unless it is unknown there.
+# Prices only change through record_prices(), which keeps their history.
+_UPSERT_COLUMNS = ('details_url', 'title', 'description', 'surface', 'postal_code')
+
+
+class OfferStore(object):
+    """ Persistent store of the offers already seen, indexed by (datasource, id). """
+
+    # Maximum number of ids sent in a single IN clause
+    _CHUNK_SIZE = 500
+
+    def __init__(self, url=None, engine=None):
+        if engine is None:
+            engine = get_engine(url)
+        self.engine = engine
+        # Built once, so that its compiled form is reused by every page
+        self._upsert = self._build_upsert(engine.dialect.name)
+
+    @staticmethod
+    def _build_upsert(dialect):
+        """ :return the bulk upsert statement of the offers, None if the dialect has no ON CONFLICT clause """
+        if dialect not in _UPSERT_DIALECTS:
+            return None
+        statement = _UPSERT_DIALECTS[dialect](offers)
+        values = {name: func.coalesce(statement.excluded[name], offers.c[name]) for name in _UPSERT_COLUMNS}
+        values['last_seen_at'] = statement.excluded.last_seen_at
+        return statement.on_conflict_do_update(index_elements=[offers.c.datasource, offers.c.offer_id], set_=values)
+
+    def known_ids(self, datasource, ids):
+        """
+         Looks up which of the given offer ids are already stored.
+         :return set(string) of known ids
+        """
+        with self.engine.connect() as conn:
+            return self._select_known_ids(conn, datasource, ids)
+
+    def _select_known_ids(self, conn, datasource, ids):
+        ids = [str(i) for i in ids if i is not None]
+        known = set()
+        for start in range(0, len(ids), self._CHUNK_SIZE):
+            chunk = ids[start:start + self._CHUNK_SIZE]
+            query = select(offers.c.offer_id).where(offers.c.datasource == datasource,
+                                                     offers.c.offer_id.in_(chunk))
+            known.update(row[0] for row in conn.execute(query))
+        return known
+
+    def contains(self, datasource, offer_id):
+        return str(offer_id) in self.known_ids(datasource, [offer_id])
+
+    def touch(self, datasource, ids):
+        """ Records that the given known offers are still listed. """
+        ids = [str(i) for i in ids if i is not None]
+        if len(ids) == 0:
+            return
+        now = datetime.now()
+        with self.engine.begin() as conn:
+            for start in range(0, len(ids), self._CHUNK_SIZE):
+                chunk = ids[start:start + self._CHUNK_SIZE]
+                conn.execute(update(offers)
+                             .where(offers.c.datasource == datasource, offers.c.offer_id.in_(chunk))
+                             .values(last_seen_at=now))
+
+    def add_many(self, datasource, new_offers):
+        """
+         Stores a page of offers, offer objects or rows of an OfferBatch, as a single transaction.
+         New offers are inserted, known ones get the fields read since and their last_seen_at updated,
+         in a single bulk upsert on SQLite and PostgreSQL. Other databases only get the new offers.
+        """
+        rows = dict()
+        for o in new_offers:
+            if o.id is not None:
+                rows[o.id] = self._to_row(datasource, o)
+        if len(rows) == 0:
+            return
+        with self.engine.begin() as conn:
+            known = self._select_known_ids(conn, datasource, rows.keys())
+            fresh = [row for offer_id, row in rows.items() if offer_id not in known]
+            if self._upsert is not None:
+                conn.execute(self._upsert, list(rows.values()))
+            elif len(fresh) > 0:
+                conn.execute(offers.insert(), fresh)
+            history = [{'datasource': datasource, 'offer_id': row['offer_id'], 'observed_at': row['first_seen_at'],
+                        'price': row['price'], 'previous_price': None} for row in fresh if row['price'] is not None]
+            if len(history) > 0:
+                conn.execute(price_history.insert(), history)
+
+    def add(self, datasource, offer):
+        self.add_many(datasource, [offer])
+
+    def record_prices(self, datasource, observations):
+        """
+         Compares the prices read for known offers to their latest one, recording those which changed.
+         :param observations: list of (offer id, price)
+         :return list of the (offer id, previous price, price) which changed
+        """
+        prices = {str(offer_id): price for offer_id, price in observations if offer_id is not None and price is not None}
+        if len(prices) == 0:
+            return []
+        ids = list(prices.keys())
+        changes = []
+        now = datetime.now()
+        with self.engine.begin() as conn:
+            for start in range(0, len(ids), self._CHUNK_SIZE):
+                chunk = ids[start:start + self._CHUNK_SIZE]
+                query = select(offers.c.offer_id, offers.c.price).where(offers.c.datasource == datasource,
+                                                                        offers.c.offer_id.in_(chunk))
+                for offer_id, latest in conn.execute(query):
+                    if prices[offer_id] != latest:
+                        changes.append((offer_id, latest, prices[offer_id]))
+            if len(changes) > 0:
+                conn.execute(price_history.insert(), [
+                    {'datasource': datasource, 'offer_id': offer_id, 'observed_at': now, 'price': price,
+                     'previous_price': previous} for offer_id, previous, price in changes])
+                conn.execute(update(offers)
+                             .where(offers.c.datasource == datasource, offers.c.offer_id == bindparam('b_offer_id'))
+                             .values(price=bindparam('b_price')),
+                             [{'b_offer_id': offer_id, 'b_price': price} for offer_id, previous, price in changes])
+        return changes
+
+    def get_price_history(self, datasource, offer_id):
+        """ :return list of the (observed_at, price) of an offer, oldest first """
+        query = select(price_history.c.observed_at, price_history.c.price) \
+            .where(price_history.c.datasource == datasource, price_history.c.offer_id == str(offer_id)) \
+            .order_by(price_history.c.observed_at)
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(query)]
+
+    def get_price_drops(self, min_drop, days, now=None):
+        """
+         Finds the offers whose price dropped recently.
+         :param min_drop: smallest drop reported, relative to the previous price, e.g. 0.05 for 5%
+         :param days: how far back to look
+         :return list of dicts with datasource, offer_id, details_url, title, previous_price, price, drop
+          and observed_at, the largest drops first
+        """
+        if now is None:
+            now = datetime.now()
+        query = select(price_history.c.datasource, price_history.c.offer_id, offers.c.details_url, offers.c.title,
+                       price_history.c.previous_price, price_history.c.price, price_history.c.observed_at) \
+            .join(offers, (offers.c.datasource == price_history.c.datasource)
+                  & (offers.c.offer_id == price_history.c.offer_id)) \
+            .where(price_history.c.observed_at >= now - timedelta(days=days),
+                   price_history.c.previous_price > 0,
+                   price_history.c.price <= price_history.c.previous_price * (1 - min_drop))
+        with self.engine.connect() as conn:
+            drops = [dict(row._mapping) for row in conn.execute(query)]
+        for drop in drops:
+            drop['drop'] = 1 - drop['price'] / drop['previous_price']
+        return sorted(drops, key=lambda d: d['drop'], reverse=True)
+
+    def iter_signatures(self, seen_since=None, first_seen_before=None, chunk_size=1000):
+        """
+         Streams the stored offers with their deduplication signature, without loading them all at once.
+         :param seen_since: only the offers still listed since then, None for all of them
+         :param first_seen_before: only the offers first seen before then, None for all of them
+         :return generator of (datasource, OfferRow, True if a signature was saved, packed signature or None)
+        """
+        query = select(offers.c.datasource, offers.c.offer_id, offers.c.details_url, offers.c.title,
+                       offers.c.description, offers.c.price, offers.c.surface, offers.c.postal_code,
+                       offer_signatures.c.offer_id.is_not(None).label('signed'), offer_signatures.c.signature) \
+            .outerjoin(offer_signatures, (offer_signatures.c.datasource == offers.c.datasource)
+                       & (offer_signatures.c.offer_id == offers.c.offer_id))
+        if seen_since is not None:
+            query = query.where(offers.c.last_seen_at >= seen_since)
+        if first_seen_before is not None:
+            query = query.where(offers.c.first_seen_at < first_seen_before)
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+            for row in result:
+                yield row.datasource, OfferRow(row.offer_id, row.details_url, row.title, row.description, row.price,
+                                               row.surface, row.postal_code, None, None, None), \
+                    bool(row.signed), row.signature
+
+    def add_signatures(self, signatures):
+        """
+         Saves the deduplication signatures of offers, keeping those already saved.
+         :param signatures: list of (datasource, offer id, packed signature or None)
+        """
+        rows = dict()
+        for datasource, offer_id, signature in signatures:
+            rows[(datasource, str(offer_id))] = {'datasource': datasource, 'offer_id': str(offer_id),
+                                                 'signature': signature}
+        if len(rows) == 0:
+            return
+        with self.engine.begin() as conn:
+            if self.engine.dialect.name in _UPSERT_DIALECTS:
+                conn.execute(_UPSERT_DIALECTS[self.engine.dialect.name](offer_signatures).on_conflict_do_nothing(),
+                             list(rows.values()))
+                return
+            for datasource in set(datasource for datasource, offer_id in rows):
+                ids = [offer_id for name, offer_id in rows if name == datasource]
+                for start in range(0, len(ids), self._CHUNK_SIZE):
+                    query = select(offer_signatures.c.offer_id).where(
+                        offer_signatures.c.datasource == datasource,
+                        offer_signatures.c.offer_id.in_(ids[start:start + self._CHUNK_SIZE]))
+                    for row in conn.execute(query):
+                        del rows[(datasource, row.offer_id)]
+            if len(rows) > 0:
+                conn.execute(offer_signatures.insert(), list(rows.values()))
+
+    def get_crawl_state(self, datasource):
+        """
+         Loads the incremental crawl state of a datasource.
+         :return dict with watermark_offer_id, last_crawl_at and last_full_crawl_at, None if never crawled
+        """
+        with self.engine.connect() as conn:
+            row = conn.execute(select(crawl_state).where(crawl_state.c.datasource == datasource)).first()
+        if row is None:
+            return None
+        return dict(row._mapping)
+
+    def save_crawl_state(self, datasource, watermark_offer_id, full_crawl):
+        """ Records a completed crawl and its watermark. """
+        now = datetime.now()
+        values = {'last_crawl_at': now}
+        if watermark_offer_id is not None:
+            values['watermark_offer_id'] = str(watermark_offer_id)
+        if full_crawl:
+            values['last_full_crawl_at'] = now
+        with self.engine.begin() as conn:
+            result = conn.execute(update(crawl_state).where(crawl_state.c.datasource == datasource).values(**values))
+            if result.rowcount == 0:
+                conn.execute(crawl_state.insert().values(datasource=datasource, **values))
+
+    def get_politeness_state(self, datasource):
+        """
+         Loads the adaptive request delay of a datasource.
+         :return dict with delay, successes, empty_pages, blocks, timeouts and updated_at, None if never saved
+        """
+        with self.engine.connect() as conn:
+            row = conn.execute(select(politeness_state).where(politeness_state.c.datasource == datasource)).first()
+        if row is None:
+            return None
+        return dict(row._mapping)
+
+    def get_politeness_states(self):
+        """ :return list of the adaptive request delay state of every datasource """
+        with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(select(politeness_state))]
+
+    def save_politeness_state(self, datasource, state):
+        """ Records the adaptive request delay of a datasource, as returned by AdaptiveRate.metrics(). """
+        values = {key: state[key] for key in ('delay', 'successes', 'empty_pages', 'blocks', 'timeouts')}
+        values['updated_at'] = datetime.now()
+        with self.engine.begin() as conn:
+            result = conn.execute(update(politeness_state).where(politeness_state.c.datasource == datasource)
+                                  .values(**values))
+            if result.rowcount == 0:
+                conn.execute(politeness_state.insert().values(datasource=datasource, **values))
+
+    def add_notifications(self, channel, entries):
+        """ Queues notifications in the persistent outbox of a channel, as JSON serializable dicts. """
+        if len(entries) == 0:
+            return
+        now = datetime.now()
+        rows = [{'channel': channel, 'payload': json.dumps(entry), 'created_at': now} for entry in entries]
+        with self.engine.begin() as conn:
+            conn.execute(notification_outbox.insert(), rows)
+
+    def get_notifications(self, channel, limit):
+        """ :return list of the (id, entry) of the oldest notifications waiting in the outbox of a channel """
+        query = select(notification_outbox.c.id, notification_outbox.c.payload) \
+            .where(notification_outbox.c.channel == channel).order_by(notification_outbox.c.id).limit(limit)
+        with self.engine.connect() as conn:
+            return [(row.id, json.loads(row.payload)) for row in conn.execute(query)]
+
+    def remove_notifications(self, ids):
+        """ Removes delivered notifications from the outbox. """
+        if len(ids) == 0:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(delete(notification_outbox).where(notification_outbox.c.id.in_(list(ids))))
+
+    @staticmethod
+    def _to_row(datasource, o):
+        now = datetime.now()
+        return {
+            'datasource': datasource,
+            'offer_id': o.id,
+            'details_url': o.details_url,
+            'title': o.title,
+            'description': o.description,
+            'price': o.price,
+            'surface': o.surface,
+            'postal_code': o.postal_code,
+            'first_seen_at': now,
+            'last_seen_at': now,
+        }
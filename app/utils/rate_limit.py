@@ -0,0 +1,130 @@
+import threading
+import time
+
+
+class TokenBucket(object):
+    """ Token bucket rate limiter, shared by the threads requesting a same host. """
+
+    def __init__(self, rate, capacity=1):
+        """
+         :param rate: tokens added per second
+         :param capacity: maximum number of tokens saved up, i.e. of requests sent in a burst
+        """
+        self.rate = float(rate)
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """
+         Takes a token, possibly in advance.
+         :return the number of seconds to wait before the token is actually available
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate):
+        """ Changes the rate from now on, the tokens saved up so far being kept. """
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def drain(self):
+        """ Drops the tokens saved up, so that the next request waits for a full interval. """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        """ Blocks until a token is available. """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AdaptiveRate(object):
+    """
+     Adjusts the rate of a token bucket from the responses of its host: the delay between requests
+     shrinks a little after each well-formed page, and is multiplied after each sign of trouble.
+    """
+
+    # Signals reported for each response
+    SUCCESS = 'success'
+    EMPTY = 'empty'
+    BLOCKED = 'blocked'
+    TIMEOUT = 'timeout'
+
+    # Counter of each signal, as exposed by metrics()
+    COUNTERS = {SUCCESS: 'successes', EMPTY: 'empty_pages', BLOCKED: 'blocks', TIMEOUT: 'timeouts'}
+
+    def __init__(self, bucket, min_delay, max_delay, speedup=0.95, backoff=2, state=None):
+        """
+         :param bucket: TokenBucket whose rate is adjusted
+         :param min_delay: shortest delay between two requests, in seconds
+         :param max_delay: longest delay between two requests, in seconds
+         :param speedup: factor applied to the delay after a well-formed page
+         :param backoff: factor applied to the delay after an empty page or a failed load, squared for an anti-bot page
+         :param state: metrics() of a previous run to start from, None to start from the bucket's rate
+        """
+        self.bucket = bucket
+        self.min_delay = min_delay
+        self.max_delay = max(min_delay, max_delay)
+        self.speedup = speedup
+        self.backoff = backoff
+        self.counts = {counter: 0 for counter in self.COUNTERS.values()}
+        delay = 1 / bucket.rate
+        if state is not None:
+            delay = state['delay']
+            self.counts.update({counter: state.get(counter) or 0 for counter in self.counts})
+        self._lock = threading.Lock()
+        self._set_delay(delay)
+
+    def _set_delay(self, delay):
+        self.delay = min(self.max_delay, max(self.min_delay, delay))
+        self.bucket.set_rate(1 / self.delay)
+
+    def report(self, signal):
+        """ Adjusts the delay after a response, from one of the SUCCESS, EMPTY, BLOCKED or TIMEOUT signals. """
+        with self._lock:
+            self.counts[self.COUNTERS[signal]] += 1
+            if signal == self.SUCCESS:
+                self._set_delay(self.delay * self.speedup)
+            elif signal == self.BLOCKED:
+                self._set_delay(self.delay * self.backoff ** 2)
+                self.bucket.drain()
+            else:
+                self._set_delay(self.delay * self.backoff)
+
+    def metrics(self):
+        """ :return dict with the current delay and rate, and the number of responses of each kind """
+        with self._lock:
+            return dict(delay=self.delay, rate=1 / self.delay, **self.counts)
+
+
+_buckets = dict()
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host, rate, capacity=1):
+    """
+     Returns the token bucket of a host, created with the given rate by its first caller.
+     :return TokenBucket instance, None if rate is not positive, meaning no limit
+    """
+    if rate is None or rate <= 0:
+        return None
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _buckets[host] = bucket
+        return bucket
@@ -0,0 +1,103 @@
+"""
+ Measures the parse and extraction time, and the peak parse memory, per page of saved
+ result list and details pages, parsing either the whole page or only its declared regions.
+
+ Pages are read from a directory, named after their datasource and page type,
+ e.g. pap_list.html, seloger_detail_2.html or bienici_list.html.
+
+ Usage: python -m benchmarks.parsing [--pages DIR] [--parser lxml] [--repeat 20]
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+import bs4
+
+from app.scrapers.base_scraper import LIST_PAGE, DETAIL_PAGE
+from app.scrapers.extraction import PARSERS, parse_html
+from app.scrapers.pap import Pap
+from app.scrapers.seloger import SeLoger
+from app.scrapers.bienici import BienIci
+from tests.datasources.fixtures import PAGES_DIR
+
+
+SCRAPERS = {'pap': Pap, 'seloger': SeLoger, 'bienici': BienIci}
+
+
+def extract_list_page(scraper, root):
+    offers = []
+    for r_offer in scraper._get_offers(root):
+        o = scraper._get_offer_object(r_offer)
+        if o is not None and scraper._is_valid_offer(o, r_offer):
+            o.fill_card(scraper, r_offer)
+            offers.append(o)
+    return offers
+
+
+def extract_detail_page(scraper, root):
+    payload = scraper._selectors.select_one(root, 'details')
+    return scraper.get_title(None, None, payload), scraper.get_description(None, None, payload)
+
+
+def available_parsers():
+    parsers = []
+    for parser in PARSERS:
+        try:
+            bs4.BeautifulSoup('', parser)
+            parsers.append(parser)
+        except bs4.FeatureNotFound:
+            pass
+    return parsers
+
+
+def bench_page(scraper, html, page_type, parser, regions, repeat):
+    """
+     Parses and extracts a page repeatedly.
+     :return (parse seconds, extraction seconds, peak parse bytes) per page
+    """
+    extract = extract_list_page if page_type == LIST_PAGE else extract_detail_page
+    parse_time = 0
+    extract_time = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        root = parse_html(html, parser, regions)
+        parsed = time.perf_counter()
+        extract(scraper, root)
+        parse_time += parsed - start
+        extract_time += time.perf_counter() - parsed
+    tracemalloc.start()
+    root = parse_html(html, parser, regions)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return parse_time / repeat, extract_time / repeat, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', default=PAGES_DIR, help='directory of saved pages, the recorded fixtures by default')
+    parser.add_argument('--parser', action='append', choices=PARSERS, help='parser backend, all installed ones by default')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    scrapers = {name: cls() for name, cls in SCRAPERS.items()}
+    print("{:<32} {:<12} {:<8} {:>10} {:>12} {:>10}".format('page', 'parser', 'mode', 'parse ms', 'extract ms', 'peak KB'))
+    for path in sorted(glob.glob(os.path.join(args.pages, '*.html'))):
+        name = os.path.basename(path)
+        datasource, page_type = name.split('_')[:2]
+        page_type = page_type.split('.')[0]
+        if datasource not in scrapers or page_type not in (LIST_PAGE, DETAIL_PAGE):
+            continue
+        scraper = scrapers[datasource]
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        for backend in args.parser or available_parsers():
+            for mode, regions in (('full', None), ('partial', scraper._page_regions.get(page_type))):
+                parse_time, extract_time, peak = bench_page(scraper, html, page_type, backend, regions, args.repeat)
+                print("{:<32} {:<12} {:<8} {:>10.2f} {:>12.2f} {:>10.0f}".format(
+                    name, backend, mode, parse_time * 1000, extract_time * 1000, peak / 1024))
+
+
+if __name__ == '__main__':
+    main()
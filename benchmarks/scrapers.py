@@ -0,0 +1,137 @@
+"""
+ Benchmarks the scrapers over the recorded pages of tests/datasources/pages, with the browser bypassed.
+
+ Each round runs the real _next_page / fill_object path of every datasource, then filters the offers,
+ and reports pages and offers per second, the time spent in each getter and the peak memory.
+ Results are written as JSON so that two commits can be compared with --compare.
+
+ Usage: python -m benchmarks.scrapers [--rounds 5] [--output bench_results.json] [--compare previous.json]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+import settings
+from app.scrapers.pap import Pap
+from app.scrapers.seloger import SeLoger
+from app.scrapers.bienici import BienIci
+from app.services.filter import CompiledFilter
+from tests.datasources.fixtures import build_scraper
+
+
+SCRAPERS = (Pap, SeLoger, BienIci)
+
+# Scraper methods which are not field getters
+IGNORED_METHODS = ('get_or_none', 'get_datasource_name')
+
+
+class GetterTimer(object):
+    """ Wraps the getters and the page loader of a scraper instance to time their calls. """
+
+    def __init__(self, scraper):
+        self.durations = defaultdict(float)
+        self.calls = defaultdict(int)
+        for name in dir(type(scraper)):
+            if (name.startswith('get_') and name not in IGNORED_METHODS) or name == '_load_web_page':
+                setattr(scraper, name, self._wrap(name.lstrip('_'), getattr(scraper, name)))
+
+    def _wrap(self, name, method):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.durations[name] += time.perf_counter() - start
+                self.calls[name] += 1
+        return timed
+
+    def report(self):
+        """ :return dict of the mean time per call, in milliseconds, by method """
+        return {name: round(self.durations[name] * 1000 / self.calls[name], 4) for name in sorted(self.calls)}
+
+
+def crawl(scraper, offer_filter):
+    offers = [o for page in scraper._next_page(full_crawl=True) for o in page]
+    offer_filter.apply_many(offers)
+    return offers
+
+
+def bench_datasource(cls, rounds):
+    scraper, fetcher = build_scraper(cls)
+    offer_filter = CompiledFilter.from_settings()
+    timer = GetterTimer(scraper)
+    offer_count = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        offer_count += len(crawl(scraper, offer_filter))
+    seconds = time.perf_counter() - start
+    page_count = len(fetcher.urls)
+
+    tracemalloc.start()
+    crawl(scraper, offer_filter)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'pages': page_count,
+        'offers': offer_count,
+        'seconds': round(seconds, 4),
+        'pages_per_second': round(page_count / seconds, 2),
+        'offers_per_second': round(offer_count / seconds, 2),
+        'peak_memory_kb': round(peak / 1024),
+        'getters_ms': timer.report(),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    print("\n{:<10} {:<18} {:>12} {:>12} {:>8}".format('source', 'metric', 'previous', 'current', 'ratio'))
+    for name, current in results['datasources'].items():
+        before = previous.get('datasources', {}).get(name)
+        if before is None:
+            continue
+        for metric in ('pages_per_second', 'offers_per_second', 'peak_memory_kb'):
+            ratio = current[metric] / before[metric] if before[metric] else float('nan')
+            print("{:<10} {:<18} {:>12} {:>12} {:>8.2f}".format(name, metric, before[metric], current[metric], ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='results file of a previous run')
+    args = parser.parse_args()
+
+    results = {
+        'commit': get_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'parser': settings.core.HTML_PARSER,
+        'rounds': args.rounds,
+        'datasources': {cls.__name__: bench_datasource(cls, args.rounds) for cls in SCRAPERS},
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print("{:<10} {:>8} {:>8} {:>10} {:>10} {:>10}".format('source', 'pages', 'offers', 'pages/s', 'offers/s', 'peak KB'))
+    for name, r in results['datasources'].items():
+        print("{:<10} {:>8} {:>8} {:>10} {:>10} {:>10}".format(
+            name, r['pages'], r['offers'], r['pages_per_second'], r['offers_per_second'], r['peak_memory_kb']))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
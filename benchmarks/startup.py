@@ -0,0 +1,59 @@
+"""
+ Measures the fixed startup cost of the browser: resolving chromedriver with and without the on-disk cache,
+ and starting the browser session of each scraper of a process.
+ Needs Chrome to be installed, and network access for the uncached driver lookup.
+
+ Usage: python -m benchmarks.startup [--scrapers 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.fetchers import browser_pool
+from app.fetchers.browser_pool import BrowserPool, resolve_driver_path
+
+
+def time_driver_resolution(cache_file, ttl):
+    """ :return seconds taken to resolve chromedriver in a new process, simulated by forgetting the resolved path """
+    browser_pool._driver_path = None
+    start = time.perf_counter()
+    resolve_driver_path(cache_file=cache_file, ttl=ttl)
+    return time.perf_counter() - start
+
+
+def time_checkout(pool):
+    start = time.perf_counter()
+    with pool.browser():
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scrapers', type=int, default=3, help='scrapers of the process')
+    args = parser.parse_args()
+
+    fd, cache_file = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    os.remove(cache_file)
+    try:
+        print("{:<40} {:>10}".format('driver resolution', 'ms'))
+        print("{:<40} {:>10.1f}".format('webdriver-manager lookup', time_driver_resolution(cache_file, 0) * 1000))
+        print("{:<40} {:>10.1f}".format('on-disk cache', time_driver_resolution(cache_file, 3600) * 1000))
+    finally:
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+
+    print()
+    print("{:<40} {:>10}".format('sessions for {} scrapers'.format(args.scrapers), 'ms'))
+    total = 0
+    for _ in range(args.scrapers):
+        pool = BrowserPool(1)
+        total += time_checkout(pool)
+        pool.close()
+    print("{:<40} {:>10.1f}".format('one pool per scraper', total * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+ Measures the write throughput of the offer store, on a temporary SQLite database or on --database:
+ a full crawl stored page by page, the same crawl stored again once every offer is known,
+ and, for reference, the same offers stored one transaction per offer.
+
+ Usage: python -m benchmarks.storage [--offers 5000] [--page-size 25] [--database URL]
+ The offers written to --database, under the Bench datasource, are left there.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.models.apartment_offer import ApartmentOffer
+from app.storage.offer_store import OfferStore
+
+
+def build_offers(count):
+    result = []
+    for i in range(count):
+        o = ApartmentOffer()
+        o.id = 'r{}'.format(400000000 + i)
+        o.details_url = 'https://www.pap.fr/annonces/appartement-paris-r{}'.format(400000000 + i)
+        o.title = 'Appartement {} pièces {} m²'.format(1 + i % 5, 20 + i % 80)
+        o.description = 'Appartement lumineux, proche métro et commerces. ' * 8
+        o.price = 150000 + (i * 7919) % 900000
+        o.surface = 20 + i % 80
+        o.postal_code = 75001 + i % 20
+        result.append(o)
+    return result
+
+
+def time_pages(store, offers, page_size):
+    start = time.perf_counter()
+    for index in range(0, len(offers), page_size):
+        store.add_many('Bench', offers[index:index + page_size])
+    return time.perf_counter() - start
+
+
+def time_single_offers(store, offers):
+    start = time.perf_counter()
+    for o in offers:
+        store.add('Bench', o)
+    return time.perf_counter() - start
+
+
+def print_row(name, count, seconds):
+    print("{:<36} {:>8} {:>10.3f} {:>12.0f}".format(name, count, seconds, count / seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--offers', type=int, default=5000)
+    parser.add_argument('--page-size', type=int, default=25)
+    parser.add_argument('--database', help='database url, a temporary SQLite file by default')
+    args = parser.parse_args()
+
+    offers = build_offers(args.offers)
+    paths = []
+
+    def open_store():
+        if args.database is not None:
+            return OfferStore(args.database)
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        paths.append(path)
+        return OfferStore('sqlite:///{}'.format(path))
+
+    try:
+        print("{:<36} {:>8} {:>10} {:>12}".format('', 'offers', 's', 'offers/s'))
+        store = open_store()
+        print_row('pages, new offers', len(offers), time_pages(store, offers, args.page_size))
+        print_row('pages, known offers', len(offers), time_pages(store, offers, args.page_size))
+        store.engine.dispose()
+        if args.database is None:
+            store = open_store()
+            print_row('one transaction per offer', len(offers), time_single_offers(store, offers))
+            store.engine.dispose()
+    finally:
+        for path in paths:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
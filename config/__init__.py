@@ -2,3 +2,4 @@
 from . import core
 from . import filtering
 from . import pap, bienici, seloger
+from . import slack
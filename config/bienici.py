@@ -8,3 +8,24 @@ BIENICI_SEARCH_TYPE = os.getenv('BIENICI_SEARCH_TYPE', ['appartement'])
 if not isinstance(BIENICI_SEARCH_TYPE, list):
     BIENICI_SEARCH_TYPE = [e.strip() for e in BIENICI_SEARCH_TYPE.split(',')]
 
+# Maximum number of detail pages loaded in parallel
+BIENICI_MAX_CONCURRENCY = int(os.getenv('BIENICI_MAX_CONCURRENCY', 2))
+
+# Maximum number of requests per second sent to the site, 0 for no limit
+BIENICI_REQUESTS_PER_SECOND = float(os.getenv('BIENICI_REQUESTS_PER_SECOND', 0.3))
+
+# Fetcher used for result list and detail pages: 'browser' (headless Chrome) or 'http' (plain HTTP client)
+BIENICI_LIST_FETCHER = os.getenv('BIENICI_LIST_FETCHER', 'browser')
+BIENICI_DETAIL_FETCHER = os.getenv('BIENICI_DETAIL_FETCHER', 'browser')
+
+# Browser resources: URL patterns blocked on top of the default images, media, fonts and trackers,
+# and default patterns the site needs, which are not blocked
+BIENICI_BLOCKED_RESOURCES = [e.strip() for e in os.getenv('BIENICI_BLOCKED_RESOURCES', '').split(',') if e.strip()]
+BIENICI_ALLOWED_RESOURCES = [e.strip() for e in os.getenv('BIENICI_ALLOWED_RESOURCES', '').split(',') if e.strip()]
+
+# html (result pages rendered by the browser) or api (realEstateAds.json, read with the plain HTTP client)
+BIENICI_MODE = os.getenv('BIENICI_MODE', 'html')
+# Zones searched in api mode, as BienIci ids, e.g. -7444 for Paris
+BIENICI_ZONE_IDS = [e.strip() for e in os.getenv('BIENICI_ZONE_IDS', '').split(',') if e.strip()]
+# Number of ads per realEstateAds.json page
+BIENICI_API_PAGE_SIZE = int(os.getenv('BIENICI_API_PAGE_SIZE', 100))
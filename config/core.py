@@ -5,5 +5,79 @@ import os
 SLEEP_INTERVAL = int(os.getenv('SLEEP_INTERVAL', 60 * 40)) # 40 minutes
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///offers.db')
 
+## Datasources
+
+# Datasources crawled at each cycle, each in its own worker process: pap, seloger, bienici
+ENABLED_SOURCES = os.getenv('ENABLED_SOURCES', 'pap,seloger,bienici')
+ENABLED_SOURCES = [e.strip().lower() for e in ENABLED_SOURCES.split(',') if e.strip()]
+# Seconds after which a datasource still crawling is stopped, without affecting the others
+SOURCE_TIMEOUT = int(os.getenv('SOURCE_TIMEOUT', 60 * 30)) # 30 minutes
+
+## Incremental crawling
+
+# Stop paginating after this many consecutive already known offers, 0 always crawls every page
+INCREMENTAL_KNOWN_OFFERS = int(os.getenv('INCREMENTAL_KNOWN_OFFERS', 10))
+# Crawl every page again when the last full crawl is older than this
+FULL_CRAWL_INTERVAL = int(os.getenv('FULL_CRAWL_INTERVAL', 60 * 60 * 24)) # 1 day
+
+# Maximum number of offers waiting between two stages of the pipeline
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 100))
+
+## Cross-source deduplication
+
+# Group the offers listed on several datasources, only notifying the first one seen
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Width of the price bands compared, relative to the price, and of the surface bands, in m²
+DEDUP_PRICE_BAND = float(os.getenv('DEDUP_PRICE_BAND', 0.05))
+DEDUP_SURFACE_BAND = int(os.getenv('DEDUP_SURFACE_BAND', 5))
+# Estimated similarity of the titles and descriptions above which two offers are the same
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', 0.5))
+# Only the stored offers listed in the last days are compared to the new ones, 0 for the whole history
+DEDUP_HISTORY_DAYS = int(os.getenv('DEDUP_HISTORY_DAYS', 90))
+
+## Rate limiting
+
+# Number of requests a host may receive in a burst, before being limited to its datasource's rate
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', 2))
+# Bounds of the delay between two requests to a host, adapted to its responses from the datasource's rate
+POLITENESS_MIN_DELAY = float(os.getenv('POLITENESS_MIN_DELAY', 0.5))
+POLITENESS_MAX_DELAY = float(os.getenv('POLITENESS_MAX_DELAY', 60 * 5)) # 5 minutes
+# Factor applied to the delay after a well-formed page, and after an empty, failed or anti-bot page
+POLITENESS_SPEEDUP = float(os.getenv('POLITENESS_SPEEDUP', 0.95))
+POLITENESS_BACKOFF = float(os.getenv('POLITENESS_BACKOFF', 2))
+
+## Browser settings
+
+# Number of browser sessions each scraper may open to load detail pages in parallel
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 1))
+# Seconds to wait for the content of a page to render before giving up on it
+BROWSER_READY_TIMEOUT = int(os.getenv('BROWSER_READY_TIMEOUT', 15))
+# chromedriver executable, looked up by webdriver-manager when empty
+CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH', '')
+# File caching the chromedriver path looked up, and how long it is used without checking for a newer driver
+DRIVER_CACHE_FILE = os.getenv('DRIVER_CACHE_FILE', '.driver_cache.json')
+DRIVER_CACHE_TTL = int(os.getenv('DRIVER_CACHE_TTL', 60 * 60 * 24 * 7)) # 7 days
+# Keep the browser from downloading images, media, fonts and trackers, see each datasource's *_RESOURCES settings
+BLOCK_RESOURCES = os.getenv('BLOCK_RESOURCES', 'true').lower() in ('1', 'true', 'yes')
+
+## Page cache settings
+
+# off, cache (serve pages younger than their TTL), record (always load and store) or replay (only serve stored pages)
+PAGE_CACHE_MODE = os.getenv('PAGE_CACHE_MODE', 'off')
+PAGE_CACHE_DIR = os.getenv('PAGE_CACHE_DIR', '.page_cache')
+PAGE_CACHE_LIST_TTL = int(os.getenv('PAGE_CACHE_LIST_TTL', 60 * 30)) # 30 minutes
+PAGE_CACHE_DETAIL_TTL = int(os.getenv('PAGE_CACHE_DETAIL_TTL', 60 * 60 * 24 * 7)) # 7 days
+
+## Parsing settings
+
+# BeautifulSoup parser backend: lxml (fastest, optional dependency), html.parser or html5lib
+HTML_PARSER = os.getenv('HTML_PARSER', 'html.parser')
+
+## HTTP client settings
+
+# Number of keep-alive connections kept open per host
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HTTP_TIMEOUT = int(os.getenv('HTTP_TIMEOUT', 30))
+
 # DEBUG, INFO, WARNING, ERROR
 LOGGING_LEVEL = os.getenv('LOGGING_LEVEL', 'INFO')
@@ -5,3 +5,27 @@ if not isinstance(PAP_SEARCH_TYPE, list):
     PAP_SEARCH_TYPE = [e.strip() for e in PAP_SEARCH_TYPE.split(',')]
 
 PAP_SEARCH_LOCATION = os.getenv('PAP_SEARCH_LOCATION', '')
+
+# Maximum number of detail pages loaded in parallel
+PAP_MAX_CONCURRENCY = int(os.getenv('PAP_MAX_CONCURRENCY', 2))
+
+# Maximum number of requests per second sent to the site, 0 for no limit
+PAP_REQUESTS_PER_SECOND = float(os.getenv('PAP_REQUESTS_PER_SECOND', 0.3))
+
+# Fetcher used for result list and detail pages: 'browser' (headless Chrome) or 'http' (plain HTTP client)
+PAP_LIST_FETCHER = os.getenv('PAP_LIST_FETCHER', 'browser')
+PAP_DETAIL_FETCHER = os.getenv('PAP_DETAIL_FETCHER', 'browser')
+
+# Browser resources: URL patterns blocked on top of the default images, media, fonts and trackers,
+# and default patterns the site needs, which are not blocked
+PAP_BLOCKED_RESOURCES = [e.strip() for e in os.getenv('PAP_BLOCKED_RESOURCES', '').split(',') if e.strip()]
+PAP_ALLOWED_RESOURCES = [e.strip() for e in os.getenv('PAP_ALLOWED_RESOURCES', '').split(',') if e.strip()]
+
+# html (result and detail pages of the website) or api (JSON web services of the mobile app)
+PAP_MODE = os.getenv('PAP_MODE', 'html')
+# Base url of the mobile app's web services
+PAP_API_URL = os.getenv('PAP_API_URL', 'https://ws.pap.fr')
+# Device id sent by the mobile app in the X-Device-Gsf header, without which the web services refuse requests
+PAP_DEVICE_GSF = os.getenv('PAP_DEVICE_GSF', '')
+# Number of ads per results page in api mode
+PAP_API_PAGE_SIZE = int(os.getenv('PAP_API_PAGE_SIZE', 40))
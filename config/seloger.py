@@ -18,3 +18,18 @@ if not isinstance(SELOGER_SEARCH_TYPE, list):
 SELOGER_SEARCH_LOCATION = os.getenv('SELOGER_SEARCH_LOCATION', [])
 if not isinstance(SELOGER_SEARCH_LOCATION, list):
     SELOGER_SEARCH_LOCATION = [e.strip() for e in SELOGER_SEARCH_LOCATION.split(',')]
+
+# Maximum number of detail pages loaded in parallel
+SELOGER_MAX_CONCURRENCY = int(os.getenv('SELOGER_MAX_CONCURRENCY', 2))
+
+# Maximum number of requests per second sent to the site, 0 for no limit
+SELOGER_REQUESTS_PER_SECOND = float(os.getenv('SELOGER_REQUESTS_PER_SECOND', 0.3))
+
+# Fetcher used for result list and detail pages: 'browser' (headless Chrome) or 'http' (plain HTTP client)
+SELOGER_LIST_FETCHER = os.getenv('SELOGER_LIST_FETCHER', 'browser')
+SELOGER_DETAIL_FETCHER = os.getenv('SELOGER_DETAIL_FETCHER', 'browser')
+
+# Browser resources: URL patterns blocked on top of the default images, media, fonts and trackers,
+# and default patterns the site needs, which are not blocked
+SELOGER_BLOCKED_RESOURCES = [e.strip() for e in os.getenv('SELOGER_BLOCKED_RESOURCES', '').split(',') if e.strip()]
+SELOGER_ALLOWED_RESOURCES = [e.strip() for e in os.getenv('SELOGER_ALLOWED_RESOURCES', '').split(',') if e.strip()]
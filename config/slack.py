@@ -0,0 +1,19 @@
+import os
+
+# Notifications are only sent to Slack when a bot token is set, offers being printed otherwise
+SLACK_CHANNEL = os.getenv('SLACK_CHANNEL', '')
+SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN', '')
+SLACK_BOT_NAME = os.getenv('SLACK_BOT_NAME', 'immo-finder')
+# Emoji (:house:) or image url of the bot
+SLACK_BOT_ICON = os.getenv('SLACK_BOT_ICON', ':house:')
+
+# Base url of the Slack Web API
+SLACK_API_URL = os.getenv('SLACK_API_URL', 'https://slack.com/api')
+
+# Maximum number of offers per message, and seconds waited for more offers before sending a message
+SLACK_BATCH_SIZE = int(os.getenv('SLACK_BATCH_SIZE', 10))
+SLACK_BATCH_DELAY = float(os.getenv('SLACK_BATCH_DELAY', 5))
+# Maximum number of messages posted per second, Slack allowing about one per second and channel
+SLACK_REQUESTS_PER_SECOND = float(os.getenv('SLACK_REQUESTS_PER_SECOND', 1))
+# Seconds given to the pending messages to be sent at the end of a cycle, the others being sent by the next one
+SLACK_FLUSH_TIMEOUT = int(os.getenv('SLACK_FLUSH_TIMEOUT', 60))
@@ -1,40 +1,69 @@
+import itertools
 import time
+from datetime import datetime
 import logging
 import settings
 from app.utils import logger as log
-from app.scrapers import seloger,pap
+from app.services.filter import CompiledFilter
+from app.services.dedup import DedupIndex, DedupStage
+from app.services.pipeline import Pipeline, FilterStage, NotifyStage
+from app.services.runner import MultiSourceRunner
+from app.services.slack_notifier import SlackNotifier
+from app.storage.offer_store import OfferStore
+
+
+def print_offer(counter):
+    def notify(datasource, offer):
+        print(f"\n=== Offre {next(counter)} ({datasource}) ===")
+        print(f"Titre: {offer.title}")
+        print(f"Prix: {offer.price}€")
+        print(f"Surface: {offer.surface}m²")
+        print(f"URL: {offer.details_url}")
+        if offer.description:
+            print(f"Description: {offer.description[:200]}...")
+    return notify
+
 
 def timed_job():
     log.init_logging()
     logger = logging.getLogger()
     logger.info("{}: Starting scrape cycle".format(time.ctime()))
     
-    # Initialize scraper and get offers
-    scraper = pap.Pap()
-    all_offers = []
-    
-    # Use the _next_page method to get all offers
+    # Crawl the enabled datasources side by side and stream their offers through the filter and the notifications.
+    # Each worker's scraper already stores the offers of its pages, the pipeline does not write them again
+    store = OfferStore()
+    runner = MultiSourceRunner()
+    stages = [
+        FilterStage(CompiledFilter.from_settings()),
+    ]
+    if settings.core.DEDUP_ENABLED:
+        # Offers already listed on another datasource are stored, but not notified again.
+        # The history is indexed while the datasources start, from the offers stored before this run
+        index = DedupIndex(store=store)
+        index.load_in_background(before=datetime.now())
+        stages.append(DedupStage(index))
+    notifier = None
+    if settings.slack.SLACK_BOT_TOKEN:
+        # Offers are posted by batches from a background thread, the pipeline only queuing them
+        notifier = SlackNotifier(store)
+        stages.append(NotifyStage(notifier.notify))
+    else:
+        stages.append(NotifyStage(print_offer(itertools.count(1))))
+    pipeline = Pipeline(stages)
+
+    count = 0
     try:
-        for page_offers in scraper._next_page():
-            all_offers.extend(page_offers)
-            logger.info(f"Found {len(page_offers)} offers on this page")
-            break  # Just check first page for now
+        count = pipeline.run(runner.iter_offers())
     except Exception as e:
         logger.error(f"Error during scraping: {e}")
-        logger.info(f"Partial results: {len(all_offers)} offers found before error")
-    
-    logger.info(f"Total offers found: {len(all_offers)}")
-    
-    # Print all offers
-    for i, offer in enumerate(all_offers, 1):
-        print(f"\n=== Offre {i} ===")
-        print(f"Titre: {offer.title}")
-        print(f"Prix: {offer.price}€")
-        print(f"Surface: {offer.surface}m²")
-        print(f"URL: {offer.details_url}")
-        if offer.description:
-            print(f"Description: {offer.description[:200]}...")
+    finally:
+        if notifier is not None:
+            notifier.close()
     
+    for source, (status, detail) in runner.results.items():
+        logger.info(f"{source}: {status} ({detail})")
+    logger.info(f"Total offers found: {count}")
     logger.info("{}: Successfully finished scraping".format(time.ctime()))
 
-timed_job()
+if __name__ == '__main__':
+    timed_job()
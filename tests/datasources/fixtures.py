@@ -0,0 +1,42 @@
+import os
+
+from app.fetchers.base_fetcher import BROWSER, BaseFetcher
+from app.fetchers.page_cache import PageCache
+
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), 'pages')
+
+
+def read_page(name):
+    with open(os.path.join(PAGES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class FixtureFetcher(BaseFetcher):
+    """ Serves the recorded list page for the search url, and the recorded details page for any other url. """
+
+    def __init__(self, datasource, search_url):
+        super().__init__()
+        self.search_url = search_url
+        self.list_html = read_page('{}_list.html'.format(datasource))
+        self.detail_html = read_page('{}_detail.html'.format(datasource))
+        self.urls = []
+
+    def fetch(self, url, ready_selector=None):
+        self.urls.append(url)
+        if url == self.search_url:
+            return self.list_html
+        return self.detail_html
+
+
+def build_scraper(cls, **kwargs):
+    """
+     Builds a datasource whose pages are served from the recorded fixtures, without any browser.
+     :return (scraper, fetcher)
+    """
+    scraper = cls(fetchers={}, page_cache=PageCache(None, PageCache.OFF), **kwargs)
+    fetcher = FixtureFetcher(cls.__name__.lower(), scraper._get_search_url())
+    scraper._BaseScraper__fetchers[BROWSER] = fetcher
+    # Recorded pages are not rate limited
+    scraper._requests_per_second = 0
+    return scraper, fetcher
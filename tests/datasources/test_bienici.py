@@ -0,0 +1,30 @@
+import unittest
+
+from app.scrapers.bienici import BienIci
+from tests.datasources.fixtures import build_scraper
+
+
+class BienIciTestCase(unittest.TestCase):
+    """ Unit Tests for bienici.py """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scraper, cls.fetcher = build_scraper(BienIci)
+        cls.pages = list(cls.scraper._next_page())
+
+    def test_single_page(self):
+        self.assertEqual(len(self.pages), 1)
+        self.assertEqual(len(self.pages[0]), 25)
+
+    def test_fields(self):
+        o = self.pages[0][0]
+        self.assertEqual(o.id, 'orpi-1-412001800E0J96X')
+        self.assertEqual(o.price, 418000)
+        self.assertEqual(o.surface, 37)
+        self.assertEqual(o.title, 'appartement 3 pièces 37,5 m²')
+        self.assertEqual(o.details_url, '/annonce/vente/paris-75011/appartement/3pieces/orpi-1-412001800E0J96X')
+        self.assertTrue(o.description.startswith('rue parmentier, appartement calme'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import unittest
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+
+from app.fetchers.base_fetcher import BROWSER, HTTP, BaseFetcher
+from app.fetchers.page_cache import PageCache
+from app.scrapers.bienici_api import BienIciApi
+from tests.datasources.fixtures import read_page
+
+
+class ApiFetcher(BaseFetcher):
+    """ Serves the recorded realEstateAds.json pages, by the offset of their filters. """
+
+    def __init__(self):
+        super().__init__()
+        self.pages = {0: read_page('bienici_api_1.json'), 2: read_page('bienici_api_2.json')}
+        self.filters = []
+
+    def fetch(self, url, ready_selector=None):
+        filters = json.loads(parse_qs(urlparse(url).query)['filters'][0])
+        self.filters.append(filters)
+        return self.pages.get(filters['from'])
+
+
+class BienIciApiTestCase(unittest.TestCase):
+    """ Unit Tests for bienici_api.py """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fetcher = ApiFetcher()
+        cls.scraper = BienIciApi(fetchers={}, page_cache=PageCache(None, PageCache.OFF))
+        cls.scraper._BaseScraper__fetchers.update({HTTP: cls.fetcher, BROWSER: cls.fetcher})
+        cls.scraper._requests_per_second = 0
+        cls.scraper._page_size = 2
+        cls.pages = list(cls.scraper._next_page())
+
+    def test_pages_through_the_api(self):
+        self.assertEqual([len(page) for page in self.pages], [2, 1])
+        self.assertEqual([f['from'] for f in self.fetcher.filters], [0, 2])
+        self.assertEqual(self.fetcher.filters[0]['sortBy'], 'publicationDate')
+        self.assertEqual(self.fetcher.filters[0]['propertyType'], ['flat'])
+
+    def test_fields(self):
+        o = self.pages[0][0]
+        self.assertEqual(o.id, 'orpi-1-006054E0J96X')
+        self.assertEqual(o.price, 735000)
+        self.assertEqual(o.surface, 93)
+        self.assertEqual(o.room_count, 4)
+        self.assertEqual(o.postal_code, 75019)
+        self.assertEqual(o.title, 'appartement paris 19e - 4 pièces 94 m2- balcons- haussmannien')
+        self.assertTrue(o.description.startswith('place du colonel fabien- a proximité immédiate'))
+        self.assertEqual(o.details_url, 'https://www.bienici.com/annonce/orpi-1-006054E0J96X')
+        self.assertEqual(o.created_at, datetime(2016, 7, 14, 0, 44, 4, tzinfo=timezone.utc).astimezone().replace(tzinfo=None))
+
+    def test_price_ranges(self):
+        o = self.pages[1][0]
+        self.assertEqual((o.price, o.surface, o.postal_code, o.building_year), (529000, 58, 75020, 1930))
+
+    def test_dates_without_milliseconds(self):
+        o = self.pages[1][0]
+        self.assertEqual(o.created_at, datetime(2016, 7, 12, 9, 30, tzinfo=timezone.utc).astimezone().replace(tzinfo=None))
+
+    def test_unreadable_dates_are_skipped(self):
+        self.assertIsNone(self.scraper.get_created_at(None, {'id': 'x', 'publicationDate': '12/07/2016'}, None))
+
+    def test_keeps_datasource_name(self):
+        self.assertEqual(self.scraper.get_datasource_name(), 'BienIci')
+
+
+if __name__ == '__main__':
+    unittest.main()
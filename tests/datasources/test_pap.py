@@ -0,0 +1,36 @@
+import unittest
+
+from app.models.apartment_offer import ApartmentOffer
+from app.models.commerce_offer import CommerceOffer
+from app.scrapers.pap import Pap
+from tests.datasources.fixtures import build_scraper
+
+
+class PapTestCase(unittest.TestCase):
+    """ Unit Tests for pap.py """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scraper, cls.fetcher = build_scraper(Pap)
+        cls.pages = list(cls.scraper._next_page())
+
+    def test_single_page(self):
+        self.assertEqual(len(self.pages), 1)
+        self.assertEqual(len(self.pages[0]), 25)
+
+    def test_offer_types(self):
+        self.assertIsInstance(self.pages[0][0], ApartmentOffer)
+        self.assertIsInstance(self.pages[0][11], CommerceOffer)
+
+    def test_fields(self):
+        o = self.pages[0][0]
+        self.assertEqual(o.id, 'r412001800')
+        self.assertEqual(o.price, 418000)
+        self.assertEqual(o.details_url, 'https://www.pap.fr/annonces/appartement-paris-75011-r412001800')
+        self.assertEqual(o.title, 'appartement 3 pièces 37,5 m²')
+        self.assertEqual(o.surface, 37)
+        self.assertTrue(o.description.startswith('rue parmentier, appartement calme'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+import settings
+from app.fetchers.page_cache import PageCache
+from app.models.apartment_offer import ApartmentOffer
+from app.models.commerce_offer import CommerceOffer
+from app.scrapers.pap_api import PapApi
+from tests.datasources.fixtures import PAGES_DIR
+
+
+class PapServicesHandler(BaseHTTPRequestHandler):
+    """ Replays the recorded web services responses, to the requests sending the device header. """
+
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.requests.append((url.path, parse_qs(url.query), self.headers.get('X-Device-Gsf')))
+        if self.headers.get('X-Device-Gsf') != 'test-device':
+            self.send_response(403)
+            self.end_headers()
+            return
+        if url.path == '/immobilier/annonces':
+            name = 'pap_api_{}.json'.format(parse_qs(url.query)['page'][0])
+        else:
+            name = 'pap_api_{}.json'.format(url.path.rsplit('/', 1)[-1])
+        path = os.path.join(PAGES_DIR, name)
+        if not os.path.exists(path):
+            self.send_response(404)
+            self.end_headers()
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/hal+json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PapApiTestCase(unittest.TestCase):
+    """ Unit Tests for pap_api.py """
+
+    requests_per_second = 0
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PapServicesHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        PapServicesHandler.requests = []
+        patcher = mock.patch.multiple(settings.pap, PAP_API_URL='http://127.0.0.1:{}'.format(cls.server.server_port),
+                                      PAP_DEVICE_GSF='test-device', PAP_SEARCH_TYPE=['appartement'],
+                                      PAP_SEARCH_LOCATION='paris-75-g439')
+        with patcher:
+            cls.scraper = PapApi(page_cache=PageCache(None, PageCache.OFF))
+            cls.scraper._requests_per_second = cls.requests_per_second
+            cls.pages = list(cls.scraper._next_page())
+        cls.requests = list(PapServicesHandler.requests)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_pages_through_the_services(self):
+        self.assertEqual([len(page) for page in self.pages], [2, 1])
+        searches = [query for path, query, gsf in self.requests if path == '/immobilier/annonces']
+        self.assertEqual([query['page'] for query in searches], [['1'], ['2']])
+        self.assertEqual(searches[0]['recherche[geo][ids][]'], ['439'])
+        self.assertEqual(searches[0]['recherche[typesbien][]'], ['appartement'])
+
+    def test_sends_device_header(self):
+        self.assertTrue(all(gsf == 'test-device' for path, query, gsf in self.requests))
+
+    def test_fields(self):
+        o = self.pages[0][0]
+        self.assertIsInstance(o, ApartmentOffer)
+        self.assertEqual((o.id, o.price, o.surface, o.room_count, o.postal_code), ('412001855', 285000, 49, 2, 75019))
+        self.assertEqual(o.title, 'vente appartement 2 pièces 49 m²')
+        self.assertTrue(o.description.startswith('rue de belleville'))
+        self.assertEqual(o.details_url, 'http://www.pap.fr/annonce/vente-appartements-paris-75-g439-r412001855')
+        self.assertIsInstance(self.pages[0][1], CommerceOffer)
+
+    def test_loads_ad_only_without_description(self):
+        ads = [path for path, query, gsf in self.requests if path != '/immobilier/annonces']
+        self.assertEqual(sorted(ads), ['/immobilier/annonces/412001855', '/immobilier/annonces/412001860'])
+        o = self.pages[1][0]
+        self.assertEqual((o.postal_code, o.room_count), (75020, 1))
+        self.assertTrue(o.description.startswith('studio lumineux'))
+
+    def test_keeps_datasource_name(self):
+        self.assertEqual(self.scraper.get_datasource_name(), 'Pap')
+
+
+class PapApiRateLimitedTestCase(PapApiTestCase):
+    """ Unit Tests for pap_api.py, with the responses reported to the politeness controller """
+
+    requests_per_second = 50
+
+    @classmethod
+    def setUpClass(cls):
+        with mock.patch.multiple(settings.core, POLITENESS_MIN_DELAY=0.001, POLITENESS_SPEEDUP=1):
+            super().setUpClass()
+
+    def test_responses_are_well_formed(self):
+        metrics = self.scraper.get_politeness_metrics()
+        # Two results pages and two ads
+        self.assertEqual((metrics['successes'], metrics['empty_pages']), (4, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
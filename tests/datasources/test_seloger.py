@@ -1,16 +1,76 @@
+import re
 import unittest
+from datetime import datetime
+
+from app.models.apartment_offer import ApartmentOffer
+from app.models.commerce_offer import CommerceOffer
+from app.scrapers.seloger import SeLoger
+from tests.datasources.fixtures import build_scraper
 
-import xml.etree.ElementTree as ET
 
 class SeLogerTestCase(unittest.TestCase):
     """ Unit Tests for seloger.py """
 
-    def setUp(self):
-        tree = ET.parse('seloger_annonce.xml')
-        self.offer_root = tree.getroot()
+    @classmethod
+    def setUpClass(cls):
+        cls.scraper, cls.fetcher = build_scraper(SeLoger)
+        cls.pages = list(cls.scraper._next_page())
+
+    def test_single_page(self):
+        self.assertEqual(len(self.pages), 1)
+        self.assertEqual(len(self.pages[0]), 25)
+
+    def test_offer_types(self):
+        self.assertIsInstance(self.pages[0][0], ApartmentOffer)
+        self.assertIsInstance(self.pages[0][11], CommerceOffer)
+
+    def test_card_fields(self):
+        o = self.pages[0][0]
+        self.assertEqual(o.id, '412001800')
+        self.assertEqual(o.price, 418000)
+        self.assertEqual(o.surface, 37)
+        self.assertEqual(o.details_url, 'https://www.seloger.com/annonces/achat/appartement/paris-75011/412001800.htm')
+
+    def test_detail_fields(self):
+        o = self.pages[0][0]
+        self.assertEqual(o.title, 'appartement 3 pièces 37,5 m² paris 11')
+        self.assertTrue(o.description.startswith('rue parmentier, appartement calme'))
+        self.assertEqual(o.postal_code, 75011)
+        self.assertEqual(o.room_count, 3)
+        self.assertEqual(o.created_at, datetime(2021, 3, 25, 8, 30))
+
+    def test_no_details_page_loaded(self):
+        self.assertEqual(self.fetcher.urls, [self.scraper._get_search_url()])
+
+    def test_unreadable_dates_are_skipped(self):
+        self.assertIsNone(self.scraper.get_created_at(None, {'id': 'x', 'publicationDate': '25/03/2021'}, None))
+        self.assertIsNone(self.scraper.get_created_at(None, {'id': 'x', 'publicationDate': 20210325}, None))
+
+
+class SeLogerCardsTestCase(unittest.TestCase):
+    """ Unit Tests for seloger.py, on a results page without embedded state """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scraper, cls.fetcher = build_scraper(SeLoger)
+        cls.fetcher.list_html = re.sub(r'<script>window\["initialData"\].*?</script>', '', cls.fetcher.list_html)
+        cls.pages = list(cls.scraper._next_page())
+
+    def test_offers(self):
+        self.assertEqual(len(self.pages[0]), 25)
+        self.assertIsInstance(self.pages[0][11], CommerceOffer)
+
+    def test_card_fields(self):
+        o = self.pages[0][0]
+        self.assertEqual((o.id, o.price, o.surface), ('412001800', 418000, 37))
+        self.assertIsNone(o.postal_code)
 
-    # def test_
+    def test_detail_fields(self):
+        o = self.pages[0][0]
+        self.assertEqual(o.title, 'appartement 3 pièces 37,5 m² paris 11')
+        self.assertTrue(o.description.startswith('rue parmentier, appartement calme'))
+        self.assertIn(o.details_url, self.fetcher.urls)
 
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
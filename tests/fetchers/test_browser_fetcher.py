@@ -0,0 +1,104 @@
+import time
+import unittest
+
+from selenium.common.exceptions import TimeoutException
+
+from app.fetchers.base_fetcher import BROWSER, BaseFetcher
+from app.fetchers.browser_fetcher import BrowserFetcher
+from app.fetchers.browser_pool import BrowserPool
+from app.scrapers.base_scraper import DETAIL_PAGE
+from tests.fetchers.test_browser_pool import FakeScraper, build_root
+
+
+class RenderingBrowser(object):
+    """ WebDriver stand-in rendering its content some time after the page is requested. """
+
+    render_delay = 0.2
+    ready_state = 'complete'
+    load_timeout = False
+
+    def __init__(self):
+        self.current_url = None
+        self.requested_at = None
+
+    def get(self, url):
+        if self.load_timeout:
+            raise TimeoutException('page load')
+        self.current_url = url
+        self.requested_at = time.monotonic()
+
+    def find_elements(self, by, selector):
+        if self.render_delay is None or time.monotonic() - self.requested_at < self.render_delay:
+            return []
+        return [selector]
+
+    def execute_script(self, script):
+        if script == 'return document.readyState':
+            return self.ready_state
+        raise Exception('no performance entries')
+
+    @property
+    def page_source(self):
+        return '<p class="title">{}</p>'.format(self.current_url)
+
+    def quit(self):
+        pass
+
+
+class SelectorFetcher(BaseFetcher):
+
+    def __init__(self):
+        super().__init__()
+        self.selectors = []
+
+    def fetch(self, url, ready_selector=None):
+        self.selectors.append(ready_selector)
+        return '<p>{}</p>'.format(url)
+
+
+class BrowserFetcherTestCase(unittest.TestCase):
+    """ Unit Tests for browser_fetcher.py """
+
+    def tearDown(self):
+        RenderingBrowser.render_delay = 0.2
+        RenderingBrowser.ready_state = 'complete'
+        RenderingBrowser.load_timeout = False
+
+    def fetch(self, timeout=5):
+        fetcher = BrowserFetcher(BrowserPool(1, factory=RenderingBrowser), ready_timeout=timeout)
+        start = time.monotonic()
+        html = fetcher.fetch('http://fake/1', '.title')
+        return html, time.monotonic() - start
+
+    def test_returns_as_soon_as_rendered(self):
+        html, elapsed = self.fetch()
+        self.assertEqual(html, '<p class="title">http://fake/1</p>')
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 1)
+
+    def test_loaded_page_without_content_is_empty(self):
+        RenderingBrowser.render_delay = None
+        html, elapsed = self.fetch(timeout=0.3)
+        self.assertIsNotNone(html)
+
+    def test_page_still_loading_times_out(self):
+        RenderingBrowser.render_delay = None
+        RenderingBrowser.ready_state = 'interactive'
+        html, elapsed = self.fetch(timeout=0.3)
+        self.assertIsNone(html)
+
+    def test_page_load_timeout(self):
+        RenderingBrowser.load_timeout = True
+        html, elapsed = self.fetch()
+        self.assertIsNone(html)
+
+    def test_scraper_passes_its_ready_selectors(self):
+        fetcher = SelectorFetcher()
+        scraper = FakeScraper(fetchers={BROWSER: fetcher})
+        scraper._ready_selectors = {DETAIL_PAGE: '.title'}
+        list(scraper._BaseScraper__iter_offers(build_root(2)))
+        self.assertEqual(fetcher.selectors, ['.title', '.title'])
+
+
+if __name__ == '__main__':
+    unittest.main()
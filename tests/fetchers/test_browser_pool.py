@@ -0,0 +1,221 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import bs4
+
+import settings
+from app.fetchers import browser_pool
+from app.fetchers.base_fetcher import BROWSER, HTTP, BaseFetcher
+from app.fetchers.browser_fetcher import BrowserFetcher
+from app.fetchers.browser_pool import BrowserPool, resolve_driver_path
+from app.models.apartment_offer import ApartmentOffer
+from app.scrapers.base_scraper import BaseScraper, LIST_PAGE, DETAIL_PAGE
+
+
+class FakeBrowser(object):
+    """ WebDriver stand-in whose page loads take longer for the first cards. """
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def __init__(self):
+        self.quit_count = 0
+        self.page_source = None
+
+    def get(self, url):
+        with self.lock:
+            FakeBrowser.active += 1
+            FakeBrowser.max_active = max(FakeBrowser.max_active, FakeBrowser.active)
+        time.sleep(0.05 / int(url.rsplit('/', 1)[1]))
+        self.page_source = '<p class="title">detail {}</p>'.format(url)
+        with self.lock:
+            FakeBrowser.active -= 1
+
+    @property
+    def current_url(self):
+        if self.quit_count > 0:
+            raise RuntimeError('session deleted')
+        return self.page_source
+
+    def quit(self):
+        self.quit_count += 1
+
+
+class FailingFetcher(BaseFetcher):
+
+    def fetch(self, url, ready_selector=None):
+        return None
+
+
+class FakeScraper(BaseScraper):
+    """ Datasource loading one detail page per card. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._max_concurrency = 3
+
+    def _get_offers(self, root):
+        return root.find_all('li')
+
+    def _get_offer_object(self, r_offer):
+        return ApartmentOffer()
+
+    def _is_valid_offer(self, offer, r_offer):
+        return True
+
+    def _prepare_offer_filling(self, offer, r_offer):
+        return self._load_web_page('http://fake/{}'.format(r_offer['data-id']), DETAIL_PAGE)
+
+    def _clean_offer_filling(self, offer, r_offer, payload):
+        pass
+
+    def get_details_url(self, offer, r_offer, payload):
+        return None
+
+    def get_title(self, offer, r_offer, payload):
+        return payload.find('p').text
+
+    def get_description(self, offer, r_offer, payload):
+        return None
+
+    def get_id(self, offer, r_offer, payload):
+        return r_offer['data-id']
+
+    def get_price(self, offer, r_offer, payload):
+        return None
+
+    def get_surface(self, offer, r_offer, payload):
+        return None
+
+    def get_created_at(self, offer, r_offer, payload):
+        return None
+
+    def get_postal_code(self, offer, r_offer, payload):
+        return None
+
+    def get_room_count(self, offer, r_offer, payload):
+        return None
+
+    def get_building_year(self, offer, r_offer, payload):
+        return None
+
+
+def build_root(count):
+    html = '<ul>{}</ul>'.format(''.join('<li data-id="{0}">card {0}</li>'.format(i) for i in range(1, count + 1)))
+    return bs4.BeautifulSoup(html, 'html.parser')
+
+
+class BrowserPoolTestCase(unittest.TestCase):
+    """ Unit Tests for browser_pool.py """
+
+    def setUp(self):
+        FakeBrowser.max_active = 0
+
+    def test_sessions_are_started_lazily_and_reused(self):
+        pool = BrowserPool(2, factory=FakeBrowser)
+        with pool.browser() as first:
+            pass
+        with pool.browser() as second:
+            pass
+        self.assertIs(first, second)
+
+    def test_close_quits_every_session(self):
+        pool = BrowserPool(2, factory=FakeBrowser)
+        with pool.browser() as first:
+            with pool.browser() as second:
+                pass
+        pool.close()
+        self.assertEqual(first.quit_count, 1)
+        self.assertEqual(second.quit_count, 1)
+
+    def test_offers_keep_card_order(self):
+        fetcher = BrowserFetcher(BrowserPool(2, factory=FakeBrowser))
+        scraper = FakeScraper(fetchers={BROWSER: fetcher})
+        offers = list(scraper._BaseScraper__iter_offers(build_root(8)))
+        self.assertEqual([o.id for o in offers], [str(i) for i in range(1, 9)])
+        self.assertEqual([o.title for o in offers], ['detail http://fake/{}'.format(i) for i in range(1, 9)])
+        self.assertEqual(FakeBrowser.max_active, 2)
+
+    def test_failed_http_fetch_falls_back_to_browser(self):
+        fetcher = BrowserFetcher(BrowserPool(1, factory=FakeBrowser))
+        scraper = FakeScraper(fetchers={BROWSER: fetcher, HTTP: FailingFetcher()})
+        scraper._page_fetchers = {LIST_PAGE: HTTP, DETAIL_PAGE: HTTP}
+        offers = list(scraper._BaseScraper__iter_offers(build_root(1)))
+        self.assertEqual(offers[0].title, 'detail http://fake/1')
+
+    def test_dead_sessions_are_replaced(self):
+        pool = BrowserPool(1, factory=FakeBrowser)
+        with pool.browser() as first:
+            pass
+        first.quit()
+        with pool.browser() as second:
+            pass
+        self.assertIsNot(first, second)
+        self.assertEqual(len(pool.startup_times), 2)
+
+
+@mock.patch.object(settings.core, 'CHROMEDRIVER_PATH', '')
+class DriverResolutionTestCase(unittest.TestCase):
+    """ Unit Tests for the chromedriver resolution of browser_pool.py """
+
+    def setUp(self):
+        browser_pool._driver_path = None
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.directory.name, 'driver.json')
+        self.driver = os.path.join(self.directory.name, 'chromedriver')
+        open(self.driver, 'w').close()
+        self.lookups = 0
+
+    def tearDown(self):
+        browser_pool._driver_path = None
+        self.directory.cleanup()
+
+    def install(self):
+        self.lookups += 1
+        return self.driver
+
+    def offline(self):
+        self.lookups += 1
+        raise ConnectionError('offline')
+
+    def resolve(self, install, ttl=3600):
+        # Each call stands for a new process, which only has the on-disk cache
+        browser_pool._driver_path = None
+        return resolve_driver_path(install, self.cache_file, ttl)
+
+    def test_lookup_is_cached_on_disk(self):
+        self.assertEqual(self.resolve(self.install), self.driver)
+        self.assertEqual(self.resolve(self.install), self.driver)
+        self.assertEqual(self.lookups, 1)
+
+    def test_expired_cache_is_looked_up_again(self):
+        self.resolve(self.install)
+        self.resolve(self.install, ttl=0)
+        self.assertEqual(self.lookups, 2)
+
+    def test_offline_lookup_falls_back_to_cache(self):
+        self.resolve(self.install)
+        self.assertEqual(self.resolve(self.offline, ttl=0), self.driver)
+        os.remove(self.cache_file)
+        with self.assertRaises(ConnectionError):
+            self.resolve(self.offline)
+
+    def test_missing_driver_is_looked_up_again(self):
+        self.resolve(self.install)
+        os.remove(self.driver)
+        with self.assertRaises(ConnectionError):
+            self.resolve(self.offline)
+
+    def test_configured_path_skips_lookup(self):
+        with mock.patch.object(settings.core, 'CHROMEDRIVER_PATH', '/usr/bin/chromedriver'):
+            self.assertEqual(self.resolve(self.install), '/usr/bin/chromedriver')
+        self.assertEqual(self.lookups, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import gzip
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.fetchers.http_fetcher import HttpFetcher
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """ Serves a gzipped page and echoes back the session cookie. """
+
+    def do_GET(self):
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        cookie = self.headers.get('Cookie') or ''
+        body = gzip.compress('<p>{}</p>'.format(cookie).encode('utf-8'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'session=42')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpFetcherTestCase(unittest.TestCase):
+    """ Unit Tests for http_fetcher.py """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        self.fetcher = HttpFetcher()
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch_decodes_gzip_and_keeps_cookies(self):
+        self.assertEqual(self.fetcher.fetch(self.base_url + '/a'), '<p></p>')
+        self.assertEqual(self.fetcher.fetch(self.base_url + '/b'), '<p>session=42</p>')
+
+    def test_fetch_returns_none_on_error_status(self):
+        self.assertIsNone(self.fetcher.fetch(self.base_url + '/missing'))
+
+
+if __name__ == '__main__':
+    unittest.main()
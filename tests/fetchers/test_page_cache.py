@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from app.fetchers.base_fetcher import BROWSER, LIST_PAGE, DETAIL_PAGE, BaseFetcher
+from app.fetchers.page_cache import PageCache
+from tests.fetchers.test_browser_pool import FakeScraper, build_root
+
+
+class CountingFetcher(BaseFetcher):
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def fetch(self, url, ready_selector=None):
+        self.urls.append(url)
+        return '<p>live {}</p>'.format(url)
+
+
+class PageCacheTestCase(unittest.TestCase):
+    """ Unit Tests for page_cache.py """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ttls = {LIST_PAGE: 60, DETAIL_PAGE: 3600}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def age(self, cache, url, seconds):
+        path = cache._get_path(url)
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_pages_expire_by_type(self):
+        cache = PageCache(self.directory, PageCache.CACHE, self.ttls)
+        cache.put('http://a', '<p>é</p>')
+        self.assertEqual(cache.get('http://a', LIST_PAGE), '<p>é</p>')
+        self.age(cache, 'http://a', 600)
+        self.assertIsNone(cache.get('http://a', LIST_PAGE))
+        self.assertEqual(cache.get('http://a', DETAIL_PAGE), '<p>é</p>')
+
+    def test_replay_ignores_age_and_never_writes(self):
+        PageCache(self.directory, PageCache.RECORD, self.ttls).put('http://a', 'a')
+        cache = PageCache(self.directory, PageCache.REPLAY, self.ttls)
+        self.age(cache, 'http://a', 10 ** 6)
+        self.assertEqual(cache.get('http://a', LIST_PAGE), 'a')
+        cache.put('http://b', 'b')
+        self.assertIsNone(cache.get('http://b', LIST_PAGE))
+
+    def test_off_mode(self):
+        cache = PageCache(self.directory, PageCache.OFF)
+        cache.put('http://a', 'a')
+        self.assertIsNone(cache.get('http://a', LIST_PAGE))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_scraper_replays_recorded_pages(self):
+        fetcher = CountingFetcher()
+        scraper = FakeScraper(fetchers={BROWSER: fetcher}, page_cache=PageCache(self.directory, PageCache.RECORD))
+        recorded = [o.title for o in scraper._BaseScraper__iter_offers(build_root(3))]
+        scraper = FakeScraper(fetchers={BROWSER: fetcher}, page_cache=PageCache(self.directory, PageCache.REPLAY))
+        replayed = [o.title for o in scraper._BaseScraper__iter_offers(build_root(3))]
+        self.assertEqual(recorded, replayed)
+        self.assertEqual(len(fetcher.urls), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+
+import settings
+from app.fetchers.browser_fetcher import BrowserFetcher
+from app.fetchers.browser_pool import BrowserPool
+from app.fetchers.resource_policy import ResourcePolicy, MEDIA_PATTERNS, TRACKER_PATTERNS
+
+
+class CdpBrowser(object):
+    """ WebDriver stand-in recording its DevTools commands. """
+
+    def __init__(self):
+        self.commands = []
+        self.page_source = None
+        self.current_url = None
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params))
+
+    def execute_script(self, script):
+        return {'bytes': 20480, 'requests': 3, 'load_ms': 120}
+
+    def get(self, url):
+        self.current_url = url
+        self.page_source = '<p>{}</p>'.format(url)
+
+    def quit(self):
+        pass
+
+
+class ResourcePolicyTestCase(unittest.TestCase):
+    """ Unit Tests for resource_policy.py """
+
+    def test_default_patterns_with_overrides(self):
+        self.assertEqual(ResourcePolicy().patterns, MEDIA_PATTERNS + TRACKER_PATTERNS)
+        policy = ResourcePolicy(blocked=['*.css', '*.png'], allowed=['*.svg'])
+        self.assertIn('*.css', policy.patterns)
+        self.assertNotIn('*.svg', policy.patterns)
+        self.assertEqual(policy.patterns.count('*.png'), 1)
+        self.assertEqual(ResourcePolicy(blocked=['*.css'], defaults=False).patterns, ('*.css',))
+
+    def test_blocking_can_be_turned_off(self):
+        with mock.patch.object(settings.core, 'BLOCK_RESOURCES', False):
+            self.assertIsNone(ResourcePolicy.from_settings())
+        self.assertIsNotNone(ResourcePolicy.from_settings())
+
+    def test_policy_is_applied_once_per_session(self):
+        pool = BrowserPool(1, factory=CdpBrowser)
+        policy = ResourcePolicy(allowed=['*.svg'])
+        fetcher = BrowserFetcher(pool, policy=policy)
+        with self.assertLogs(level='INFO') as logs:
+            self.assertEqual(fetcher.fetch('http://fake/1'), '<p>http://fake/1</p>')
+        fetcher.fetch('http://fake/2')
+        with pool.browser() as browser:
+            self.assertEqual(browser.commands, [('Network.enable', {}),
+                                                ('Network.setBlockedURLs', {'urls': list(policy.patterns)})])
+        self.assertIn('Loaded http://fake/1 in 120ms: 20 kB over 3 requests', logs.output[-1])
+
+    def test_session_shared_with_another_policy(self):
+        pool = BrowserPool(1, factory=CdpBrowser)
+        BrowserFetcher(pool, policy=ResourcePolicy()).fetch('http://fake/1')
+        BrowserFetcher(pool, policy=None).fetch('http://fake/2')
+        with pool.browser() as browser:
+            self.assertEqual(browser.commands[-1], ('Network.setBlockedURLs', {'urls': []}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import pickle
+import unittest
+
+from app.models.apartment_offer import ApartmentOffer
+from app.models.commerce_offer import CommerceOffer
+from app.models.offer_batch import MISSING, OfferBatch
+
+
+def build_offer(cls, offer_id, price=None, title=None):
+    o = cls()
+    o.id = offer_id
+    o.price = price
+    o.title = title
+    return o
+
+
+class OfferBatchTestCase(unittest.TestCase):
+    """ Unit Tests for offer_batch.py """
+
+    def setUp(self):
+        apartment = build_offer(ApartmentOffer, 1, '420000.0', 'Foo')
+        apartment.room_count = '3'
+        self.offers = [apartment, build_offer(CommerceOffer, 2)]
+        self.batch = OfferBatch.from_offers(self.offers, 'Pap')
+
+    def test_offers_have_no_dict(self):
+        self.assertFalse(hasattr(self.offers[0], '__dict__'))
+        self.assertRaises(AttributeError, setattr, self.offers[0], 'foo', 42)
+        self.assertEqual(pickle.loads(pickle.dumps(self.offers[0])).room_count, 3)
+
+    def test_columns(self):
+        self.assertEqual(len(self.batch), 2)
+        self.assertEqual(list(self.batch.column('price')), [420000, MISSING])
+        self.assertEqual(self.batch.values('price'), [420000, None])
+        self.assertEqual(self.batch.values('room_count'), [3, None])
+        self.assertEqual(self.batch.values('id'), ['1', '2'])
+
+    def test_rows(self):
+        rows = list(self.batch)
+        self.assertEqual(rows[0].title, 'foo')
+        self.assertIsNone(rows[1].price)
+        self.assertEqual(self.batch[1], rows[1])
+
+    def test_select(self):
+        selected = self.batch.select([1])
+        self.assertEqual(selected.datasource, 'Pap')
+        self.assertEqual(selected.values('id'), ['2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
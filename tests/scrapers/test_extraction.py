@@ -0,0 +1,40 @@
+import unittest
+
+from app.scrapers.extraction import SelectorMap, get_parser, parse_html
+
+
+class ExtractionTestCase(unittest.TestCase):
+    """ Unit Tests for extraction.py """
+
+    def setUp(self):
+        self.selectors = SelectorMap({
+            'next_page': '[class="next"]',
+            'title': '.item-title',
+        })
+        self.root = parse_html('<div><a class="item-title big" name="42"> Foo </a><a class="next other">n</a></div>')
+
+    def test_text_and_attr(self):
+        self.assertEqual(self.selectors.text(self.root, 'title'), 'Foo')
+        self.assertEqual(self.selectors.attr(self.root, 'title', 'name'), '42')
+        self.assertIsNone(self.selectors.attr(self.root, 'title', 'href'))
+
+    def test_exact_class_selector(self):
+        self.assertIsNone(self.selectors.select_one(self.root, 'next_page'))
+
+    def test_missing_root(self):
+        self.assertEqual(self.selectors.select(None, 'title'), [])
+        self.assertIsNone(self.selectors.text(None, 'title'))
+
+    def test_regions_only_keep_their_containers(self):
+        html = '<script>var x;</script><div class="item-title big"><p>Foo</p></div><footer class="other">x</footer>'
+        root = parse_html(html, 'html.parser', regions=['item-title', 'next'])
+        self.assertEqual(str(root), '<div class="item-title big"><p>Foo</p></div>')
+        self.assertEqual(self.selectors.text(root, 'title'), 'Foo')
+
+    def test_parser_backend(self):
+        self.assertEqual(get_parser('html5lib'), 'html5lib')
+        self.assertRaises(ValueError, get_parser, 'foo')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import settings
+
+from app.fetchers.base_fetcher import BROWSER, HTTP, BaseFetcher
+from app.fetchers.page_cache import PageCache
+from app.models.apartment_offer import ApartmentOffer
+from app.scrapers.base_scraper import BaseScraper, DETAIL_PAGE
+from app.services.crawl_engine import AsyncCrawlEngine
+from app.services.pipeline import Pipeline, NotifyStage
+
+
+class SlowFetcher(BaseFetcher):
+    """ Serves a results page of ten cards and their details pages, each load taking the same time. """
+
+    def __init__(self, delay, blocked=()):
+        super().__init__()
+        self.delay = delay
+        self.blocked = blocked
+        self.urls = []
+
+    @property
+    def size(self):
+        return 5
+
+    def fetch(self, url, ready_selector=None):
+        self.urls.append(url)
+        time.sleep(self.delay)
+        if url.endswith('/search'):
+            return '<ul>{}</ul>'.format(''.join('<li data-id="{}"></li>'.format(i) for i in range(1, 11)))
+        if url.rsplit('/', 1)[1] in self.blocked:
+            return '<script src="https://geo.captcha-delivery.com/captcha/"></script>'
+        return '<p>detail {}</p>'.format(url)
+
+
+class HostScraper(BaseScraper):
+    """ Datasource of a single results page, whose offers each need their details page. """
+
+    def __init__(self, host, delay=0, requests_per_second=0, blocked=(), offer_store=None, page_cache=None,
+                 http_fetcher=None):
+        self.host = host
+        self.fetcher = SlowFetcher(delay, blocked)
+        if page_cache is None:
+            page_cache = PageCache(None, PageCache.OFF)
+        fetchers = {BROWSER: self.fetcher}
+        if http_fetcher is not None:
+            fetchers[HTTP] = http_fetcher
+        super().__init__(fetchers=fetchers, offer_store=offer_store, page_cache=page_cache)
+        self._max_concurrency = 5
+        self._requests_per_second = requests_per_second
+        self._base_site_url = 'https://{}'.format(host)
+
+    def get_datasource_name(self):
+        return self.host
+
+    def _get_search_url(self):
+        return '{}/search'.format(self._base_site_url)
+
+    def _has_next_page(self, root):
+        return False, None
+
+    def _get_offers(self, root):
+        return root.find_all('li')
+
+    def _get_offer_object(self, r_offer):
+        return ApartmentOffer()
+
+    def _is_valid_offer(self, offer, r_offer):
+        return True
+
+    def _prepare_offer_filling(self, offer, r_offer):
+        return self._load_web_page('{}/{}'.format(self._base_site_url, r_offer['data-id']), DETAIL_PAGE)
+
+    def _clean_offer_filling(self, offer, r_offer, payload):
+        pass
+
+    def get_details_url(self, offer, r_offer, payload):
+        return None
+
+    def get_title(self, offer, r_offer, payload):
+        return None if payload is None else payload.find('p').text
+
+    def get_description(self, offer, r_offer, payload):
+        return None
+
+    def get_id(self, offer, r_offer, payload):
+        return r_offer['data-id']
+
+    def get_price(self, offer, r_offer, payload):
+        return None
+
+    def get_surface(self, offer, r_offer, payload):
+        return None
+
+    def get_postal_code(self, offer, r_offer, payload):
+        return None
+
+    def get_room_count(self, offer, r_offer, payload):
+        return None
+
+    def get_building_year(self, offer, r_offer, payload):
+        return None
+
+    def get_created_at(self, offer, r_offer, payload):
+        return None
+
+
+class CrawlEngineTestCase(unittest.TestCase):
+    """ Unit Tests for crawl_engine.py """
+
+    def test_datasources_are_crawled_concurrently(self):
+        scrapers = [HostScraper('a.test', delay=0.05), HostScraper('b.test', delay=0.05)]
+        offers = []
+        start = time.monotonic()
+        counts = AsyncCrawlEngine(scrapers).run(lambda datasource, offer: offers.append((datasource, offer.id)))
+        elapsed = time.monotonic() - start
+        self.assertEqual(counts, {'a.test': 10, 'b.test': 10})
+        # Each datasource loads its list page then two rounds of five detail pages, the datasources at once
+        self.assertLess(elapsed, 2 * 11 * 0.05)
+        for datasource in ('a.test', 'b.test'):
+            self.assertEqual([offer_id for name, offer_id in offers if name == datasource],
+                             [str(i) for i in range(1, 11)])
+
+    @mock.patch.multiple(settings.core, POLITENESS_MIN_DELAY=0.001, POLITENESS_SPEEDUP=1)
+    def test_hosts_are_rate_limited(self):
+        limited = HostScraper('limited.test', requests_per_second=50)
+        free = HostScraper('free.test')
+        finished = dict()
+        start = time.monotonic()
+
+        def on_offer(datasource, offer):
+            finished[datasource] = time.monotonic() - start
+
+        counts = AsyncCrawlEngine([limited, free]).run(on_offer)
+        self.assertEqual(counts, {'limited.test': 10, 'free.test': 10})
+        # 11 requests, the first two sent in a burst
+        self.assertGreaterEqual(finished['limited.test'], 9 / 50)
+        self.assertLess(finished['free.test'], 9 / 50)
+        self.assertEqual(len(limited.fetcher.urls), 11)
+
+    def test_slow_consumer_does_not_block_the_other_datasources(self):
+        finished = dict()
+        start = time.monotonic()
+
+        def on_offer(datasource, offer):
+            if datasource == 'slow.test':
+                time.sleep(0.05)
+            finished[datasource] = time.monotonic() - start
+
+        counts = AsyncCrawlEngine([HostScraper('slow.test'), HostScraper('fast.test')]).run(on_offer)
+        self.assertEqual(counts, {'slow.test': 10, 'fast.test': 10})
+        self.assertLess(finished['fast.test'], 10 * 0.05)
+        self.assertGreaterEqual(finished['slow.test'], 10 * 0.05)
+
+    def test_replayed_pages_are_not_rate_limited(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = HostScraper('replay.test', page_cache=PageCache(directory, PageCache.RECORD))
+            AsyncCrawlEngine([recorder]).run(lambda datasource, offer: None)
+            self.assertEqual(len(recorder.fetcher.urls), 11)
+            # Would take 20s if each of the 11 pages waited for a token
+            replayer = HostScraper('replay.test', requests_per_second=0.5,
+                                   page_cache=PageCache(directory, PageCache.REPLAY))
+            titles = []
+            start = time.monotonic()
+            counts = AsyncCrawlEngine([replayer]).run(lambda datasource, offer: titles.append(offer.title))
+            self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(counts, {'replay.test': 10})
+        self.assertEqual(replayer.fetcher.urls, [])
+        self.assertEqual(titles[0], 'detail https://replay.test/1')
+
+    def test_offers_without_details_page_are_skipped(self):
+        offers = []
+        counts = AsyncCrawlEngine([HostScraper('partial.test', blocked=('2',))]).run(
+            lambda datasource, offer: offers.append(offer.id))
+        self.assertEqual(counts, {'partial.test': 9})
+        self.assertNotIn('2', offers)
+
+    def test_failing_datasource_does_not_stop_the_others(self):
+        failing = HostScraper('failing.test')
+        failing._has_next_page = lambda root: 1 / 0
+        counts = AsyncCrawlEngine([HostScraper('working.test'), failing]).run(lambda datasource, offer: None)
+        self.assertEqual(counts, {'working.test': 10, 'failing.test': None})
+
+    def test_offers_stream_through_a_pipeline(self):
+        engine = AsyncCrawlEngine([HostScraper('a.test'), HostScraper('b.test')])
+        notified = []
+        count = Pipeline([NotifyStage(lambda datasource, offer: notified.append(datasource))],
+                         queue_size=2).run(engine.iter_offers(queue_size=2))
+        self.assertEqual(count, 20)
+        self.assertEqual(sorted(set(notified)), ['a.test', 'b.test'])
@@ -0,0 +1,178 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models.apartment_offer import ApartmentOffer
+from app.services.dedup import DedupIndex, DedupStage, MinHasher, normalize, shingles, pack_signature, unpack_signature
+from app.services.pipeline import Pipeline
+from app.storage.database import offers
+from app.storage.offer_store import OfferStore
+
+
+DESCRIPTION = ("Rue de Belleville, appartement traversant de 49 m² au 3e étage d'un immeuble ancien : "
+               "entrée, séjour lumineux, chambre sur cour, cuisine séparée, salle de bains. Cave.")
+
+
+class CountingHasher(MinHasher):
+    """ MinHasher counting the signatures it computes. """
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def signature(self, hashes):
+        self.count += 1
+        return super().signature(hashes)
+
+
+def make_offer(offer_id, price=285000, surface=49, postal_code=75019, title='Appartement 2 pièces 49 m²',
+               description=DESCRIPTION):
+    o = ApartmentOffer()
+    o.id = offer_id
+    o.price = price
+    o.surface = surface
+    o.postal_code = postal_code
+    o.title = title
+    o.description = description
+    o.details_url = 'https://example.com/{}'.format(offer_id)
+    return o
+
+
+class DedupIndexTestCase(unittest.TestCase):
+    """ Unit Tests for dedup.py """
+
+    def setUp(self):
+        self.index = DedupIndex(price_band=0.05, surface_band=5, threshold=0.5)
+
+    def test_normalize(self):
+        self.assertEqual(normalize("Séjour lumineux, 3e ÉTAGE!"), ['sejour', 'lumineux', '3e', 'etage'])
+        self.assertEqual(len(shingles('a b c d')), 2)
+        self.assertEqual(len(shingles('a b')), 1)
+
+    def test_similarity_estimate(self):
+        hasher = MinHasher()
+        first = hasher.signature(shingles(DESCRIPTION))
+        self.assertEqual(hasher.similarity(first, hasher.signature(shingles(DESCRIPTION.upper()))), 1)
+        other = hasher.signature(shingles('Maison de campagne avec jardin arboré et piscine, garage double.'))
+        self.assertLess(hasher.similarity(first, other), 0.2)
+
+    def test_matches_across_datasources(self):
+        self.assertIsNone(self.index.add('Pap', make_offer(1)))
+        cluster = self.index.add('SeLoger', make_offer(2, price=289000, surface=50,
+                                                       description=DESCRIPTION.replace('Cave.', 'Cave et grenier.')))
+        self.assertIsNotNone(cluster)
+        self.assertEqual(cluster.datasources, ['Pap', 'SeLoger'])
+        self.assertEqual(cluster.urls, ['https://example.com/1', 'https://example.com/2'])
+
+    def test_same_datasource_is_not_matched(self):
+        self.index.add('Pap', make_offer(1))
+        self.assertIsNone(self.index.add('Pap', make_offer(2)))
+
+    def test_blocks(self):
+        self.index.add('Pap', make_offer(1))
+        self.assertIsNone(self.index.add('SeLoger', make_offer(2, postal_code=75020)))
+        self.assertIsNone(self.index.add('SeLoger', make_offer(3, price=400000)))
+        self.assertIsNone(self.index.add('SeLoger', make_offer(4, surface=70)))
+        self.assertIsNone(self.index.add('SeLoger', make_offer(5, description='Studio meublé proche gare, idéal investisseur.')))
+        self.assertEqual(self.index.comparisons, 0)
+
+    def test_unknown_postal_codes_match_any_block(self):
+        self.index.add('Pap', make_offer(1, postal_code=None))
+        cluster = self.index.add('SeLoger', make_offer(2))
+        self.assertEqual(cluster.datasources, ['Pap', 'SeLoger'])
+        self.assertEqual(len(self.index.add('BienIci', make_offer(3, postal_code=None))), 3)
+
+    def test_clusters_merge_incrementally(self):
+        self.index.add('Pap', make_offer(1))
+        self.index.add('SeLoger', make_offer(2))
+        cluster = self.index.add('BienIci', make_offer(3))
+        self.assertEqual(len(cluster), 3)
+        self.assertEqual(len(self.index.clusters()), 1)
+        self.assertIs(self.index.get_cluster('Pap', 1), cluster)
+
+    def test_comparisons_stay_within_blocks(self):
+        for i in range(500):
+            self.index.add('Pap', make_offer(i, price=100000 + i * 5000, surface=20 + i % 80,
+                                             description='Annonce {} : {}'.format(i, DESCRIPTION)))
+        self.index.comparisons = 0
+        self.assertIsNotNone(self.index.add('SeLoger', make_offer('x', price=100000 + 42 * 5000, surface=20 + 42,
+                                                                  description='Annonce 42 : ' + DESCRIPTION)))
+        self.assertLess(self.index.comparisons, 20)
+
+    def test_signatures_are_packed(self):
+        signature = MinHasher().signature(shingles(DESCRIPTION))
+        self.assertEqual(unpack_signature(pack_signature(signature)), signature)
+        self.assertIsNone(unpack_signature(pack_signature(None)))
+
+
+class DedupHistoryTestCase(unittest.TestCase):
+    """ Unit Tests for the loading of the stored offers by dedup.py """
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.store = OfferStore('sqlite:///{}'.format(self.path))
+        self.store.add_many('Pap', [make_offer(1), make_offer(2, postal_code=75011), make_offer(3, description=None,
+                                                                                                 title=None)])
+
+    def tearDown(self):
+        self.store.engine.dispose()
+        os.remove(self.path)
+
+    def make_index(self):
+        return DedupIndex(price_band=0.05, surface_band=5, threshold=0.5, hasher=CountingHasher(), store=self.store)
+
+    def test_load_from_store(self):
+        index = self.make_index()
+        self.assertEqual(index.load(), 3)
+        self.assertEqual(len(index), 2)
+        self.assertIsNotNone(index.add('SeLoger', make_offer(4)))
+
+    def test_signatures_are_computed_once(self):
+        first = self.make_index()
+        first.load()
+        self.assertEqual(first.hasher.count, 3)
+        # Stored by the scraper, then signed by the pipeline
+        self.store.add_many('SeLoger', [make_offer(4, postal_code=75020)])
+        first.add('SeLoger', make_offer(4, postal_code=75020))
+        first.save()
+        second = self.make_index()
+        self.assertEqual(second.load(), 4)
+        self.assertEqual(second.hasher.count, 0)
+        self.assertEqual(len(second), 3)
+        self.assertIsNotNone(second.add('BienIci', make_offer(5)))
+
+    def test_history_window(self):
+        with self.store.engine.begin() as conn:
+            conn.execute(update(offers).where(offers.c.offer_id == '2')
+                         .values(last_seen_at=datetime.now() - timedelta(days=30)))
+        self.assertEqual(self.make_index().load(history_days=7), 2)
+        self.assertEqual(self.make_index().load(history_days=0), 3)
+        self.assertEqual(self.make_index().load(before=datetime.now() - timedelta(days=1)), 0)
+
+    def test_background_loading(self):
+        index = self.make_index()
+        index.load_in_background()
+        self.assertIsNotNone(index.add('SeLoger', make_offer(4)))
+        self.assertEqual(len(index), 3)
+
+
+class DedupStageTestCase(unittest.TestCase):
+    """ Unit Tests for dedup.py """
+
+    def test_drops_duplicates_and_reports_clusters_once(self):
+        reported = []
+        stage = DedupStage(DedupIndex(price_band=0.05, surface_band=5, threshold=0.5), report=reported.append)
+        items = [('Pap', make_offer(1)), ('SeLoger', make_offer(2)), ('BienIci', make_offer(3)),
+                 ('SeLoger', make_offer(4, postal_code=75011))]
+        count = Pipeline([stage], queue_size=2).run(iter(items))
+        self.assertEqual(count, 2)
+        self.assertEqual(len(reported), 1)
+        self.assertEqual(reported[0].datasources, ['BienIci', 'Pap', 'SeLoger'])
+
+
+if __name__ == '__main__':
+    unittest.main()
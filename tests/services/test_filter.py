@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+import settings
+from app.fetchers.base_fetcher import BROWSER
+from app.fetchers.browser_fetcher import BrowserFetcher
+from app.fetchers.browser_pool import BrowserPool
+from app.models.apartment_offer import ApartmentOffer
+from app.models.offer_batch import OfferBatch
+from app.services.filter import CompiledFilter, Filter
+from tests.fetchers.test_browser_pool import FakeBrowser, FakeScraper, build_root
+
+
+class PricedScraper(FakeScraper):
+    """ Datasource whose cards are priced 100 times their id. """
+
+    _card_fields = ('id', 'price')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.detail_loads = 0
+
+    def _prepare_offer_filling(self, offer, r_offer):
+        self.detail_loads += 1
+        return super()._prepare_offer_filling(offer, r_offer)
+
+    def get_price(self, offer, r_offer, payload):
+        return int(r_offer['data-id']) * 100
+
+
+def build_offer(price=None, surface=None, title=None, postal_code=None):
+    o = ApartmentOffer()
+    o.price = price
+    o.surface = surface
+    o.title = title
+    o.postal_code = postal_code
+    return o
+
+
+@mock.patch.multiple(settings.filtering, MAX_PRICE=500, MIN_SIZE=20, MIN_PRICE_PER_SURFACE_UNIT=0,
+                     MAX_BUILDING_YEAR=0, DISTRICTS=['75011'], BLACKLISTED_WORDS=['viager'])
+class FilterTestCase(unittest.TestCase):
+    """ Unit Tests for filter.py """
+
+    def test_apply_card_ignores_unknown_fields(self):
+        self.assertFalse(Filter.apply_card(build_offer()))
+        self.assertFalse(Filter.apply_card(build_offer(price=400)))
+
+    def test_apply_card(self):
+        self.assertTrue(Filter.apply_card(build_offer(price=600)))
+        self.assertTrue(Filter.apply_card(build_offer(surface=10)))
+        self.assertTrue(Filter.apply_card(build_offer(postal_code='75012')))
+        self.assertFalse(Filter.apply_card(build_offer(price=400, surface=30, postal_code='75011')))
+
+    def test_apply_card_skips_text_filters(self):
+        o = build_offer(price=400, title='Viager occupé')
+        self.assertFalse(Filter.apply_card(o))
+        self.assertTrue(Filter.apply(o))
+
+    def test_unset_bounds_do_not_filter(self):
+        with mock.patch.multiple(settings.filtering, MAX_PRICE=0, DISTRICTS=[]):
+            self.assertFalse(Filter.apply(build_offer(price=10 ** 6, surface=50, postal_code='75012')))
+
+    def test_details_are_only_loaded_for_remaining_offers(self):
+        fetcher = BrowserFetcher(BrowserPool(1, factory=FakeBrowser))
+        scraper = PricedScraper(fetchers={BROWSER: fetcher})
+        offers = list(scraper._BaseScraper__iter_offers(build_root(8)))
+        self.assertEqual([o.id for o in offers], ['1', '2', '3', '4', '5'])
+        self.assertEqual(scraper.detail_loads, 5)
+
+
+class CompiledFilterTestCase(unittest.TestCase):
+    """ Unit Tests for the CompiledFilter of filter.py """
+
+    def setUp(self):
+        self.filter = CompiledFilter(max_price=500, min_size=20, districts=['75011', ' 75012 '],
+                                     blacklisted_words=['viager', 'rez de chaussée', ''])
+
+    def test_blacklist_matches_whole_words_and_phrases(self):
+        self.assertEqual(self.filter.apply(build_offer(title='Beau viager')), CompiledFilter.TITLE)
+        self.assertEqual(self.filter.apply(build_offer(title='Au rez  de chaussée')), CompiledFilter.TITLE)
+        self.assertIsNone(self.filter.apply(build_offer(title='viagers et rez')))
+
+    def test_districts_match_integer_postal_codes(self):
+        self.assertIsNone(self.filter.apply(build_offer(postal_code=75012)))
+        self.assertEqual(self.filter.apply(build_offer(postal_code=75013)), CompiledFilter.POSTAL_CODE)
+
+    def test_apply_many_reports_rejecting_rule(self):
+        offers = [build_offer(price=400), build_offer(price=600), build_offer(surface=10),
+                  build_offer(price=400, surface=30, title='viager')]
+        self.assertEqual(self.filter.apply_many(offers),
+                         [None, CompiledFilter.PRICE, CompiledFilter.SURFACE, CompiledFilter.TITLE])
+
+    def test_apply_batch_matches_apply_many(self):
+        offers = [build_offer(price=400), build_offer(price=600), build_offer(surface=10), build_offer(postal_code=1),
+                  build_offer(price=400, surface=30, title='viager'), build_offer(surface=0)]
+        self.assertEqual(self.filter.apply_batch(OfferBatch.from_offers(offers)), self.filter.apply_many(offers))
+
+    def test_no_settings_keeps_everything(self):
+        self.assertEqual(CompiledFilter().apply_many([build_offer(price=10 ** 6, postal_code=1, title='viager')]), [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
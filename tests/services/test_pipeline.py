@@ -0,0 +1,55 @@
+import threading
+import unittest
+
+from app.scrapers.pap import Pap
+from app.services.filter import CompiledFilter
+from app.services.pipeline import Pipeline, Stage, FilterStage, NotifyStage, scraper_source
+from tests.datasources.fixtures import build_scraper
+
+
+class FailingStage(Stage):
+
+    def process(self, item):
+        raise ValueError('boom')
+
+
+class PipelineTestCase(unittest.TestCase):
+    """ Unit Tests for pipeline.py """
+
+    def test_offers_are_filtered_and_notified_in_order(self):
+        scraper, fetcher = build_scraper(Pap)
+        notified = []
+        pipeline = Pipeline([
+            FilterStage(CompiledFilter(max_price=500000)),
+            NotifyStage(lambda datasource, offer: notified.append((datasource, offer.id, offer.price))),
+        ], queue_size=2)
+        count = pipeline.run(scraper_source(scraper))
+        self.assertEqual(count, len(notified))
+        self.assertTrue(0 < count < 25)
+        self.assertTrue(all(datasource == 'Pap' and price <= 500000 for datasource, _, price in notified))
+        self.assertEqual([offer_id for _, offer_id, _ in notified], sorted(offer_id for _, offer_id, _ in notified))
+
+    def test_items_stream_before_source_ends(self):
+        released = threading.Event()
+        seen = []
+
+        def source():
+            yield 'Fake', 1
+            # Only released once the first item went through the whole pipeline
+            self.assertTrue(released.wait(5))
+            yield 'Fake', 2
+
+        def notify(datasource, offer):
+            seen.append(offer)
+            released.set()
+
+        self.assertEqual(Pipeline([NotifyStage(notify)], queue_size=1).run(source()), 2)
+        self.assertEqual(seen, [1, 2])
+
+    def test_stage_errors_are_raised_without_blocking(self):
+        pipeline = Pipeline([FailingStage(), Stage()], queue_size=1)
+        self.assertRaises(ValueError, pipeline.run, (('Fake', i) for i in range(10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
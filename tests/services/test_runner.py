@@ -0,0 +1,155 @@
+import functools
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app.fetchers.browser_fetcher import BrowserFetcher
+from app.fetchers.browser_pool import BrowserPool
+from app.services import runner as runner_module
+from app.services.runner import MultiSourceRunner, DONE, FAILED, TIMEOUT
+from app.storage.offer_store import OfferStore
+from tests.services.test_crawl_engine import HostScraper
+
+
+def fast_source(offer_store):
+    return HostScraper('fast.test', delay=0.01, offer_store=offer_store)
+
+
+def slow_source(offer_store):
+    return HostScraper('slow.test', delay=0.3, offer_store=offer_store)
+
+
+def hanging_source(offer_store):
+    return HostScraper('hanging.test', delay=60, offer_store=offer_store)
+
+
+def failing_source(offer_store):
+    raise RuntimeError('no browser')
+
+
+def browser_source(pid_path, offer_store):
+    """ Hanging datasource whose worker started a child process, as chromedriver would be. """
+    child = subprocess.Popen(['sleep', '60'])
+    with open(pid_path, 'w') as f:
+        f.write(str(child.pid))
+    return hanging_source(offer_store)
+
+
+class RecordingBrowser(object):
+    """ WebDriver stand-in writing to a file when it quits, the worker process exiting right after. """
+
+    def __init__(self, quit_path):
+        self.quit_path = quit_path
+        self.current_url = None
+
+    def quit(self):
+        with open(self.quit_path, 'w') as f:
+            f.write('quit')
+
+
+def browser_pool_source(quit_path, offer_store):
+    """ Datasource whose worker started a browser session, to be quit by the worker when it is done. """
+    fetcher = BrowserFetcher(BrowserPool(1, factory=functools.partial(RecordingBrowser, quit_path)))
+    with fetcher.pool.browser():
+        pass
+    return HostScraper('fast.test', delay=0.01, offer_store=offer_store, http_fetcher=fetcher)
+
+
+# Held by a thread of the parent process while a worker starts, as the pipeline's queues may be
+_parent_lock = threading.Lock()
+
+
+def locking_source(offer_store):
+    """ Datasource whose worker needs a lock that was held in the parent process when it started. """
+    with _parent_lock:
+        return fast_source(offer_store)
+
+
+def is_running(pid):
+    """ Tells whether a process exists and is not a zombie waiting to be reaped. """
+    try:
+        with open('/proc/{}/stat'.format(pid)) as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+class MultiSourceRunnerTestCase(unittest.TestCase):
+    """ Unit Tests for runner.py """
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.url = 'sqlite:///{}'.format(self.path)
+        OfferStore(self.url).engine.dispose()
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_offers_are_merged_with_their_datasource(self):
+        runner = MultiSourceRunner({'fast': fast_source, 'slow': slow_source}, timeout=30, database_url=self.url)
+        start = time.monotonic()
+        items = list(runner.iter_offers())
+        elapsed = time.monotonic() - start
+        self.assertEqual(runner.results, {'fast': (DONE, 10), 'slow': (DONE, 10)})
+        self.assertEqual(sorted(set(datasource for datasource, _ in items)), ['fast.test', 'slow.test'])
+        self.assertEqual([o.id for datasource, o in items if datasource == 'slow.test'], [str(i) for i in range(1, 11)])
+        # The fast datasource does not wait for the slow one
+        self.assertEqual(items[0][0], 'fast.test')
+        self.assertLess(elapsed, 2 * 3 * 0.3 + 5)
+        self.assertEqual(len(OfferStore(self.url).known_ids('slow.test', [str(i) for i in range(1, 11)])), 10)
+
+    def test_failures_and_timeouts_are_isolated(self):
+        runner = MultiSourceRunner({'fast': fast_source, 'hanging': hanging_source, 'failing': failing_source},
+                                   timeout=8, database_url=self.url)
+        items = list(runner.iter_offers())
+        self.assertEqual(len(items), 10)
+        self.assertEqual(runner.results['fast'], (DONE, 10))
+        self.assertEqual(runner.results['hanging'], (TIMEOUT, None))
+        self.assertEqual(runner.results['failing'], (FAILED, 'no browser'))
+
+    @mock.patch.object(runner_module, 'STOP_GRACE_PERIOD', 1)
+    def test_stopped_worker_leaves_no_child_process(self):
+        pid_path = self.path + '.pid'
+        runner = MultiSourceRunner({'browser': functools.partial(browser_source, pid_path)}, timeout=8,
+                                   database_url=self.url)
+        try:
+            list(runner.iter_offers())
+            with open(pid_path) as f:
+                pid = int(f.read())
+        finally:
+            os.remove(pid_path)
+        self.assertEqual(runner.results['browser'], (TIMEOUT, None))
+        deadline = time.monotonic() + 5
+        while is_running(pid) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.assertFalse(is_running(pid))
+
+    def test_worker_does_not_inherit_the_parent_locks(self):
+        runner = MultiSourceRunner({'locking': locking_source}, timeout=8, database_url=self.url)
+        with _parent_lock:
+            items = runner.iter_offers()
+            first = next(items)
+        self.assertEqual(first[0], 'fast.test')
+        list(items)
+        self.assertEqual(runner.results['locking'], (DONE, 10))
+
+    def test_worker_quits_its_browsers(self):
+        quit_path = self.path + '.quit'
+        runner = MultiSourceRunner({'browser': functools.partial(browser_pool_source, quit_path)}, timeout=30,
+                                   database_url=self.url)
+        try:
+            list(runner.iter_offers())
+            self.assertEqual(runner.results['browser'], (DONE, 10))
+            self.assertTrue(os.path.exists(quit_path))
+        finally:
+            if os.path.exists(quit_path):
+                os.remove(quit_path)
+
+    def test_unknown_datasource(self):
+        with self.assertRaises(ValueError):
+            MultiSourceRunner(['pap', 'leboncoin'])
@@ -0,0 +1,139 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.models.apartment_offer import ApartmentOffer
+from app.services.slack_notifier import SlackNotifier, build_blocks
+from app.storage.offer_store import OfferStore
+
+
+class FakeSlackHandler(BaseHTTPRequestHandler):
+    """ chat.postMessage, answering the status codes queued in the server's responses before accepting messages. """
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append((self.path, self.headers.get('Authorization'), body))
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        status = self.server.responses.pop(0) if self.server.responses else 200
+        if status == 429:
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.end_headers()
+            return
+        if status != 200:
+            self.send_response(status)
+            self.end_headers()
+            return
+        self.server.messages.append(body)
+        payload = json.dumps({'ok': True, 'channel': body['channel']}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_offer(offer_id):
+    o = ApartmentOffer()
+    o.id = offer_id
+    o.title = 'Appartement {} pièces'.format(offer_id)
+    o.price = 300000 + offer_id
+    o.surface = 50
+    o.postal_code = 75011
+    o.details_url = 'https://example.com/{}'.format(offer_id)
+    return o
+
+
+class SlackNotifierTestCase(unittest.TestCase):
+    """ Unit Tests for slack_notifier.py """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSlackHandler)
+        self.server.requests, self.server.messages, self.server.responses = [], [], []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_url = 'http://127.0.0.1:{}/api'.format(self.server.server_port)
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.store = OfferStore('sqlite:///{}'.format(self.path))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.store.engine.dispose()
+        os.remove(self.path)
+
+    def build_notifier(self, api_url=None, **kwargs):
+        kwargs.setdefault('batch_delay', 0.3)
+        kwargs.setdefault('requests_per_second', 0)
+        return SlackNotifier(self.store, token='xoxb-test', channel='#immo', bot_name='bot', bot_icon=':house:',
+                             api_url=api_url or self.api_url, **kwargs)
+
+    def test_offers_are_batched(self):
+        notifier = self.build_notifier(batch_size=2)
+        for i in range(5):
+            notifier.notify('Pap', make_offer(i))
+        notifier.close(5)
+        self.assertEqual([len(m['blocks']) - 1 for m in self.server.messages], [2, 2, 1])
+        path, authorization, body = self.server.requests[0]
+        self.assertEqual(path, '/api/chat.postMessage')
+        self.assertEqual(authorization, 'Bearer xoxb-test')
+        self.assertEqual((body['channel'], body['username'], body['icon_emoji']), ('#immo', 'bot', ':house:'))
+        self.assertEqual(self.store.get_notifications('#immo', 10), [])
+
+    def test_waits_after_rate_limit(self):
+        self.server.responses = [429, 500]
+        notifier = self.build_notifier()
+        start = time.monotonic()
+        notifier.notify('Pap', make_offer(1))
+        notifier.close(10)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertGreaterEqual(time.monotonic() - start, 1)
+
+    def test_notify_does_not_wait_on_slack(self):
+        self.server.delay = 0.5
+        notifier = self.build_notifier(batch_delay=0)
+        start = time.monotonic()
+        for i in range(3):
+            notifier.notify('Pap', make_offer(i))
+        self.assertLess(time.monotonic() - start, 0.25)
+        notifier.close(10)
+        self.assertEqual(sum(len(m['blocks']) - 1 for m in self.server.messages), 3)
+
+    def test_outbox_is_kept_for_the_next_run(self):
+        notifier = self.build_notifier(api_url='http://127.0.0.1:1/api')
+        notifier.notify('Pap', make_offer(1))
+        notifier.notify('SeLoger', make_offer(2))
+        notifier.close(0.5)
+        self.assertEqual(len(self.store.get_notifications('#immo', 10)), 2)
+        self.build_notifier().close(5)
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(self.store.get_notifications('#immo', 10), [])
+
+    def test_bad_token_pauses_sending(self):
+        self.server.responses = [401]
+        notifier = self.build_notifier()
+        notifier.notify('Pap', make_offer(1))
+        notifier.close(5)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(self.store.get_notifications('#immo', 10)), 1)
+
+    def test_blocks(self):
+        blocks = build_blocks([{'datasource': 'Pap', 'id': '1', 'title': 'studio <calme>', 'price': 250000,
+                                'surface': 25, 'postal_code': 75011, 'url': 'https://example.com/1'}])
+        self.assertEqual(blocks[0]['text']['text'], '1 nouvelle offre')
+        self.assertEqual(blocks[1]['text']['text'],
+                         '*<https://example.com/1|studio &lt;calme&gt;>*\nPap · 250 000 € · 25 m² · 10 000 €/m² · 75011')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import bs4
+from sqlalchemy import inspect, select, text
+
+import settings
+
+from app.fetchers.base_fetcher import BROWSER
+from app.fetchers.browser_fetcher import BrowserFetcher
+from app.fetchers.browser_pool import BrowserPool
+from app.models.apartment_offer import ApartmentOffer
+from app.scrapers.base_scraper import LIST_PAGE
+from app.scrapers.pap import Pap
+from app.storage.database import offers
+from app.storage.offer_store import OfferStore
+from tests.datasources.fixtures import build_scraper
+from tests.fetchers.test_browser_pool import FakeBrowser, FakeScraper, build_root
+from tests.services.test_crawl_engine import HostScraper
+
+
+class PagedScraper(FakeScraper):
+    """ Datasource with three result pages of three offers, newest first. """
+
+    _sorted_by_date = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.list_pages = []
+
+    def _get_search_url(self):
+        return 'http://fake/list/1'
+
+    def _has_next_page(self, root):
+        page = int(root.find('ul')['data-page'])
+        if page == 3:
+            return False, None
+        return True, 'http://fake/list/{}'.format(page + 1)
+
+    def _load_web_page(self, url, page_type=LIST_PAGE):
+        if page_type != LIST_PAGE:
+            return super()._load_web_page(url, page_type)
+        page = int(url.rsplit('/', 1)[1])
+        self.list_pages.append(page)
+        cards = ''.join('<li data-id="{}">card</li>'.format(i) for i in range(3 * page - 2, 3 * page + 1))
+        return bs4.BeautifulSoup('<ul data-page="{}">{}</ul>'.format(page, cards), 'html.parser')
+
+
+def build_offer(offer_id, price=None):
+    o = ApartmentOffer()
+    o.id = offer_id
+    o.price = price
+    return o
+
+
+class OfferStoreTestCase(unittest.TestCase):
+    """ Unit Tests for offer_store.py """
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.store = OfferStore('sqlite:///{}'.format(self.path))
+
+    def tearDown(self):
+        self.store.engine.dispose()
+        os.remove(self.path)
+
+    def test_known_ids(self):
+        self.store.add_many('Pap', [build_offer('1'), build_offer('2')])
+        self.assertEqual(self.store.known_ids('Pap', ['1', '3', 2]), {'1', '2'})
+        self.assertEqual(self.store.known_ids('SeLoger', ['1']), set())
+
+    def test_add_many_ignores_known_and_duplicate_offers(self):
+        self.store.add('Pap', build_offer('1'))
+        self.store.add_many('Pap', [build_offer('1'), build_offer('2'), build_offer('2')])
+        self.assertTrue(self.store.contains('Pap', '2'))
+
+    def test_add_many_updates_known_offers(self):
+        self.store.add('Pap', build_offer('1', 300000))
+        with self.store.engine.connect() as conn:
+            first = conn.execute(select(offers).where(offers.c.offer_id == '1')).one()
+        o = build_offer('1', 250000)
+        o.title = 'studio'
+        self.store.add_many('Pap', [o, build_offer('2', 100000)])
+        with self.store.engine.connect() as conn:
+            rows = {row.offer_id: row for row in conn.execute(select(offers))}
+        self.assertEqual((rows['1'].title, rows['1'].price), ('studio', 300000))
+        self.assertEqual(rows['1'].first_seen_at, first.first_seen_at)
+        self.assertGreater(rows['1'].last_seen_at, first.last_seen_at)
+        self.assertEqual(rows['2'].price, 100000)
+        self.assertEqual(len(self.store.get_price_history('Pap', '1')), 1)
+
+    def test_sqlite_database_is_tuned(self):
+        with self.store.engine.connect() as conn:
+            self.assertEqual(conn.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+        indexes = {index['name'] for index in inspect(self.store.engine).get_indexes('offers')}
+        self.assertTrue({'ix_offers_postal_code', 'ix_offers_price'} <= indexes)
+
+    def test_scraper_skips_known_offers(self):
+        self.store.add_many('FakeScraper', [build_offer('1'), build_offer('3')])
+        fetcher = BrowserFetcher(BrowserPool(1, factory=FakeBrowser))
+        scraper = FakeScraper(fetchers={BROWSER: fetcher}, offer_store=self.store)
+        offers = list(scraper._BaseScraper__iter_offers(build_root(4)))
+        self.assertEqual([o.id for o in offers], ['2', '4'])
+        self.assertEqual(self.store.known_ids('FakeScraper', ['2', '4']), {'2', '4'})
+
+    @mock.patch.object(settings.filtering, 'MAX_PRICE', 430000)
+    def test_each_page_is_written_once(self):
+        scraper, fetcher = build_scraper(Pap, offer_store=self.store)
+        with mock.patch.object(self.store, 'add_many', wraps=self.store.add_many) as add_many:
+            pages = list(scraper._next_page())
+        self.assertEqual(add_many.call_count, len(pages))
+        stored = [o.id for o in add_many.call_args[0][1]]
+        kept = [o.id for o in pages[-1]]
+        self.assertGreater(len(stored), len(kept))
+        self.assertEqual(self.store.known_ids('Pap', stored), set(stored))
+
+    def build_paged_scraper(self):
+        fetcher = BrowserFetcher(BrowserPool(1, factory=FakeBrowser))
+        return PagedScraper(fetchers={BROWSER: fetcher}, offer_store=self.store)
+
+    def test_first_crawl_is_full_and_sets_watermark(self):
+        scraper = self.build_paged_scraper()
+        self.assertEqual(sum(len(page) for page in scraper._next_page()), 9)
+        self.assertEqual(scraper.list_pages, [1, 2, 3])
+        state = self.store.get_crawl_state('PagedScraper')
+        self.assertEqual(state['watermark_offer_id'], '1')
+        self.assertIsNotNone(state['last_full_crawl_at'])
+
+    def test_incremental_crawl_stops_on_known_page(self):
+        list(self.build_paged_scraper()._next_page())
+        scraper = self.build_paged_scraper()
+        self.assertEqual(list(scraper._next_page()), [[]])
+        self.assertEqual(scraper.list_pages, [1])
+        scraper = self.build_paged_scraper()
+        self.assertEqual(len(list(scraper._next_page(full_crawl=True))), 3)
+
+    def test_unsorted_results_are_always_crawled_in_full(self):
+        list(self.build_paged_scraper()._next_page())
+        scraper = self.build_paged_scraper()
+        scraper._sorted_by_date = False
+        list(scraper._next_page())
+        self.assertEqual(scraper.list_pages, [1, 2, 3])
+
+    @mock.patch.multiple(settings.core, POLITENESS_MIN_DELAY=0.001, POLITENESS_MAX_DELAY=0.05)
+    def test_politeness_state_is_saved_and_restored(self):
+        scraper = HostScraper('polite.test', requests_per_second=100, blocked=('3',), offer_store=self.store)
+        # The offer of the anti-bot page is left to the next crawl
+        self.assertEqual(len(list(scraper._next_offer())), 9)
+        state = self.store.get_politeness_state('polite.test')
+        self.assertEqual((state['successes'], state['empty_pages'], state['blocks'], state['timeouts']), (10, 0, 1, 0))
+        self.assertEqual(state['delay'], scraper.get_politeness_metrics()['delay'])
+        restored = HostScraper('polite.test', requests_per_second=100, offer_store=self.store)
+        self.assertEqual(restored.get_politeness_metrics()['delay'], state['delay'])
+        self.assertEqual([s['datasource'] for s in self.store.get_politeness_states()], ['polite.test'])
+
+    def test_offers_without_details_page_are_retried(self):
+        scraper = HostScraper('retry.test', blocked=('3', '7'), offer_store=self.store)
+        self.assertEqual(len(list(scraper._next_offer())), 8)
+        self.assertEqual(self.store.known_ids('retry.test', ['3', '7']), set())
+        retried = HostScraper('retry.test', offer_store=self.store)
+        self.assertEqual([o.id for o in retried._next_offer()], ['3', '7'])
+        self.assertEqual(retried.fetcher.urls, ['https://retry.test/search', 'https://retry.test/3',
+                                                'https://retry.test/7'])
+
+    def test_price_changes_are_recorded(self):
+        self.store.add_many('Pap', [build_offer('1', 300000), build_offer('2', 200000)])
+        self.assertEqual(self.store.record_prices('Pap', [('1', 300000), ('2', 180000), ('3', 100000), ('1', None)]),
+                         [('2', 200000, 180000)])
+        self.assertEqual(self.store.record_prices('Pap', [('2', 180000)]), [])
+        self.assertEqual([price for _, price in self.store.get_price_history('Pap', '2')], [200000, 180000])
+        self.assertEqual([price for _, price in self.store.get_price_history('Pap', '1')], [300000])
+
+    def test_price_drops(self):
+        self.store.add_many('Pap', [build_offer('1', 300000), build_offer('2', 200000), build_offer('3', 100000)])
+        self.store.record_prices('Pap', [('1', 290000), ('2', 170000), ('3', 110000)])
+        drops = self.store.get_price_drops(0.05, 7)
+        self.assertEqual([(d['offer_id'], d['previous_price'], d['price']) for d in drops], [('2', 200000, 170000)])
+        self.assertAlmostEqual(drops[0]['drop'], 0.15)
+        self.assertEqual(len(self.store.get_price_drops(0.01, 7)), 2)
+        self.assertEqual(self.store.get_price_drops(0.01, 7, now=datetime.now() + timedelta(days=8)), [])
+
+    def test_scraper_records_prices_of_known_offers(self):
+        self.store.add_many('Pap', [build_offer('r412001800', 450000)])
+        scraper, fetcher = build_scraper(Pap, offer_store=self.store)
+        list(scraper._next_page())
+        self.assertEqual(self.store.get_price_drops(0.05, 1)[0]['price'], 418000)
+        self.assertEqual(len(self.store.get_price_history('Pap', 'r412001800')), 2)
+
+    @mock.patch.object(settings.filtering, 'MAX_PRICE', 430000)
+    def test_price_drops_below_the_filters_are_read_again(self):
+        self.store.add_many('Pap', [build_offer('r412001800', 450000)])
+        scraper, fetcher = build_scraper(Pap, offer_store=self.store)
+        offers = [o for page in scraper._next_page() for o in page]
+        self.assertIn('r412001800', [o.id for o in offers])
+        self.assertEqual(self.store.get_price_history('Pap', 'r412001800')[-1][1], 418000)
+
+    @mock.patch.object(settings.filtering, 'MAX_PRICE', 430000)
+    def test_price_changes_of_kept_offers_are_not_read_again(self):
+        self.store.add_many('Pap', [build_offer('r412001800', 425000)])
+        scraper, fetcher = build_scraper(Pap, offer_store=self.store)
+        offers = [o for page in scraper._next_page() for o in page]
+        self.assertNotIn('r412001800', [o.id for o in offers])
+
+
+if __name__ == '__main__':
+    unittest.main()
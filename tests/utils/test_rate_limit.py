@@ -0,0 +1,67 @@
+import threading
+import time
+import unittest
+
+from app.utils.rate_limit import AdaptiveRate, TokenBucket, get_bucket
+
+
+class RateLimitTestCase(unittest.TestCase):
+    """ Unit Tests for rate_limit.py """
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=20, capacity=2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        # Two tokens available at once, then one every 50ms
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_threads_share_the_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        times = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(3):
+                bucket.acquire()
+                with lock:
+                    times.append(time.monotonic())
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(max(times) - start, 8 / 50 - 0.01)
+
+    def test_buckets_are_shared_per_host(self):
+        self.assertIsNone(get_bucket('unlimited.test', 0))
+        bucket = get_bucket('limited.test', 5)
+        self.assertIs(get_bucket('limited.test', 1), bucket)
+        self.assertIsNot(get_bucket('other.test', 5), bucket)
+
+    def test_adaptive_rate_speeds_up_and_backs_off(self):
+        bucket = TokenBucket(rate=1)
+        politeness = AdaptiveRate(bucket, min_delay=0.5, max_delay=10, speedup=0.5, backoff=2)
+        politeness.report(AdaptiveRate.SUCCESS)
+        self.assertEqual(politeness.delay, 0.5)
+        politeness.report(AdaptiveRate.SUCCESS)
+        self.assertEqual(politeness.delay, 0.5)
+        politeness.report(AdaptiveRate.TIMEOUT)
+        politeness.report(AdaptiveRate.EMPTY)
+        self.assertEqual(politeness.delay, 2)
+        self.assertEqual(bucket.rate, 0.5)
+        politeness.report(AdaptiveRate.BLOCKED)
+        self.assertEqual(politeness.delay, 8)
+        politeness.report(AdaptiveRate.BLOCKED)
+        self.assertEqual(politeness.delay, 10)
+        self.assertEqual(politeness.metrics(), dict(delay=10, rate=0.1, successes=2, empty_pages=1, blocks=2,
+                                                    timeouts=1))
+
+    def test_adaptive_rate_resumes_from_state(self):
+        bucket = TokenBucket(rate=1)
+        state = dict(delay=4, successes=3, empty_pages=0, blocks=1, timeouts=0)
+        politeness = AdaptiveRate(bucket, min_delay=0.5, max_delay=10, state=state)
+        self.assertEqual(bucket.rate, 0.25)
+        self.assertEqual(politeness.metrics()['successes'], 3)